@@ -0,0 +1,115 @@
+# osbb_crawler/benchmarks/bench_city.py
+"""
+Бенчмарк пошуку міста за URL джерела (pipelines.CityResolver) на синтетичному
+великому мапінгу: вбудований URL_CITY_MAPPING, доповнений тисячами наборів
+data.gov.ua і вкладеними ключами (набір і його ресурси), щоб за одним URL
+збігалось кілька ключів. Записи мають source_dataset_url ресурсів цих наборів
+і частку джерел поза мапінгом. Вимірюється час на запис для лінійного
+перебору 'base_url in source_url' (як до індексу), індексу без кешу та
+індексу з кешем на джерело; результати звіряються з лінійним перебором.
+
+    cd osbb_crawler
+    python benchmarks/bench_city.py --sources 5000 --items 200000 --output bench_city.json
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import uuid
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from osbb_crawler.pipelines import URL_CITY_MAPPING, CityResolver  # noqa: E402
+
+CITIES = ['Київ', 'Львів', 'Вінниця', 'Луцьк', 'Ужгород', 'Хмельницький', 'Житомир', 'Полтава', 'Рівне', 'Чернігів',
+          'Суми', 'Тернопіль', 'Черкаси', 'Кропивницький', 'Миколаїв', 'Херсон', 'Запоріжжя', 'Дніпро', 'Одеса',
+          'Харків', 'Івано-Франківськ', 'Чернівці', 'Кременчук', 'Біла Церква', 'Бровари']
+DATASET_URL = 'https://data.gov.ua/dataset/'
+
+
+def make_mapping(rng, sources: int) -> dict:
+    mapping = dict(URL_CITY_MAPPING)
+    while len(mapping) < sources:
+        dataset_url = DATASET_URL + str(uuid.UUID(int=rng.getrandbits(128)))
+        mapping[dataset_url] = rng.choice(CITIES)
+        # Кожен десятий набір має ще й окремий ключ для ресурсу: збігаються обидва ключі
+        if rng.random() < 0.1:
+            mapping[f'{dataset_url}/resource/{rng.getrandbits(32):08x}'] = rng.choice(CITIES)
+    return mapping
+
+
+def make_source_urls(rng, mapping: dict, datasets: int) -> list:
+    base_urls = list(mapping)
+    urls = []
+    for _ in range(datasets):
+        if rng.random() < 0.1:
+            urls.append(DATASET_URL + str(uuid.UUID(int=rng.getrandbits(128))))
+        else:
+            urls.append(f'{rng.choice(base_urls)}/resource/{rng.getrandbits(32):08x}')
+    return urls
+
+
+def linear_scan(mapping: dict, source_url: str):
+    for base_url, city_name in mapping.items():
+        if base_url in source_url:
+            return city_name
+    return None
+
+
+def per_item_us(elapsed: float, items: int) -> float:
+    return round(elapsed / items * 1e6, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sources', type=int, default=5000, help='розмір мапінгу')
+    parser.add_argument('--items', type=int, default=200000)
+    parser.add_argument('--datasets', type=int, default=2000, help='різних source_dataset_url серед записів')
+    parser.add_argument('--linear-items', type=int, default=5000, help='вибірка для лінійного перебору')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='JSON-файл для результатів')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    mapping = make_mapping(rng, args.sources)
+    source_urls = make_source_urls(rng, mapping, args.datasets)
+    items = [rng.choice(source_urls) for _ in range(args.items)]
+    results = {'mapping': len(mapping), 'items': len(items), 'datasets': len(set(items))}
+
+    expected = {url: linear_scan(mapping, url) for url in source_urls}
+    results['expected_matched'] = sum(city_name is not None for city_name in expected.values())
+    sample = items[:args.linear_items]
+    started = time.perf_counter()
+    for url in sample:
+        linear_scan(mapping, url)
+    results['linear_us_per_item'] = per_item_us(time.perf_counter() - started, len(sample))
+
+    started = time.perf_counter()
+    resolver = CityResolver(mapping)
+    results['index_build_ms'] = round((time.perf_counter() - started) * 1000, 1)
+
+    started = time.perf_counter()
+    for url in items:
+        resolver.resolve(url)
+        resolver.memo.clear()
+    results['index_us_per_item'] = per_item_us(time.perf_counter() - started, len(items))
+
+    resolver = CityResolver(mapping)
+    started = time.perf_counter()
+    for url in items:
+        resolver.resolve(url)
+    results['memo_us_per_item'] = per_item_us(time.perf_counter() - started, len(items))
+
+    results['mismatches'] = sum(resolver.resolve(url) != city_name for url, city_name in expected.items())
+
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
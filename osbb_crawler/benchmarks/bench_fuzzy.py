@@ -0,0 +1,186 @@
+# osbb_crawler/benchmarks/bench_fuzzy.py
+"""
+Бенчмарк нечіткого групування (fuzzy.FuzzyMatcher) на синтетичних записах
+з відомою істиною: кожне ОСББ з'являється в 1-4 наборах даних з назвою в
+іншому написанні (організаційна форма повністю чи скорочено, лапки,
+регістр, латинські літери, одруківка), з адресою в іншому написанні або
+без неї, частина — без ЄДРПОУ. Вимірюються швидкість, порівнянь на запис,
+пікова пам'ять і попарні точність/повнота кластерів; для порівняння —
+повнота точних ключів (ЄДРПОУ або address_key), як у record_key().
+
+    cd osbb_crawler
+    python benchmarks/bench_fuzzy.py --records 500000 --output bench_fuzzy.json
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import time
+from collections import Counter
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from osbb_crawler.address import address_key  # noqa: E402
+from osbb_crawler.fuzzy import FuzzyMatcher  # noqa: E402
+
+CITIES = ['Київ', 'Львів', 'Вінниця', 'Луцьк', 'Ужгород', 'Хмельницький', 'Житомир', 'Полтава', 'Рівне', 'Чернігів',
+          'Суми', 'Тернопіль', 'Черкаси', 'Кропивницький', 'Миколаїв', 'Херсон', 'Запоріжжя', 'Дніпро', 'Одеса',
+          'Харків', 'Івано-Франківськ', 'Чернівці', 'Кременчук', 'Біла Церква', 'Бровари']
+STREETS = ['Шевченка', 'Грушевського', 'Миру', 'Соборна', 'Лесі Українки', 'Замостянська', 'Келецька', 'Пирогова',
+           'Театральна', 'Франка', 'Коновальця', 'Бандери', 'Мазепи', 'Сагайдачного', 'Хмельницького',
+           'Незалежності', 'Героїв Майдану', 'Київська', 'Садова', 'Зелена', 'Лугова', 'Квітнева', 'Молодіжна',
+           'Центральна', 'Шкільна', 'Польова', 'Підгірна', 'Чорновола', 'Стуса', 'Симоненка', 'Липинського',
+           'Костомарова', 'Драгоманова', 'Вишневецького', 'Довженка', 'Сковороди', 'Котляревського', 'Гоголя',
+           'Лисенка', 'Стефаника', 'Винниченка', 'Петлюри', 'Кобилянської', 'Городоцька', 'Володимирська',
+           'Вокзальна', 'Заводська', 'Набережна', 'Паркова', 'Весняна', 'Сонячна', 'Затишна', 'Лісова', 'Озерна']
+# Менші населені пункти: 'Нова Полтава', 'Велика Луцьк'... — лише щоб записи розподілились, як у реєстрі
+SETTLEMENT_PREFIXES = ['', 'Нова ', 'Стара ', 'Велика ', 'Мала ', 'Верхня ', 'Нижня ', 'Південна ']
+STREET_TYPES = [('вул.', 'вулиця'), ('просп.', 'проспект'), ('бульв.', 'бульвар')]
+WORDS = ['Затишок', 'Надія', 'Світанок', 'Каштан', 'Оберіг', 'Злагода', 'Мрія', 'Добробут', 'Комфорт', 'Сонячний',
+         'Лелека', 'Калина', 'Світлиця', 'Явір', 'Джерело', 'Берегиня', 'Домівка', 'Веселка', 'Оселя', 'Гармонія',
+         'Перспектива', 'Єдність', 'Віра', 'Любов', 'Прогрес', 'Майбутнє', 'Престиж', 'Фортеця', 'Сузір\'я', 'Лагуна',
+         'Ювілейний', 'Північний', 'Парковий', 'Вишневий', 'Липовий', 'Дубовий', 'Кленовий', 'Смерековий', 'Ранок',
+         'Зоряний', 'Теплий дім', 'Наш дім', 'Новосілля', 'Відродження', 'Співдружність', 'Партнер', 'Господар']
+LEGAL_FORMS = ['ОСББ', 'ОСББ', 'Об\'єднання співвласників багатоквартирного будинку', 'ЖБК', '']
+QUOTES = [('"', '"'), ('«', '»'), ('“', '”'), ('', '')]
+# Кирилиця -> схожа латиниця: так назви потрапляють у набори зі змішаною розкладкою
+HOMOGLYPHS = str.maketrans('аеіоркс', 'aeiopkc')
+ALPHABET = 'абвгдеєжзиіїйклмнопрстуфхцчшщьюя'
+
+
+def make_entities(rng, count: int) -> list:
+    entities = []
+    for number in range(count):
+        city = rng.choice(SETTLEMENT_PREFIXES) + rng.choice(CITIES)
+        street_type = rng.choice(STREET_TYPES) if rng.random() < 0.3 else STREET_TYPES[0]
+        street = rng.choice(STREETS)
+        house = f'{rng.randint(1, 250)}{rng.choice(["", "", "", "А", "Б"])}'
+        kind = rng.random()
+        if kind < 0.5:
+            name = f'{rng.choice(WORDS)} {rng.choice(WORDS)}'
+        elif kind < 0.8:
+            name = f'{rng.choice(WORDS)}-{rng.randint(1, 99)}'
+        else:
+            name = f'{street} {house}'
+        entities.append({
+            'id': number, 'name': name, 'city': city, 'street_type': street_type, 'street': street, 'house': house,
+            'edrpou': str(30000000 + number) if rng.random() < 0.5 else '',
+        })
+    return entities
+
+
+def typo(rng, text: str) -> str:
+    position = rng.randrange(1, len(text))
+    if rng.random() < 0.5:
+        return text[:position] + rng.choice(ALPHABET) + text[position + 1:]
+    return text[:position] + text[position + 1:]
+
+
+def name_variant(rng, name: str) -> str:
+    opening, closing = rng.choice(QUOTES)
+    form = rng.choice(LEGAL_FORMS)
+    variant = f'{form} {opening}{name}{closing}'.strip()
+    roll = rng.random()
+    if roll < 0.3:
+        variant = variant.upper()
+    elif roll < 0.4:
+        variant = variant.translate(HOMOGLYPHS)
+    if rng.random() < 0.1:
+        variant = typo(rng, variant)
+    return variant
+
+
+def address_variant(rng, entity: dict) -> str:
+    if rng.random() < 0.15:
+        return ''
+    short, full = entity['street_type']
+    street_type = short if rng.random() < 0.6 else full
+    house = entity['house']
+    if rng.random() < 0.3:
+        house = f'буд. {house}'
+    elif house[-1:].isalpha() and rng.random() < 0.5:
+        house = f'{house[:-1]}-{house[-1]}'
+    return f'{street_type} {entity["street"]}, {house}'
+
+
+def make_records(rng, entities: list, count: int) -> list:
+    records = []
+    while len(records) < count:
+        entity = rng.choice(entities)
+        records.append((
+            entity['id'],
+            name_variant(rng, entity['name']),
+            address_variant(rng, entity),
+            entity['city'] if rng.random() < 0.7 else f'м. {entity["city"]}',
+            entity['edrpou'] if rng.random() < 0.7 else '',
+        ))
+    return records
+
+
+def pairs(sizes) -> int:
+    return sum(size * (size - 1) // 2 for size in sizes)
+
+
+def pair_quality(truth: list, predicted: list) -> dict:
+    true_pairs = pairs(Counter(truth).values())
+    predicted_pairs = pairs(Counter(predicted).values())
+    correct_pairs = pairs(Counter(zip(truth, predicted)).values())
+    return {
+        'precision': round(correct_pairs / predicted_pairs, 4) if predicted_pairs else 1.0,
+        'recall': round(correct_pairs / true_pairs, 4) if true_pairs else 1.0,
+    }
+
+
+def peak_rss_mb() -> float:
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=500000)
+    parser.add_argument('--duplication', type=float, default=2.5, help='середня кількість записів на ОСББ')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='JSON-файл для результатів')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    entities = make_entities(rng, int(args.records / args.duplication))
+    records = make_records(rng, entities, args.records)
+    keys = [address_key(address, city) if address else '' for _, _, address, city, _ in records]
+    results = {'records': len(records), 'entities': len(set(record[0] for record in records))}
+    rss_before = peak_rss_mb()
+
+    matcher = FuzzyMatcher()
+    started = time.perf_counter()
+    clusters = [
+        matcher.assign(name, key, city, edrpou or None)
+        for (_, name, _, city, edrpou), key in zip(records, keys)
+    ]
+    elapsed = time.perf_counter() - started
+
+    truth = [record[0] for record in records]
+    exact = [f'edrpou:{edrpou}' if edrpou else f'addr:{key}' if key else f'row:{row}'
+             for row, ((_, _, _, _, edrpou), key) in enumerate(zip(records, keys))]
+    results.update({
+        'clusters': len(matcher.cluster_ids),
+        'seconds': round(elapsed, 2),
+        'records_per_s': round(len(records) / elapsed),
+        'comparisons_per_record': round(matcher.comparisons / len(records), 2),
+        'matched': matcher.matched,
+        'peak_rss_mb': peak_rss_mb(),
+        'rss_growth_mb': round(peak_rss_mb() - rss_before, 1),
+        'fuzzy': pair_quality(truth, clusters),
+        'exact_keys': pair_quality(truth, exact),
+    })
+
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+# osbb_crawler/benchmarks/bench_parquet.py
+"""
+Порівняння CSV і Parquet (pipelines.ParquetExportPipeline) за розміром і часом
+читання на даних test_output.csv, розмножених у --scale разів (кожна копія
+отримує свій суфікс назви, тож рядки унікальні). Parquet пишеться самим
+пайплайном — одним файлом і з розбиттям за областю. Вимірюються повне
+читання в pandas, частоти міст (читання однієї колонки) і вибірка однієї
+області; дані з Parquet звіряються з CSV.
+
+    cd osbb_crawler
+    python benchmarks/bench_parquet.py --scale 200 --output bench_parquet.json
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import pandas as pd
+import pyarrow.dataset as ds
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from scrapy import Spider  # noqa: E402
+from scrapy.utils.reactor import install_reactor  # noqa: E402
+from scrapy.utils.test import get_crawler  # noqa: E402
+
+from osbb_crawler.items import OsbbRecordItem  # noqa: E402
+from osbb_crawler.pipelines import ParquetExportPipeline  # noqa: E402
+
+
+def load_rows(path: str, scale: int) -> tuple:
+    with open(path, encoding='utf-8', newline='') as f:
+        reader = csv.DictReader(f)
+        fieldnames = reader.fieldnames
+        rows = list(reader)
+    scaled = [
+        {**row, 'name': f"{row['name']} #{copy}" if copy else row['name']}
+        for copy in range(scale) for row in rows
+    ]
+    return fieldnames, scaled
+
+
+def write_csv(path: str, fieldnames: list, rows: list):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def write_parquet(path: str, rows: list, **settings) -> float:
+    crawler = get_crawler(Spider, {'OSBB_PARQUET_PATH': path, **settings})
+    spider = crawler._create_spider('bench')
+    pipeline = ParquetExportPipeline.from_crawler(crawler)
+    started = time.perf_counter()
+    for row in rows:
+        pipeline.item_scraped(OsbbRecordItem(row), spider)
+    pipeline.spider_closed(spider)
+    return time.perf_counter() - started
+
+
+def size_mb(path: str) -> float:
+    if os.path.isdir(path):
+        size = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+    else:
+        size = os.path.getsize(path)
+    return round(size / 2 ** 20, 2)
+
+
+def read_csv(path: str, **kwargs) -> pd.DataFrame:
+    return pd.read_csv(path, dtype=str, keep_default_na=False, **kwargs)
+
+
+def csv_region(path: str, region: str) -> pd.DataFrame:
+    frame = read_csv(path)
+    return frame[frame['region'] == region]
+
+
+def best_of(repeat: int, function) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return round(min(timings), 4)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--csv', default=os.path.join(PROJECT_DIR, 'test_output.csv'))
+    parser.add_argument('--scale', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='JSON-файл для результатів')
+    args = parser.parse_args()
+
+    install_reactor('twisted.internet.asyncioreactor.AsyncioSelectorReactor')
+    fieldnames, rows = load_rows(args.csv, args.scale)
+    # Найчастіша непорожня область
+    region = Counter(row['region'] for row in rows if row['region']).most_common(1)[0][0]
+    results = {'rows': len(rows), 'region_filter': region}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        csv_path = os.path.join(tmp, 'osbb.csv')
+        parquet_path = os.path.join(tmp, 'osbb.parquet')
+        partitioned_path = os.path.join(tmp, 'osbb_by_region')
+        write_csv(csv_path, fieldnames, rows)
+        results['parquet_write_s'] = round(write_parquet(parquet_path, rows), 2)
+        results['partitioned_write_s'] = round(
+            write_parquet(partitioned_path, rows, OSBB_PARQUET_PARTITION_BY='region'), 2)
+        results['size_mb'] = {'csv': size_mb(csv_path), 'parquet': size_mb(parquet_path),
+                              'parquet_by_region': size_mb(partitioned_path)}
+
+        results['full_scan_s'] = {
+            'csv': best_of(args.repeat, lambda: read_csv(csv_path)),
+            'parquet': best_of(args.repeat, lambda: pd.read_parquet(parquet_path)),
+        }
+        results['city_counts_s'] = {
+            'csv': best_of(args.repeat, lambda: read_csv(csv_path, usecols=['city'])['city'].value_counts()),
+            'parquet': best_of(args.repeat, lambda: pd.read_parquet(
+                parquet_path, columns=['city'])['city'].value_counts()),
+        }
+        partitioned = ds.dataset(partitioned_path, format='parquet', partitioning='hive')
+        results['region_filter_s'] = {
+            'csv': best_of(args.repeat, lambda: csv_region(csv_path, region)),
+            'parquet_by_region': best_of(args.repeat, lambda: partitioned.to_table(
+                filter=ds.field('region') == region).to_pandas()),
+        }
+
+        from_csv = read_csv(csv_path)
+        from_parquet = pd.read_parquet(parquet_path, columns=fieldnames).astype(str)
+        results['parquet_equals_csv'] = bool(from_csv.equals(from_parquet))
+
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,249 @@
+# osbb_crawler/benchmarks/bench_processors.py
+"""
+Бенчмарк модуля processors: швидкість (рядків/с), пікова RSS і час до першого
+запису для process_file_content на синтетичних файлах тих форм, що трапляються
+на data.gov.ua:
+
+* CSV у cp1251 з роздільником ';' і CSV у UTF-8 з роздільником ',';
+* GeoJSON FeatureCollection з полігонами;
+* JSON з вкладеними 'data' / 'records';
+* XLSX на кілька тисяч рядків.
+
+Кожен випадок запускається в окремому процесі, щоб пікова RSS не змішувалась.
+Результати зберігаються в JSON, і їх можна порівняти з попереднім запуском:
+
+    cd osbb_crawler
+    python benchmarks/bench_processors.py --output bench.json
+    python benchmarks/bench_processors.py --output new.json --compare bench.json
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+# Назва випадку -> (формат для process_file_content, розширення файлу)
+CASES = {
+    'csv_cp1251_semicolon': ('CSV', 'csv'),
+    'csv_utf8_comma': ('CSV', 'csv'),
+    'geojson_features': ('JSON', 'geojson'),
+    'json_nested_data': ('JSON', 'json'),
+    'json_nested_records': ('JSON', 'json'),
+    'xlsx': ('XLSX', 'xlsx'),
+}
+
+# Режими process_file_content: streaming та/або vectorized
+MODES = ['inmemory', 'streaming', 'vectorized', 'vectorized_streaming']
+
+STREETS = ['вул. Шевченка', 'вул. Грушевського', 'просп. Миру', 'вул. Соборна', 'бульв. Лесі Українки']
+CITIES = ['Вінниця', 'Львів', 'Луцьк', 'Ужгород', 'Хмельницький']
+
+
+def _record(rng, i):
+    return {
+        'name': f'ОСББ "Дім {i}"',
+        'edrpou': str(rng.randint(10 ** 7, 10 ** 8 - 1)) if rng.random() > 0.1 else '',
+        'street': rng.choice(STREETS),
+        'house': f'{rng.randint(1, 200)}{rng.choice(["", "", "А", "Б"])}',
+        'city': rng.choice(CITIES),
+        'phone': f'+38067{rng.randint(10 ** 6, 10 ** 7 - 1)}',
+    }
+
+
+def generate_corpus(case: str, rows: int, seed: int = 42) -> bytes:
+    """Детермінований синтетичний файл для випадку 'case'."""
+    rng = random.Random(seed)
+    records = [_record(rng, i) for i in range(rows)]
+
+    if case.startswith('csv'):
+        delimiter = ';' if 'semicolon' in case else ','
+        encoding = 'cp1251' if 'cp1251' in case else 'utf-8'
+        out = io.StringIO()
+        writer = csv.writer(out, delimiter=delimiter)
+        writer.writerow(['Назва ОСББ', 'Код ЄДРПОУ', 'Юридична адреса', 'Місто', 'Телефон'])
+        for r in records:
+            writer.writerow([r['name'], r['edrpou'], f"{r['street']}, {r['house']}", r['city'], r['phone']])
+        return out.getvalue().encode(encoding, errors='ignore')
+
+    if case == 'geojson_features':
+        features = []
+        for r in records:
+            lon, lat = 24 + rng.random() * 10, 48 + rng.random() * 4
+            ring = [[lon + rng.random() * 1e-3, lat + rng.random() * 1e-3] for _ in range(24)]
+            features.append({
+                'type': 'Feature',
+                'properties': {
+                    'name_osbb': r['name'], 'osbb_edrpoy': r['edrpou'],
+                    'address_thoroughfare': r['street'], 'address_locator_designator': r['house'],
+                    'addressPostName': r['city'], 'osbb_phone': r['phone'],
+                },
+                'geometry': {'type': 'Polygon', 'coordinates': [ring + [ring[0]]]},
+            })
+        return json.dumps({'type': 'FeatureCollection', 'features': features}, ensure_ascii=False).encode('utf-8')
+
+    if case.startswith('json_nested'):
+        key = case.rsplit('_', 1)[1]
+        items = [
+            {'entityName': r['name'], 'EDRPOU': r['edrpou'], 'LegalAddress': f"{r['street']}, {r['house']}",
+             'city': r['city'], 'Phone': r['phone']}
+            for r in records
+        ]
+        return json.dumps({'meta': {'total': rows}, key: items}, ensure_ascii=False).encode('utf-8')
+
+    if case == 'xlsx':
+        import openpyxl
+
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        sheet.append(['Назва', 'ЄДРПОУ', 'Вулиця', 'Номер будинку', 'Місто', 'Телефон'])
+        for r in records:
+            sheet.append([r['name'], int(r['edrpou']) if r['edrpou'] else None, r['street'], r['house'], r['city'], r['phone']])
+        out = io.BytesIO()
+        workbook.save(out)
+        return out.getvalue()
+
+    raise ValueError(f'Невідомий випадок: {case}')
+
+
+def _max_rss_mb() -> float:
+    # ru_maxrss у кілобайтах на Linux і в байтах на macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def run_case(path: str, data_format: str, mode: str) -> dict:
+    """Вимірювання в поточному (окремому) процесі."""
+    from osbb_crawler.processors import process_file_content
+
+    with open(path, 'rb') as f:
+        raw_content = f.read()
+    rss_before = _max_rss_mb()
+
+    started = time.perf_counter()
+    first_item = None
+    count = 0
+    streaming = mode in ('streaming', 'vectorized_streaming')
+    vectorized = mode in ('vectorized', 'vectorized_streaming')
+    for _ in process_file_content(raw_content, data_format, 'bench', streaming=streaming, vectorized=vectorized):
+        if first_item is None:
+            first_item = time.perf_counter() - started
+        count += 1
+    elapsed = time.perf_counter() - started
+
+    return {
+        'items': count,
+        'seconds': round(elapsed, 4),
+        'rows_per_sec': round(count / elapsed, 1) if elapsed else None,
+        'time_to_first_item': round(first_item, 4) if first_item is not None else None,
+        'peak_rss_mb': round(_max_rss_mb(), 1),
+        'peak_rss_delta_mb': round(_max_rss_mb() - rss_before, 1),
+        'input_mb': round(len(raw_content) / 1e6, 2),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=PROJECT_DIR, text=True).strip()
+    except Exception:
+        return None
+
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Випадки, де рядків/с стало менше за baseline більш ніж на 'threshold'."""
+    regressions = []
+    for name, result in results['cases'].items():
+        old = baseline.get('cases', {}).get(name)
+        if not old or not old.get('rows_per_sec') or not result.get('rows_per_sec'):
+            continue
+        change = result['rows_per_sec'] / old['rows_per_sec'] - 1
+        print(f"{name:40s} {old['rows_per_sec']:>12,.0f} -> {result['rows_per_sec']:>12,.0f} rows/s ({change:+.1%})")
+        if change < -threshold:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Бенчмарк process_file_content')
+    parser.add_argument('--rows', type=int, default=50000, help='рядків у кожному корпусі (XLSX — десята частина)')
+    parser.add_argument('--cases', nargs='*', default=list(CASES), choices=list(CASES))
+    parser.add_argument('--modes', nargs='*', default=['inmemory', 'streaming'], choices=MODES)
+    parser.add_argument('--repeat', type=int, default=3, help='запусків на випадок (береться найкращий)')
+    parser.add_argument('--corpus-dir', default=os.path.join(PROJECT_DIR, '.bench_corpus'))
+    parser.add_argument('--output', default='bench_results.json')
+    parser.add_argument('--compare', help='попередній JSON з результатами для порівняння')
+    parser.add_argument('--threshold', type=float, default=0.1, help='допустиме падіння рядків/с (0.1 = 10%%)')
+    parser.add_argument('--generate', nargs=3, metavar=('CASE', 'ROWS', 'PATH'), help=argparse.SUPPRESS)
+    parser.add_argument('--run-one', nargs=3, metavar=('PATH', 'FORMAT', 'MODE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.generate:
+        case, rows, path = args.generate
+        with open(path, 'wb') as f:
+            f.write(generate_corpus(case, int(rows)))
+        return
+
+    if args.run_one:
+        path, data_format, mode = args.run_one
+        print(json.dumps(run_case(path, data_format, mode)))
+        return
+
+    os.makedirs(args.corpus_dir, exist_ok=True)
+    results = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'rows': args.rows,
+        'cases': {},
+    }
+
+    for case in args.cases:
+        data_format, extension = CASES[case]
+        rows = args.rows // 10 if case == 'xlsx' else args.rows
+        path = os.path.join(args.corpus_dir, f'{case}_{rows}.{extension}')
+        if not os.path.exists(path):
+            # Генеруємо в окремому процесі: ru_maxrss успадковується через exec,
+            # тож великий корпус у пам'яті батька зіпсував би виміри RSS
+            subprocess.check_call([sys.executable, os.path.abspath(__file__), '--generate', case, str(rows), path])
+
+        for mode in args.modes:
+            # Кілька запусків, береться найшвидший (менше шуму від планувальника)
+            runs = []
+            for _ in range(args.repeat):
+                output = subprocess.check_output(
+                    [sys.executable, os.path.abspath(__file__), '--run-one', path, data_format, mode],
+                    text=True,
+                )
+                runs.append(json.loads(output.strip().splitlines()[-1]))
+            result = min(runs, key=lambda run: run['seconds'])
+            result['runs'] = len(runs)
+            name = f'{case}/{mode}'
+            results['cases'][name] = result
+            print(f"{name:40s} {result['items']:>8} items {result['rows_per_sec']:>12,.0f} rows/s "
+                  f"first {result['time_to_first_item']}s  peak RSS {result['peak_rss_mb']} MB "
+                  f"(+{result['peak_rss_delta_mb']})")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f'Результати збережено: {args.output}')
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"!!! Регресія швидкості: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+# osbb_crawler/benchmarks/bench_query.py
+"""
+Навантажувальний бенчмарк сервісу запитів (query.QueryService): синтетичні
+результати обходу (JSON Lines) завантажуються в індекс, сервіс піднімається
+на вільному порту, і кілька клієнтів з keep-alive з'єднаннями шлють суміш
+запитів: ЄДРПОУ, адреса в іншому написанні, пошук за префіксом назви, назва
+з містом, фасети. Сервіс працює в окремому процесі (python -m
+osbb_crawler.query), щоб клієнти не ділили з ним GIL. Для кожного типу
+запиту — p50/p99 затримки; окремо — час запуску з побудовою індексу і
+час від зміни файлу до гарячого перезавантаження.
+
+    cd osbb_crawler
+    python benchmarks/bench_query.py --records 200000 --requests 20000 --output bench_query.json
+"""
+import argparse
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from urllib.parse import quote, urlencode
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from osbb_crawler.address import address_key, normalize_address  # noqa: E402
+
+STREETS = ['вул. Шевченка', 'вул. Грушевського', 'просп. Миру', 'вул. Соборна', 'бульв. Лесі Українки',
+           'вул. Замостянська', 'вул. Келецька', 'вул. Пирогова', 'вул. Хмельницьке шосе', 'вул. Театральна']
+CITIES = ['Київ', 'Львів', 'Вінниця', 'Луцьк', 'Ужгород', 'Хмельницький', 'Житомир', 'Полтава']
+REGIONS = ['Київська', 'Львівська', 'Вінницька', 'Волинська', 'Закарпатська', 'Хмельницька', 'Житомирська',
+           'Полтавська']
+WORDS = ['Затишок', 'Надія', 'Світанок', 'Каштан', 'Оберіг', 'Злагода', 'Мрія', 'Добробут', 'Комфорт', 'Сонячний',
+         'Лелека', 'Калина', 'Світлиця', 'Явір', 'Джерело', 'Берегиня']
+
+
+def make_records(rng, count: int) -> list:
+    records = []
+    for i in range(count):
+        city = rng.randrange(len(CITIES))
+        address = f'{rng.choice(STREETS)}, {rng.randint(1, 300)}{rng.choice(["", "", "А", "Б"])}'
+        records.append({
+            'name': f'ОСББ "{rng.choice(WORDS)} {rng.choice(WORDS)}-{i % 997}"',
+            'edrpou': str(10 ** 7 + i * 37),
+            'address': normalize_address(address),
+            'address_key': address_key(address, CITIES[city]),
+            'city': CITIES[city],
+            'region': REGIONS[city],
+            'phone': f'+38067{rng.randint(10 ** 6, 10 ** 7 - 1)}',
+            'email': '',
+            'source_dataset_url': f'https://data.gov.ua/dataset/{rng.randrange(300)}',
+        })
+    return records
+
+
+def make_queries(rng, records: list, count: int) -> list:
+    queries = []
+    for _ in range(count):
+        record = rng.choice(records)
+        kind = rng.choice(('edrpou', 'address', 'name_prefix', 'name_city', 'facets'))
+        if kind == 'edrpou':
+            path = f'/edrpou/{record["edrpou"]}'
+        elif kind == 'address':
+            # Інше написання тієї самої адреси
+            street, house = record['address'].split(', ')
+            path = '/address?' + urlencode({'q': f'{street.split(". ", 1)[-1]} буд. {house}', 'city': record['city']})
+        elif kind == 'name_prefix':
+            path = '/search?' + urlencode({'name': rng.choice(WORDS)[:4], 'limit': 20})
+        elif kind == 'name_city':
+            path = '/search?' + urlencode({'name': rng.choice(WORDS), 'city': record['city'], 'limit': 20})
+        else:
+            path = f'/facets?field={quote(rng.choice(("city", "region")))}'
+        queries.append((kind, path))
+    return queries
+
+
+def run_client(port: int, queries: list, timings: list):
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    for kind, path in queries:
+        started = time.perf_counter()
+        conn.request('GET', path)
+        response = conn.getresponse()
+        response.read()
+        timings.append((kind, time.perf_counter() - started, response.status))
+    conn.close()
+
+
+def percentile(values: list, share: float) -> float:
+    return round(values[min(len(values) - 1, int(len(values) * share))] * 1000, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=200000)
+    parser.add_argument('--requests', type=int, default=20000)
+    parser.add_argument('--clients', type=int, default=4)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='JSON-файл для результатів')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    records = make_records(rng, args.records)
+    results = {'records': args.records, 'requests': args.requests, 'clients': args.clients}
+
+    with tempfile.TemporaryDirectory() as directory:
+        source = os.path.join(directory, 'osbb.jl')
+        with open(source, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+        with socket.socket() as probe:
+            probe.bind(('127.0.0.1', 0))
+            port = probe.getsockname()[1]
+        started = time.perf_counter()
+        service = subprocess.Popen(
+            [sys.executable, '-m', 'osbb_crawler.query', source, '--port', str(port), '--reload-interval', '0.2'],
+            cwd=PROJECT_DIR, stderr=subprocess.DEVNULL,
+        )
+        try:
+            status = wait_for_status(port)
+            results['startup_s'] = round(time.perf_counter() - started, 2)
+            results['service_rss_mb'] = service_rss_mb(service.pid)
+            run_load(port, records, status, args, rng, results, source)
+        finally:
+            service.terminate()
+            service.wait()
+
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+
+def wait_for_status(port: int) -> dict:
+    while True:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port)
+            conn.request('GET', '/status')
+            return json.loads(conn.getresponse().read())
+        except OSError:
+            time.sleep(0.1)
+
+
+def service_rss_mb(pid: int) -> float | None:
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def run_load(port, records, status, args, rng, results, source):
+    if status['records'] != len(records):
+        raise RuntimeError(f"Сервіс завантажив {status['records']} записів замість {len(records)}")
+
+    queries = make_queries(rng, records, args.requests)
+    timings = []
+    clients = [
+        threading.Thread(target=run_client, args=(port, queries[i::args.clients], timings))
+        for i in range(args.clients)
+    ]
+    started = time.perf_counter()
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    results['requests_per_s'] = round(len(timings) / (time.perf_counter() - started))
+    results['errors'] = sum(1 for _, _, status in timings if status != 200)
+
+    by_kind = {}
+    for kind, elapsed, _ in timings:
+        by_kind.setdefault(kind, []).append(elapsed)
+    by_kind['all'] = [elapsed for _, elapsed, _ in timings]
+    results['latency_ms'] = {
+        kind: {'p50': percentile(sorted(values), 0.5), 'p99': percentile(sorted(values), 0.99)}
+        for kind, values in sorted(by_kind.items())
+    }
+
+    # Гаряче перезавантаження: новий "обхід" дописує записи
+    with open(source, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(dict(records[0], edrpou='99999999'), ensure_ascii=False) + '\n')
+    started = time.perf_counter()
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    while True:
+        conn.request('GET', '/edrpou/99999999')
+        if json.loads(conn.getresponse().read())['total']:
+            break
+        time.sleep(0.05)
+    results['reload_s'] = round(time.perf_counter() - started, 2)
+
+
+if __name__ == '__main__':
+    main()
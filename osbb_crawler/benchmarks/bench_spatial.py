@@ -0,0 +1,124 @@
+# osbb_crawler/benchmarks/bench_spatial.py
+"""
+Бенчмарк просторового індексу меж (spatial.BoundaryIndex): час побудови і
+завантаження збереженого індексу, час пошуку точки (середній, p50, p99) на
+синтетичних межах — 25 «областей» з тисячами вершин і дірками та по 20
+«міст» у кожній — і для порівняння повний перебір полігонів на вибірці точок.
+
+    cd osbb_crawler
+    python benchmarks/bench_spatial.py --points 300000 --output bench_spatial.json
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+from osbb_crawler.spatial import load_boundary_index  # noqa: E402
+
+
+def _blob(rng, cx, cy, radius, vertices, noise):
+    ring = []
+    for k in range(vertices):
+        angle = 2 * math.pi * k / vertices
+        r = radius * (1 + noise * (rng.random() - 0.5)) * (1 + 0.3 * math.sin(7 * angle))
+        ring.append([cx + r * math.cos(angle), cy + 0.7 * r * math.sin(angle)])
+    ring.append(ring[0])
+    return ring
+
+
+def make_boundaries(rng, region_vertices: int) -> dict:
+    features = []
+    for i in range(5):
+        for j in range(5):
+            cx, cy = 22 + i * 3, 44.5 + j * 1.6
+            rings = [_blob(rng, cx, cy, 1.6, region_vertices, 0.3), _blob(rng, cx + 0.3, cy, 0.3, 300, 0.2)]
+            features.append({'type': 'Feature', 'properties': {'ADM1_UA': f'Область {i}{j}'},
+                             'geometry': {'type': 'Polygon', 'coordinates': rings}})
+            for c in range(20):
+                ring = _blob(rng, cx + rng.uniform(-1, 1), cy + rng.uniform(-0.8, 0.8), 0.08, 400, 0.5)
+                features.append({'type': 'Feature', 'properties': {'ADM4_UA': f'Місто {i}{j}-{c}'},
+                                 'geometry': {'type': 'Polygon', 'coordinates': [ring]}})
+    return {'type': 'FeatureCollection', 'features': features}
+
+
+def brute_force(polygons, x, y) -> int:
+    # Перевірка кожного полігона за правилом парності — без індексу
+    matches = 0
+    for rings in polygons:
+        inside = False
+        for ring in rings:
+            for (ax, ay), (bx, by) in zip(ring, ring[1:]):
+                if (ay > y) != (by > y) and x < ax + (y - ay) * (bx - ax) / (by - ay):
+                    inside = not inside
+        matches += inside
+    return matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--points', type=int, default=300000, help='скільки точок шукати в індексі')
+    parser.add_argument('--brute-points', type=int, default=200, help='скільки точок для повного перебору')
+    parser.add_argument('--region-vertices', type=int, default=4000, help='вершин у межі області')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='JSON-файл для результатів')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    boundaries = make_boundaries(rng, args.region_vertices)
+    results = {'polygons': len(boundaries['features']), 'points': args.points}
+
+    with tempfile.TemporaryDirectory() as directory:
+        boundaries_path = os.path.join(directory, 'boundaries.geojson')
+        index_path = os.path.join(directory, 'boundaries.index')
+        with open(boundaries_path, 'w', encoding='utf-8') as f:
+            json.dump(boundaries, f, ensure_ascii=False)
+
+        started = time.perf_counter()
+        load_boundary_index([boundaries_path], index_path)
+        results['build_s'] = round(time.perf_counter() - started, 3)
+        started = time.perf_counter()
+        index = load_boundary_index([boundaries_path], index_path)
+        results['load_s'] = round(time.perf_counter() - started, 3)
+
+    points = [(rng.uniform(20, 38), rng.uniform(43, 53)) for _ in range(args.points)]
+    timings = []
+    matched = 0
+    lookup = index.lookup
+    clock = time.perf_counter
+    started = clock()
+    for lon, lat in points:
+        point_started = clock()
+        matched += bool(lookup(lon, lat))
+        timings.append(clock() - point_started)
+    total = clock() - started
+    timings.sort()
+    results.update({
+        'matched': matched,
+        'lookups_per_s': round(len(points) / total),
+        'lookup_mean_us': round(total / len(points) * 1e6, 1),
+        'lookup_p50_us': round(timings[len(timings) // 2] * 1e6, 1),
+        'lookup_p99_us': round(timings[int(len(timings) * 0.99)] * 1e6, 1),
+    })
+
+    polygons = [feature['geometry']['coordinates'] for feature in boundaries['features']]
+    started = clock()
+    for lon, lat in points[:args.brute_points]:
+        brute_force(polygons, lon, lat)
+    results['brute_force_mean_us'] = round((clock() - started) / args.brute_points * 1e6, 1)
+
+    for key, value in results.items():
+        print(f'{key:>22}: {value}')
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+# osbb_crawler/address.py
+import re
+from functools import lru_cache
+
+# Типи вулиць: варіант написання (нижній регістр, без крапки) -> канонічне скорочення
+STREET_TYPES = {
+    'вул': 'вул.', 'вулиця': 'вул.', 'ул': 'вул.', 'улица': 'вул.',
+    'просп': 'просп.', 'проспект': 'просп.', 'пр-т': 'просп.', 'пр-кт': 'просп.', 'пр': 'просп.',
+    'пров': 'пров.', 'провулок': 'пров.', 'пер': 'пров.', 'переулок': 'пров.',
+    'бульв': 'бульв.', 'бульвар': 'бульв.', 'бул': 'бульв.', 'б-р': 'бульв.',
+    'пл': 'пл.', 'площа': 'пл.', 'площадь': 'пл.',
+    'наб': 'наб.', 'набережна': 'наб.',
+    'туп': 'туп.', 'тупик': 'туп.',
+    'мкр': 'мкр.', 'мікрорайон': 'мкр.', 'м-н': 'мкр.', 'мр-н': 'мкр.',
+    'шосе': 'шосе', 'узвіз': 'узвіз', 'майдан': 'майдан', 'проїзд': 'проїзд', 'алея': 'алея',
+}
+# Тип, який найчастіше пропускають ('Шевченка, 9' = 'вул. Шевченка, 9'): у ключ не входить
+DEFAULT_STREET_TYPE = 'вул.'
+
+# Частини адреси, які не описують будинок (місто, область, район): у ключ не входять
+_LOCALITY_PREFIXES = ('м', 'місто', 'смт', 'с', 'село', 'обл', 'область', 'р-н', 'район')
+_LOCALITY_SUFFIXES = ('обл', 'область', 'р-н', 'район')
+
+# Латинські літери, схожі на кириличні, у номерах будинків ('9A' латиницею)
+_LATIN_TO_CYRILLIC = str.maketrans('ABCEHIKMOPTXaceiopx', 'АВСЕНІКМОРТХасеіорх')
+
+_QUOTES = str.maketrans({
+    '«': None, '»': None, '"': None, '“': None, '”': None, '„': None,
+    # Апостроф у назвах (Прем'єр) — один символ замість кількох варіантів
+    '’': "'", 'ʼ': "'", '`': "'", '‘': "'", '´': "'",
+    '–': '-', '—': '-', '‑': '-',
+})
+
+_SPACES = re.compile(r'\s+')
+_SPACE_BEFORE_PUNCT = re.compile(r'\s+([,.])')
+# 'вул.Шевченка' -> 'вул. Шевченка'
+_DOT_BEFORE_WORD = re.compile(r'\.(?=[^\s.,\d-])')
+_POSTCODE = re.compile(r'^\d{5}$')
+_HOUSE_PREFIX = re.compile(r'^(?:буд(?:инок)?|б)\.?\s*', re.IGNORECASE)
+# 9, 9А, 9-А, 9 а, 9/2, 9-11, 9А/2 (літера — одна, щоб не з'їсти слово)
+_HOUSE = re.compile(
+    r'^(\d+)(?:\s*-?\s*([^\W\d_])(?![^\W\d_]))?(?:\s*([/-])\s*(\d+[^\W\d_]?))?$'
+)
+# 'корп. 2', 'корпус А', 'к. 2', 'к2' — лише з коротким номером, щоб не сплутати з
+# назвою на 'к' ('Київ', 'Калинова')
+_CORPUS = re.compile(
+    r'^(?:(?:корп(?:ус)?\.?|к\.)\s*|к(?=\d))(\d{1,3}[^\W\d_]?|[^\W\d_]\d{0,2})$', re.IGNORECASE
+)
+
+
+def _clean(address: str) -> str:
+    address = _SPACES.sub(' ', address.translate(_QUOTES)).strip(' ,;')
+    address = _DOT_BEFORE_WORD.sub('. ', address)
+    return _SPACE_BEFORE_PUNCT.sub(r'\1', address).replace(',', ', ').replace(',  ', ', ')
+
+
+def _house(text: str) -> str | None:
+    """'9 - а' -> '9А', '9/2' -> '9/2'; None, якщо це не номер будинку."""
+    match = _HOUSE.match(_HOUSE_PREFIX.sub('', text))
+    if match is None:
+        return None
+    number, letter, separator, tail = match.groups()
+    house = number + (letter or '').upper().translate(_LATIN_TO_CYRILLIC)
+    if tail:
+        house += separator + tail.upper().translate(_LATIN_TO_CYRILLIC)
+    return house
+
+
+def _is_locality(words: list) -> bool:
+    first = words[0].lower().rstrip('.')
+    last = words[-1].lower().rstrip('.')
+    return (len(words) > 1 and first in _LOCALITY_PREFIXES) or last in _LOCALITY_SUFFIXES
+
+
+def _street(words: list) -> tuple:
+    """Слова вулиці -> (канонічний тип або None, назва)."""
+    for position in (0, -1):
+        street_type = STREET_TYPES.get(words[position].lower().rstrip('.'))
+        if street_type and len(words) > 1:
+            del words[position]
+            return street_type, ' '.join(words)
+    return None, ' '.join(words)
+
+
+@lru_cache(maxsize=65536)
+def _classify(part: str) -> tuple:
+    """
+    Що означає одна частина адреси (між комами), без урахування сусідніх.
+    Частин набагато менше, ніж адрес (ті самі вулиці й номери будинків у
+    різних комбінаціях), тому кеш спрацьовує навіть для нових адрес.
+    """
+    if _POSTCODE.match(part):
+        return ('postcode', part)
+    corpus = _CORPUS.match(part)
+    if corpus:
+        return ('corpus', corpus.group(1).upper())
+    house = _house(part)
+    if house:
+        return ('house', house)
+
+    words = part.split(' ')
+    if _is_locality(words):
+        return ('locality',)
+    # 'вул. Шевченка 9а' — номер у тій самій частині, що й вулиця
+    house = ''
+    for size in (3, 2, 1):
+        if len(words) > size:
+            house = _house(' '.join(words[-size:]))
+            if house:
+                words = words[:-size]
+                break
+    return ('street', *_street(words), house or '')
+
+
+def parse_address(address: str, cities=frozenset()) -> tuple:
+    """
+    Розбирає адресу на (тип вулиці, назва вулиці, будинок, решта).
+    Тип — канонічне скорочення з STREET_TYPES або None; будинок — у формі
+    '9А', '9/2', '9А корп. 2' або ''; решта — частини, які не вдалося
+    розпізнати (крім міста, області та поштового індексу). 'cities' —
+    ключі міст (_city_key), які в адресі стоять без 'м.' ('Луцьк, вул.
+    Львівська, 10') і не є вулицею.
+    """
+    street_type, street_name, house, rest = None, '', '', []
+    street_part = house_from_street = None
+    for part in _clean(address).split(', '):
+        if not part or _city_key(part) in cities:
+            continue
+        kind, *value = _classify(part)
+        if kind == 'street' and street_name and street_type is None and value[0] is not None:
+            # Частина без типу перед вулицею з типом — найімовірніше, населений пункт
+            # ('Хмельницький, вул. Проскурівська 1')
+            rest.append(street_part)
+            street_name = ''
+            if house_from_street:
+                house = ''
+        if kind == 'postcode':
+            # Поштовий індекс стоїть перед вулицею; п'ятизначний номер після неї — будинок
+            if street_name and not house:
+                house = value[0]
+        elif kind == 'corpus' and house:
+            house += f' корп. {value[0]}'
+        elif kind == 'house' and not house:
+            house = value[0]
+        elif kind == 'street' and not street_name:
+            street_type, street_name, part_house = value
+            street_part, house_from_street = part, bool(part_house and not house)
+            house = house or part_house
+        elif kind != 'locality':
+            rest.append(part)
+    return street_type, street_name, house, rest
+
+
+def _normalize(address: str, cities=frozenset()) -> tuple:
+    """
+    (адреса в єдиному написанні, ключ 'вулиця|будинок'). Ключ є лише тоді,
+    коли розпізнано і вулицю, і будинок: 'Шевченка' без номера чи 'місто
+    Бровари' не відрізняють один будинок від іншого.
+    """
+    street_type, street_name, house, rest = parse_address(address, cities)
+    if not street_name and not house:
+        return _clean(address), None
+
+    street = ' '.join(filter(None, (street_type, street_name)))
+    display = ', '.join(filter(None, (street, house, *rest)))
+    key_type = '' if street_type in (None, DEFAULT_STREET_TYPE) else street_type.rstrip('.')
+    key_street = ' '.join(filter(None, (key_type, street_name.replace('.', ' '))))
+    if not street_name or not house:
+        return display, None
+    key = f"{' '.join(key_street.split())}|{house}".lower().replace("'", '')
+    return display, key
+
+
+class AddressNormalizer:
+    """
+    Нормалізація адрес із кешем: у межах міста назви вулиць (і цілі адреси)
+    повторюються, тож на сотнях тисяч записів більшість викликів — влучання
+    в LRU-кеш розміру 'cache_size'.
+
+    normalize() повертає адресу в єдиному написанні ('вул. Шевченка, 9А'),
+    key() — канонічний ключ 'місто|вулиця|будинок' для зіставлення записів
+    з різних джерел. Назви міст 'cities' (та місто самого запису), що стоять
+    в адресі окремою частиною, не вважаються вулицею.
+    """
+
+    def __init__(self, cache_size: int = 100000, cities=()):
+        self._normalize = lru_cache(maxsize=cache_size)(_normalize)
+        self._city = lru_cache(maxsize=cache_size)(_city_key)
+        self.cities = frozenset(filter(None, map(_city_key, cities)))
+        # Множини 'cities + місто запису' для кешу нормалізації: одна на місто
+        self._cities_with = lru_cache(maxsize=1024)(lambda city: self.cities | {city} if city else self.cities)
+
+    def normalize(self, address) -> str:
+        return self.normalize_with_key(address)[0]
+
+    def key(self, address, city=None) -> str | None:
+        return self.normalize_with_key(address, city)[1]
+
+    def normalize_with_key(self, address, city=None) -> tuple:
+        """(адреса в єдиному написанні, ключ або None) за один прохід кешу."""
+        if not address:
+            return '', None
+        city = self._city(str(city or ''))
+        display, address_key = self._normalize(str(address), self._cities_with(city))
+        if address_key is None:
+            return display, None
+        return display, f"{city}|{address_key}"
+
+    def cache_info(self):
+        return self._normalize.cache_info()
+
+
+def _city_key(city: str) -> str:
+    words = _clean(city).lower().replace("'", '').split(' ')
+    if len(words) > 1 and words[0].rstrip('.') in _LOCALITY_PREFIXES:
+        words = words[1:]
+    return ' '.join(words)
+
+
+# Спільний екземпляр для коду поза пайплайном (record_key тощо)
+default_normalizer = AddressNormalizer()
+
+
+def normalize_address(address) -> str:
+    return default_normalizer.normalize(address)
+
+
+def address_key(address, city=None) -> str | None:
+    return default_normalizer.key(address, city)
+
+
+def city_key(city) -> str:
+    """Місто так, як воно стоїть у першій частині address_key ('м. Київ' -> 'київ')."""
+    return default_normalizer._city(str(city or ''))
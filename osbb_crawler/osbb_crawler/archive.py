@@ -0,0 +1,271 @@
+# osbb_crawler/archive.py
+import asyncio
+import gzip
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import zlib
+
+from scrapy import signals
+from scrapy.exceptions import IgnoreRequest, NotConfigured
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+from scrapy.utils.project import data_path
+
+from .spool import SPOOL_META_KEY, SPOOL_PATH_META_KEY
+
+logger = logging.getLogger(__name__)
+
+# Режими OSBB_ARCHIVE_MODE
+ARCHIVE_RECORD = 'record'
+ARCHIVE_REPLAY = 'replay'
+
+# Тіла до цього розміру зберігаються стиснутими прямо в індексі, більші — окремими .gz-файлами
+INLINE_BODY_SIZE = 1024 * 1024
+# Частина, якою тіло стискається й розпаковується між файлами
+COPY_CHUNK_SIZE = 1024 * 1024
+# Рівень стиснення gzip/zlib: HTML і CSV стискаються в 5-10 разів уже на 6
+COMPRESSION_LEVEL = 6
+
+
+class ResponseArchive:
+    """
+    Локальний архів відповідей, ключ — відбиток запиту (request fingerprint
+    Scrapy, hex). Архів — каталог з індексом index.sqlite (URL, метод, статус,
+    заголовки, прапорці відповіді) і тілами: невеликі тіла стиснуті zlib у
+    самому індексі, великі (файли даних) — у bodies/<xx>/<відбиток>.gz, тож
+    їх можна стиснути й розпакувати потоково, не тримаючи в пам'яті.
+
+    Повторний запис того самого запиту замінює попередній (наприклад, 503,
+    після якого RetryMiddleware отримав відповідь). Зміни фіксуються
+    пачками по 'batch_size' відповідей і під час закриття.
+    """
+
+    def __init__(self, path: str, batch_size: int = 100):
+        self.path = path
+        self.batch_size = batch_size
+        os.makedirs(os.path.join(path, 'bodies'), exist_ok=True)
+        self.conn = sqlite3.connect(os.path.join(path, 'index.sqlite'))
+        self.conn.executescript('''
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS responses (
+                fingerprint TEXT PRIMARY KEY,
+                method TEXT NOT NULL,
+                url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                flags TEXT NOT NULL,
+                body BLOB,
+                body_file TEXT,
+                body_size INTEGER NOT NULL,
+                archived_at REAL
+            );
+        ''')
+        self.pending = 0
+
+    def get(self, fingerprint: str) -> dict | None:
+        """Відомості про відповідь без тіла (тіло — read_body або extract_body)."""
+        row = self.conn.execute(
+            'SELECT url, status, headers, flags, body, body_file, body_size FROM responses WHERE fingerprint = ?',
+            (fingerprint,),
+        ).fetchone()
+        if row is None:
+            return None
+        return {'url': row[0], 'status': row[1], 'headers': _load_headers(row[2]), 'flags': json.loads(row[3]),
+                'body': row[4], 'body_file': row[5], 'body_size': row[6]}
+
+    def read_body(self, entry: dict) -> bytes:
+        if entry['body_file'] is None:
+            return zlib.decompress(entry['body']) if entry['body'] else b''
+        with gzip.open(os.path.join(self.path, entry['body_file']), 'rb') as f:
+            return f.read()
+
+    def extract_body(self, entry: dict, target_path: str):
+        """Розпаковує тіло з окремого файлу в 'target_path' частинами (можна викликати з іншого потоку)."""
+        with gzip.open(os.path.join(self.path, entry['body_file']), 'rb') as source, open(target_path, 'wb') as target:
+            shutil.copyfileobj(source, target, COPY_CHUNK_SIZE)
+
+    def write_body_file(self, fingerprint: str, body: bytes = b'', source_path: str | None = None) -> tuple:
+        """
+        Стискає тіло (з пам'яті або з файлу 'source_path') в bodies/. Повертає
+        (відносний шлях, розмір тіла). Не торкається індексу, тож може
+        виконуватися в іншому потоці; видимим файл стає після add().
+        """
+        relative = os.path.join('bodies', fingerprint[:2], f'{fingerprint}.gz')
+        target = os.path.join(self.path, relative)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        partial = f'{target}.part'
+        with gzip.open(partial, 'wb', compresslevel=COMPRESSION_LEVEL) as f:
+            if source_path is None:
+                f.write(body)
+                size = len(body)
+            else:
+                with open(source_path, 'rb') as source:
+                    shutil.copyfileobj(source, f, COPY_CHUNK_SIZE)
+                    size = source.tell()
+        os.replace(partial, target)
+        return relative, size
+
+    def add(self, fingerprint: str, method: str, url: str, status: int, headers, flags, body: bytes = b'',
+            body_file: str | None = None, body_size: int | None = None):
+        """Додає відповідь: тіло 'body' (стискається тут) або вже записаний write_body_file() файл."""
+        if body_file is None:
+            body_size = len(body)
+            body = zlib.compress(body, COMPRESSION_LEVEL) if body else None
+        else:
+            body = None
+        self.conn.execute(
+            'INSERT OR REPLACE INTO responses '
+            '(fingerprint, method, url, status, headers, flags, body, body_file, body_size, archived_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (fingerprint, method, url, status, _dump_headers(headers), json.dumps(list(flags or ())),
+             body, body_file, body_size, time.time()),
+        )
+        self.pending += 1
+        if self.pending >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        self.conn.commit()
+        self.pending = 0
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    def __len__(self):
+        return self.conn.execute('SELECT COUNT(*) FROM responses').fetchone()[0]
+
+
+class ArchiveMiddleware:
+    """
+    Downloader middleware для запису й відтворення обходу
+    (OSBB_ARCHIVE_MODE):
+
+    * 'record' — кожна отримана відповідь (сторінки пошуку, сторінки
+      наборів, запити CKAN, HEAD-проби і файли даних, зокрема записані на
+      диск SpoolingDownloadHandler) зберігається в ResponseArchive за
+      відбитком запиту;
+    * 'replay' — відповіді беруться лише з архіву, мережа не
+      використовується: запит, якого немає в архіві, скасовується
+      (IgnoreRequest, статистика osbb/archive/missing). Відповідь з
+      process_request не проходить через слоти завантажувача, тож
+      DOWNLOAD_DELAY і CONCURRENT_REQUESTS_PER_DOMAIN на відтворення не
+      впливають.
+
+    Стоїть поруч із завантажувачем (як HttpCacheMiddleware): зберігається
+    сира відповідь, а перенаправлення, повтори й розпакування при
+    відтворенні виконуються так само, як під час запису. Великі тіла
+    стискаються й розпаковуються в потоці, а не в реакторі, тому потрібен
+    asyncio-реактор. Налаштування: OSBB_ARCHIVE_MODE, OSBB_ARCHIVE_PATH.
+    """
+
+    def __init__(self, crawler, archive: ResponseArchive, mode: str):
+        self.crawler = crawler
+        self.archive = archive
+        self.mode = mode
+        self.spool_threshold = crawler.settings.getint('OSBB_SPOOL_THRESHOLD', 8 * 1024 * 1024)
+        self.spool_dir = None
+        if mode == ARCHIVE_REPLAY:
+            # Великі тіла розпаковуються на диск, як їх записав би SpoolingDownloadHandler
+            self.spool_dir = tempfile.mkdtemp(prefix='osbb-archive-', dir=crawler.settings.get('OSBB_SPOOL_DIR'))
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        mode = settings.get('OSBB_ARCHIVE_MODE')
+        if not mode:
+            raise NotConfigured('OSBB_ARCHIVE_MODE не задано')
+        if mode not in (ARCHIVE_RECORD, ARCHIVE_REPLAY):
+            raise ValueError(f"Невідомий режим OSBB_ARCHIVE_MODE: {mode}")
+        archive = ResponseArchive(settings.get('OSBB_ARCHIVE_PATH') or data_path('osbb_archive', createdir=True))
+        if mode == ARCHIVE_REPLAY:
+            logger.info(f"Відтворення обходу з архіву {archive.path}: {len(archive)} відповідей")
+        middleware = cls(crawler, archive, mode)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+
+    async def process_request(self, request, spider):
+        if self.mode != ARCHIVE_REPLAY:
+            return None
+        stats = self.crawler.stats
+        entry = self.archive.get(self._fingerprint(request))
+        if entry is None:
+            stats.inc_value('osbb/archive/missing')
+            logger.warning(f"Немає в архіві: {request.method} {request.url}")
+            raise IgnoreRequest(f"Відповіді немає в архіві {self.archive.path}")
+
+        body = b''
+        if entry['body_file'] is None:
+            body = self.archive.read_body(entry)
+        elif request.meta.get(SPOOL_META_KEY) and entry['body_size'] > self.spool_threshold:
+            fd, path = tempfile.mkstemp(dir=self.spool_dir, prefix='body-')
+            os.close(fd)
+            await asyncio.to_thread(self.archive.extract_body, entry, path)
+            request.meta[SPOOL_PATH_META_KEY] = path
+        else:
+            body = await asyncio.to_thread(self.archive.read_body, entry)
+
+        stats.inc_value('osbb/archive/replayed')
+        stats.inc_value('osbb/archive/replayed_bytes', entry['body_size'])
+        headers = entry['headers']
+        respcls = responsetypes.from_args(headers=headers, url=entry['url'], body=body[:1024])
+        return respcls(
+            url=entry['url'],
+            status=entry['status'],
+            headers=headers,
+            body=body,
+            flags=entry['flags'] + ['archived'],
+            request=request,
+        )
+
+    async def process_response(self, request, response, spider):
+        if self.mode != ARCHIVE_RECORD or 'archived' in response.flags:
+            return response
+        fingerprint = self._fingerprint(request)
+        spool_path = request.meta.get(SPOOL_PATH_META_KEY)
+        body_file = body_size = None
+        if spool_path is not None:
+            body_file, body_size = await asyncio.to_thread(
+                self.archive.write_body_file, fingerprint, source_path=spool_path,
+            )
+        elif len(response.body) > INLINE_BODY_SIZE:
+            body_file, body_size = await asyncio.to_thread(self.archive.write_body_file, fingerprint, response.body)
+
+        self.archive.add(
+            fingerprint, request.method, response.url, response.status, response.headers, response.flags,
+            body=response.body, body_file=body_file, body_size=body_size,
+        )
+        stats = self.crawler.stats
+        stats.inc_value('osbb/archive/stored')
+        stats.inc_value('osbb/archive/stored_bytes', body_size if body_size is not None else len(response.body))
+        return response
+
+    def spider_closed(self, spider):
+        self.crawler.stats.set_value('osbb/archive/responses', len(self.archive))
+        self.archive.close()
+        if self.spool_dir is not None:
+            shutil.rmtree(self.spool_dir, ignore_errors=True)
+
+    def _fingerprint(self, request) -> str:
+        return self.crawler.request_fingerprinter.fingerprint(request).hex()
+
+
+def _dump_headers(headers) -> str:
+    # Значення заголовків — байти; latin-1 переводить їх у рядок без втрат
+    return json.dumps({
+        name.decode('latin-1'): [value.decode('latin-1') for value in values]
+        for name, values in (headers or {}).items()
+    })
+
+
+def _load_headers(payload: str) -> Headers:
+    return Headers({
+        name.encode('latin-1'): [value.encode('latin-1') for value in values]
+        for name, values in json.loads(payload).items()
+    })
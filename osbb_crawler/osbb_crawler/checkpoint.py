@@ -0,0 +1,257 @@
+# osbb_crawler/checkpoint.py
+import logging
+import pickle
+import sqlite3
+import time
+
+from scrapy import Request, signals
+from scrapy.exceptions import NotConfigured
+from scrapy.utils.project import data_path
+from scrapy.utils.request import request_from_dict
+
+logger = logging.getLogger(__name__)
+
+
+class CrawlCheckpoint:
+    """
+    Постійне сховище (SQLite) завершених одиниць обходу: сторінок пошуку,
+    сторінок наборів і файлів даних. Для кожної одиниці (ключ дає павук,
+    див. checkpoint_key) зберігається все, що повернув її колбек: наступні
+    запити і записи.
+
+    Записи пишуться пачками під час розбору, але стають видимими лише разом
+    з рядком units, який додається після завершення колбеку; зміни
+    фіксуються однією транзакцією на 'batch_size' записів або раз на
+    'flush_interval' секунд. Обірваний обхід втрачає щонайбільше останню
+    незафіксовану пачку — ці одиниці просто обробляться повторно.
+    """
+
+    def __init__(self, path: str, batch_size: int = 5000, flush_interval: float = 10.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript('''
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS units (
+                unit_key TEXT PRIMARY KEY,
+                requests BLOB NOT NULL,
+                item_count INTEGER NOT NULL,
+                completed_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS unit_items (
+                unit_key TEXT NOT NULL,
+                payload BLOB NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS unit_items_key ON unit_items (unit_key);
+        ''')
+        # Записи одиниць, які не встигли завершитися до обриву, не потрібні
+        self.conn.execute('DELETE FROM unit_items WHERE unit_key NOT IN (SELECT unit_key FROM units)')
+        self.conn.commit()
+        self.pending_items = []
+        self.pending_units = 0
+        self.last_flush = time.monotonic()
+
+    def completed_keys(self) -> set:
+        return {key for (key,) in self.conn.execute('SELECT unit_key FROM units')}
+
+    def start_unit(self, key: str):
+        # Залишки попередньої (незавершеної) спроби цієї ж одиниці
+        self._write_items()
+        self.conn.execute('DELETE FROM unit_items WHERE unit_key = ?', (key,))
+
+    def add_item(self, key: str, item):
+        self.pending_items.append((key, pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL)))
+        if len(self.pending_items) >= self.batch_size:
+            self.flush()
+
+    def complete_unit(self, key: str, requests: list, item_count: int):
+        """'requests' — словники Request.to_dict()."""
+        self._write_items()
+        self.conn.execute(
+            'INSERT OR REPLACE INTO units (unit_key, requests, item_count, completed_at) VALUES (?, ?, ?, ?)',
+            (key, pickle.dumps(requests, protocol=pickle.HIGHEST_PROTOCOL), item_count, time.time()),
+        )
+        self.pending_units += 1
+        if self.pending_units >= self.batch_size or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def unit_requests(self, key: str) -> list:
+        row = self.conn.execute('SELECT requests FROM units WHERE unit_key = ?', (key,)).fetchone()
+        return pickle.loads(row[0]) if row else []
+
+    def iter_items(self, key: str, chunk_size: int = 1000):
+        # Частинами за rowid: курсор не тримається відкритим, поки йдуть інші записи
+        last_rowid = 0
+        while True:
+            rows = self.conn.execute(
+                'SELECT rowid, payload FROM unit_items WHERE unit_key = ? AND rowid > ? ORDER BY rowid LIMIT ?',
+                (key, last_rowid, chunk_size),
+            ).fetchall()
+            if not rows:
+                return
+            for last_rowid, payload in rows:
+                yield pickle.loads(payload)
+
+    def flush(self):
+        self._write_items()
+        self.conn.commit()
+        self.pending_units = 0
+        self.last_flush = time.monotonic()
+
+    def clear(self):
+        """Обхід завершився повністю — наступний почнеться спочатку."""
+        self.pending_items = []
+        self.conn.execute('DELETE FROM unit_items')
+        self.conn.execute('DELETE FROM units')
+        self.conn.commit()
+
+    def close(self):
+        self.flush()
+        self.conn.close()
+
+    def _write_items(self):
+        if self.pending_items:
+            self.conn.executemany('INSERT INTO unit_items (unit_key, payload) VALUES (?, ?)', self.pending_items)
+            self.pending_items = []
+
+
+class CheckpointMiddleware:
+    """
+    Spider middleware для відновлення обірваного обходу.
+
+    Після кожного колбеку, для запиту якого павук повертає ключ
+    (spider.checkpoint_key), результат колбеку зберігається в CrawlCheckpoint.
+    Під час наступного запуску запит до одиниці, завершеної в попередньому
+    запуску, не виконується: замість нього віддаються збережені запити й
+    записи (рекурсивно — завершена сторінка пошуку відтворює свої набори,
+    ті — свої файли). Кожна одиниця відтворюється один раз за запуск, тож
+    вихід не дублюється; записи проходять пайплайни як звичайні.
+
+    Якщо обхід завершився повністю (finish_reason 'finished'), сховище
+    очищується. Налаштування: OSBB_CHECKPOINT_ENABLED, OSBB_CHECKPOINT_PATH,
+    OSBB_CHECKPOINT_BATCH_SIZE, OSBB_CHECKPOINT_FLUSH_INTERVAL.
+    """
+
+    def __init__(self, crawler, checkpoint: CrawlCheckpoint):
+        self.crawler = crawler
+        self.checkpoint = checkpoint
+        # Одиниці, завершені в попередніх запусках і ще не відтворені в цьому
+        self.resumable = checkpoint.completed_keys()
+        if self.resumable:
+            logger.info(f"Відновлення обходу: {len(self.resumable)} завершених одиниць у {checkpoint.path}")
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('OSBB_CHECKPOINT_ENABLED', False):
+            raise NotConfigured('OSBB_CHECKPOINT_ENABLED вимкнено')
+        path = settings.get('OSBB_CHECKPOINT_PATH') or data_path('osbb_checkpoint.sqlite', createdir=True)
+        checkpoint = CrawlCheckpoint(
+            path,
+            batch_size=settings.getint('OSBB_CHECKPOINT_BATCH_SIZE', 5000),
+            flush_interval=settings.getfloat('OSBB_CHECKPOINT_FLUSH_INTERVAL', 10.0),
+        )
+        middleware = cls(crawler, checkpoint)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+
+    async def process_start(self, start):
+        async for item_or_request in start:
+            for result in self._expand((item_or_request,)):
+                yield result
+
+    def process_spider_output(self, response, result, spider):
+        unit = self._start_unit(response)
+        for output in result:
+            if unit is not None:
+                unit.add(output)
+            yield from self._expand((output,))
+        if unit is not None:
+            unit.complete()
+
+    async def process_spider_output_async(self, response, result, spider):
+        unit = self._start_unit(response)
+        async for output in result:
+            if unit is not None:
+                unit.add(output)
+            for expanded in self._expand((output,)):
+                yield expanded
+        if unit is not None:
+            unit.complete()
+
+    def spider_closed(self, spider, reason):
+        stats = self.crawler.stats
+        if reason == 'finished':
+            self.checkpoint.clear()
+            logger.info('Обхід завершено повністю, контрольні точки очищено')
+        else:
+            logger.info(f"Обхід перервано ({reason}), контрольні точки збережено: {self.checkpoint.path}")
+        stats.set_value('osbb/checkpoint/resumable_left', len(self.resumable))
+        self.checkpoint.close()
+
+    # --- Внутрішнє ---
+
+    def _key(self, request) -> str | None:
+        key_func = getattr(self.crawler.spider, 'checkpoint_key', None)
+        return key_func(request) if key_func is not None else None
+
+    def _start_unit(self, response):
+        key = self._key(response.request)
+        if key is None:
+            return None
+        return _UnitRecorder(self, key)
+
+    def _expand(self, results):
+        """Замінює запити до завершених одиниць їхніми збереженими результатами."""
+        stack = [iter(results)]
+        while stack:
+            for result in stack[-1]:
+                if isinstance(result, Request):
+                    key = self._key(result)
+                    if key in self.resumable:
+                        self.resumable.discard(key)
+                        stack.append(self._replay(key))
+                        break
+                yield result
+            else:
+                stack.pop()
+
+    def _replay(self, key: str):
+        stats = self.crawler.stats
+        stats.inc_value('osbb/checkpoint/units_replayed')
+        spider = self.crawler.spider
+        for item in self.checkpoint.iter_items(key):
+            stats.inc_value('osbb/checkpoint/items_replayed')
+            yield item
+        for request_dict in self.checkpoint.unit_requests(key):
+            yield request_from_dict(request_dict, spider=spider)
+
+
+class _UnitRecorder:
+    """Збирає результати одного колбеку і фіксує одиницю, якщо колбек завершився."""
+
+    def __init__(self, middleware: CheckpointMiddleware, key: str):
+        self.middleware = middleware
+        self.key = key
+        self.requests = []
+        self.item_count = 0
+        # Колбек, що повторює власний запит (304 без збережених записів), — не завершений
+        self.repeats_itself = False
+        middleware.checkpoint.start_unit(key)
+
+    def add(self, output):
+        if isinstance(output, Request):
+            if self.middleware._key(output) == self.key:
+                self.repeats_itself = True
+            self.requests.append(output.to_dict(spider=self.middleware.crawler.spider))
+        else:
+            self.middleware.checkpoint.add_item(self.key, output)
+            self.item_count += 1
+
+    def complete(self):
+        if self.repeats_itself:
+            return
+        self.middleware.checkpoint.complete_unit(self.key, self.requests, self.item_count)
+        self.middleware.crawler.stats.inc_value('osbb/checkpoint/units_completed')
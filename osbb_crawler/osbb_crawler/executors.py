@@ -0,0 +1,217 @@
+# osbb_crawler/executors.py
+import asyncio
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from queue import Empty, Full
+
+from .instrumentation import ParseStats
+from .processors import process_file_content
+from .spool import close_spooled, open_spooled
+
+# Режими виконання парсингу файлів
+EXECUTOR_INLINE = 'inline'
+EXECUTOR_THREAD = 'thread'
+EXECUTOR_PROCESS = 'process'
+
+# На скільки пачок процес розбору може випередити краулер (далі чекає)
+PROCESS_QUEUE_BATCHES = 2
+# Як часто (секунди) сторони черги перевіряють, чи інша сторона ще працює
+PROCESS_QUEUE_POLL = 0.5
+
+
+def _next_batch(records, batch_size: int) -> list:
+    """
+    Просуває генератор парсера на 'batch_size' записів (виконується у потоці пулу).
+    """
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            break
+    return batch
+
+
+def _parse_to_queue(queue, cancelled, raw_content: bytes, data_format: str, source_url: str, streaming: bool,
+                    vectorized: bool = False, spool_path: str | None = None, batch_size: int = 500) -> ParseStats:
+    """
+    Розбір файлу в окремому процесі. OsbbRecord (кортежі дешево серіалізуються
+    назад у процес краулера) надсилаються в 'queue' пачками по 'batch_size'
+    у міру розбору, наприкінці — None. Черга обмежена, тож розбір не
+    випереджає краулер більш ніж на PROCESS_QUEUE_BATCHES пачок; якщо краулер
+    перестав читати ('cancelled'), розбір припиняється. Повертає лічильники
+    розбору (ParseStats).
+    Якщо тіло записане на диск ('spool_path'), процес відкриває файл сам,
+    і вміст не передається між процесами.
+    """
+    if spool_path is not None:
+        raw_content = open_spooled(spool_path)
+    stats = ParseStats()
+    records = process_file_content(
+        raw_content, data_format, source_url, streaming=streaming, stats=stats, vectorized=vectorized
+    )
+    try:
+        while not cancelled.is_set():
+            batch = _next_batch(records, batch_size)
+            if not batch:
+                break
+            _put(queue, batch, cancelled)
+    finally:
+        _put(queue, None, cancelled)
+        # Генератор тримає буфер файлу, тож закриваємо його перед файлом
+        records.close()
+        if spool_path is not None:
+            close_spooled(raw_content)
+    return stats
+
+
+def _put(queue, item, cancelled):
+    while not cancelled.is_set():
+        try:
+            queue.put(item, timeout=PROCESS_QUEUE_POLL)
+            return
+        except Full:
+            continue
+
+
+class ParseExecutor:
+    """
+    Виконує process_file_content поза потоком реактора Twisted.
+
+    * 'inline'  — як раніше, прямо в реакторі;
+    * 'thread'  — у пулі потоків; записи повертаються пачками по мірі розбору;
+    * 'process' — у пулі процесів; записи теж повертаються пачками по мірі
+      розбору (через чергу multiprocessing.Manager).
+
+    У статистику пише, скільки часу парсинг займав потік реактора
+    ('osbb/parse/reactor_seconds') і скільки — пул ('osbb/parse/worker_seconds').
+    Той самий час розбору додається до parse_stats.parse_seconds файлу.
+    """
+
+    def __init__(self, mode: str = EXECUTOR_THREAD, size: int = 2, batch_size: int = 500, crawler=None):
+        if mode not in (EXECUTOR_INLINE, EXECUTOR_THREAD, EXECUTOR_PROCESS):
+            raise ValueError(f"Невідомий режим OSBB_PARSE_EXECUTOR: {mode}")
+        self.mode = mode
+        self.size = size
+        self.batch_size = batch_size
+        self.crawler = crawler
+        self._pool = None
+        self._manager = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        return cls(
+            mode=settings.get('OSBB_PARSE_EXECUTOR', EXECUTOR_THREAD),
+            size=settings.getint('OSBB_PARSE_EXECUTOR_SIZE', 2),
+            batch_size=settings.getint('OSBB_PARSE_BATCH_SIZE', 500),
+            crawler=crawler,
+        )
+
+    def _get_pool(self):
+        if self._pool is None:
+            if self.mode == EXECUTOR_PROCESS:
+                self._pool = ProcessPoolExecutor(max_workers=self.size)
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.size, thread_name_prefix='osbb-parse')
+        return self._pool
+
+    def _get_manager(self):
+        # Черги Manager, на відміну від multiprocessing.Queue, можна передати в задачу пулу
+        if self._manager is None:
+            self._manager = multiprocessing.Manager()
+        return self._manager
+
+    async def iter_records(self, raw_content: bytes, data_format: str, source_url: str, streaming: bool = False,
+                           parse_stats: ParseStats | None = None, vectorized: bool = False,
+                           spool_path: str | None = None):
+        """
+        Асинхронний генератор OsbbRecord для колбеку павука.
+        """
+        if parse_stats is None:
+            parse_stats = ParseStats()
+
+        if self.mode == EXECUTOR_INLINE:
+            records = process_file_content(
+                raw_content, data_format, source_url, streaming=streaming, stats=parse_stats, vectorized=vectorized
+            )
+            while True:
+                started = time.perf_counter()
+                batch = _next_batch(records, self.batch_size)
+                elapsed = time.perf_counter() - started
+                parse_stats.parse_seconds += elapsed
+                self._inc('osbb/parse/reactor_seconds', elapsed)
+                if not batch:
+                    return
+                for record in batch:
+                    yield record
+
+        pool = self._get_pool()
+
+        if self.mode == EXECUTOR_PROCESS:
+            manager = self._get_manager()
+            queue = manager.Queue(PROCESS_QUEUE_BATCHES)
+            cancelled = manager.Event()
+            started = time.perf_counter()
+            future = pool.submit(
+                _parse_to_queue, queue, cancelled,
+                None if spool_path is not None else raw_content,
+                data_format, source_url, streaming, vectorized, spool_path, self.batch_size,
+            )
+            try:
+                while True:
+                    batch = await self._get_batch(queue, future)
+                    if batch is None:
+                        break
+                    for record in batch:
+                        yield record
+                worker_stats = await asyncio.wrap_future(future)
+            finally:
+                # Краулер перестав читати (або розбір завершено) — процес не чекає на чергу
+                cancelled.set()
+            elapsed = time.perf_counter() - started
+            worker_stats.parse_seconds = elapsed
+            parse_stats.merge(worker_stats)
+            self._inc('osbb/parse/worker_seconds', elapsed)
+            return
+
+        records = process_file_content(
+            raw_content, data_format, source_url, streaming=streaming, stats=parse_stats, vectorized=vectorized
+        )
+        while True:
+            started = time.perf_counter()
+            batch = await asyncio.wrap_future(pool.submit(_next_batch, records, self.batch_size))
+            elapsed = time.perf_counter() - started
+            parse_stats.parse_seconds += elapsed
+            self._inc('osbb/parse/worker_seconds', elapsed)
+            if not batch:
+                return
+            for record in batch:
+                yield record
+
+    async def _get_batch(self, queue, future):
+        """
+        Наступна пачка з черги процесу (None — кінець). Чекання — у потоці,
+        щоб не блокувати реактор; якщо процес завершився, не надіславши
+        кінця черги (помилка до початку розбору), його виняток піднімається тут.
+        """
+        while True:
+            try:
+                return await asyncio.to_thread(queue.get, True, PROCESS_QUEUE_POLL)
+            except Empty:
+                if future.done():
+                    future.result()
+                    return None
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+
+    def _inc(self, key: str, value: float):
+        # crawler.stats з'являється лише після старту краулу, тому беремо його тут
+        if self.crawler is not None:
+            self.crawler.stats.inc_value(key, value)
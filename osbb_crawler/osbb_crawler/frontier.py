@@ -0,0 +1,411 @@
+# osbb_crawler/frontier.py
+import heapq
+import itertools
+import logging
+import math
+import os
+import pickle
+import socket
+import sqlite3
+import time
+from weakref import WeakKeyDictionary
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from scrapy.utils.misc import load_object
+from scrapy.utils.project import data_path
+from scrapy.utils.reactor import CallLaterOnce
+from scrapy.utils.request import request_from_dict
+
+logger = logging.getLogger(__name__)
+
+# Стани запиту в черзі
+QUEUED, LEASED, DONE = 0, 1, 2
+
+# Номер виданого запиту у фронтирі (Request.meta): повтори й перенаправлення його успадковують
+LEASE_META_KEY = 'osbb_frontier_lease'
+
+# Сигнал FrontierMiddleware: колбек запиту з 'request' повністю віддав свої результати
+lease_completed = object()
+
+
+class SqliteFrontier:
+    """
+    Спільна черга запитів (фронтир) для кількох процесів обходу у файлі
+    SQLite. Інтерфейс, який використовує SharedFrontierScheduler (і який має
+    реалізувати інше сховище, див. OSBB_FRONTIER_CLASS):
+
+    push(fingerprint, priority, payload, worker) -> id або None, якщо запит з
+    таким відбитком уже був; lease(worker) -> (id, payload) або None;
+    complete(request_id, worker); open_worker(worker); heartbeat(worker, busy);
+    live_workers(); has_work(worker); close_worker(worker, finished); close().
+
+    Відбиток запиту унікальний у межах обходу — це й спільний dupefilter:
+    жоден воркер не завантажить той самий набір удруге. Запити з dont_filter
+    зберігаються без відбитка. Виданий запит закривається (complete), щойно
+    колбек віддав усі результати його відповіді. Якщо воркер упав або
+    перерваний (немає heartbeat довше за 'lease_timeout'), у чергу
+    повертаються лише незакриті запити — ті, що були в роботі; оброблені
+    повторно не завантажуються. Запити, завантаження яких не вдалося
+    (колбек не викликався, записів немає), лишаються виданими до кінця
+    обходу воркера і після падіння виконуються ще раз.
+    """
+
+    def __init__(self, path: str, lease_timeout: float = 300.0):
+        self.path = path
+        self.lease_timeout = lease_timeout
+        # Автокоміт: кожна операція — окрема коротка транзакція, блокування
+        # файлу між процесами тримається якомога менше
+        self.conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self.conn.executescript('''
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            CREATE TABLE IF NOT EXISTS requests (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                fingerprint TEXT UNIQUE,
+                priority INTEGER NOT NULL,
+                payload BLOB,
+                state INTEGER NOT NULL,
+                worker TEXT
+            );
+            CREATE INDEX IF NOT EXISTS requests_queue ON requests (state, priority, id);
+            CREATE TABLE IF NOT EXISTS workers (
+                worker TEXT PRIMARY KEY,
+                heartbeat REAL NOT NULL,
+                busy INTEGER NOT NULL,
+                closed INTEGER NOT NULL
+            );
+        ''')
+
+    @classmethod
+    def from_settings(cls, settings):
+        path = settings.get('OSBB_FRONTIER_PATH') or data_path('osbb_frontier.sqlite', createdir=True)
+        return cls(path, lease_timeout=settings.getfloat('OSBB_FRONTIER_LEASE_TIMEOUT', 300.0))
+
+    def push(self, fingerprint: str | None, priority: int, payload: bytes | None, worker: str | None = None):
+        """
+        Додає запит у чергу. Без 'payload' запит лише позначається баченим
+        (його виконує сам 'worker' — запит не серіалізується).
+        """
+        state, worker = (QUEUED, None) if payload is not None else (DONE, worker)
+        cursor = self.conn.execute(
+            'INSERT OR IGNORE INTO requests (fingerprint, priority, payload, state, worker) VALUES (?, ?, ?, ?, ?)',
+            (fingerprint, priority, payload, state, worker),
+        )
+        return cursor.lastrowid if cursor.rowcount else None
+
+    def lease(self, worker: str):
+        """Видає воркеру запит з найвищим пріоритетом (серед рівних — найновіший, як LIFO Scrapy)."""
+        self.conn.execute('BEGIN IMMEDIATE')
+        leased = self.conn.execute('''
+            UPDATE requests SET state = ?, worker = ?
+            WHERE id = (SELECT id FROM requests WHERE state = ? ORDER BY priority DESC, id DESC LIMIT 1)
+            RETURNING id, payload
+        ''', (LEASED, worker, QUEUED)).fetchone()
+        if leased is not None:
+            # Разом із видачею: інші воркери не повинні побачити порожню чергу і простій
+            self.conn.execute('UPDATE workers SET busy = 1 WHERE worker = ?', (worker,))
+        self.conn.execute('COMMIT')
+        return leased
+
+    def complete(self, request_id: int, worker: str) -> bool:
+        """Закриває виданий запит; запит, уже повернутий у чергу як запит мертвого воркера, не змінюється."""
+        return self.conn.execute(
+            'UPDATE requests SET state = ? WHERE id = ? AND state = ? AND worker = ?',
+            (DONE, request_id, LEASED, worker),
+        ).rowcount > 0
+
+    def open_worker(self, worker: str):
+        """Реєструє воркер; запити, видані воркеру з тим самим id до перезапуску, — знову в черзі."""
+        self.conn.execute(
+            'UPDATE requests SET state = ?, worker = NULL WHERE state = ? AND worker = ?',
+            (QUEUED, LEASED, worker),
+        )
+        self.heartbeat(worker, busy=False)
+
+    def heartbeat(self, worker: str, busy: bool):
+        """Позначає воркер живим і повертає в чергу запити воркерів, що впали."""
+        now = time.time()
+        self.conn.execute('''
+            INSERT INTO workers (worker, heartbeat, busy, closed) VALUES (?, ?, ?, 0)
+            ON CONFLICT (worker) DO UPDATE SET heartbeat = excluded.heartbeat, busy = excluded.busy, closed = 0
+        ''', (worker, now, int(busy)))
+
+        dead = [row[0] for row in self.conn.execute(
+            'SELECT worker FROM workers WHERE closed = 0 AND heartbeat < ?', (now - self.lease_timeout,)
+        )]
+        for dead_worker in dead:
+            self.conn.execute('BEGIN IMMEDIATE')
+            requeued = self.conn.execute(
+                'UPDATE requests SET state = ?, worker = NULL WHERE state = ? AND worker = ?',
+                (QUEUED, LEASED, dead_worker),
+            ).rowcount
+            self.conn.execute('UPDATE workers SET closed = 1, busy = 0 WHERE worker = ?', (dead_worker,))
+            self.conn.execute('COMMIT')
+            logger.warning(f"Воркер {dead_worker} не відповідає, {requeued} його запитів повернуто в чергу")
+
+    def live_workers(self) -> int:
+        since = time.time() - self.lease_timeout
+        return self.conn.execute(
+            'SELECT COUNT(*) FROM workers WHERE closed = 0 AND heartbeat >= ?', (since,)
+        ).fetchone()[0]
+
+    def has_work(self, worker: str) -> bool:
+        """
+        Чи може ще з'явитися робота: є запити в черзі або інший живий
+        воркер зайнятий (його відповіді можуть дати нові запити).
+        """
+        since = time.time() - self.lease_timeout
+        return bool(self.conn.execute('''
+            SELECT EXISTS (SELECT 1 FROM requests WHERE state = ?)
+                OR EXISTS (SELECT 1 FROM workers WHERE worker != ? AND closed = 0 AND busy = 1 AND heartbeat >= ?)
+        ''', (QUEUED, worker, since)).fetchone()[0])
+
+    def close_worker(self, worker: str, finished: bool):
+        """
+        Обхід воркера завершився повністю ('finished') — незакриті видані
+        йому запити (невдалі завантаження) теж вважаються обробленими;
+        інакше вони повертаються в чергу для наступного запуску.
+        Коли останній воркер завершує повний обхід, черга очищується, і
+        наступний запуск починає обхід заново.
+        """
+        self.conn.execute('BEGIN IMMEDIATE')
+        self.conn.execute(
+            'UPDATE requests SET state = ?, worker = NULL WHERE state = ? AND worker = ?',
+            (DONE if finished else QUEUED, LEASED, worker),
+        )
+        self.conn.execute('UPDATE workers SET closed = 1, busy = 0 WHERE worker = ?', (worker,))
+        others = self.conn.execute('SELECT COUNT(*) FROM workers WHERE closed = 0').fetchone()[0]
+        queued = self.conn.execute(
+            'SELECT COUNT(*) FROM requests WHERE state IN (?, ?)', (QUEUED, LEASED)
+        ).fetchone()[0]
+        cleared = finished and not others and not queued
+        if cleared:
+            self.conn.execute('DELETE FROM requests')
+            self.conn.execute('DELETE FROM workers')
+        self.conn.execute('COMMIT')
+        return cleared
+
+    def close(self):
+        self.conn.close()
+
+
+class SharedFrontierScheduler:
+    """
+    Планувальник Scrapy поверх спільного фронтиру (SqliteFrontier або
+    OSBB_FRONTIER_CLASS): кілька процесів 'scrapy crawl osbb_registry' з
+    однаковим OSBB_FRONTIER_PATH ділять між собою одну чергу запитів.
+
+    Запити серіалізуються через Request.to_dict(); запит, який не
+    серіалізується (колбек — не метод павука), лишається в локальній черзі
+    воркера, але його відбиток усе одно реєструється у фронтирі.
+
+    Ввічливість до доменів спільна: затримка слотів завантажувача множиться,
+    а паралельність ділиться на кількість живих воркерів, тож разом вони
+    навантажують домен не більше, ніж один процес з тими ж DOWNLOAD_DELAY і
+    CONCURRENT_REQUESTS_PER_DOMAIN.
+    """
+
+    # Як часто перевіряти, чи звільнився воркер, що відмовився брати запити,
+    # і чи з'явилися в черзі нові запити, коли їх немає
+    BACKLOG_POLL_INTERVAL = 0.2
+    IDLE_POLL_INTERVAL = 1.0
+
+    def __init__(self, crawler, frontier, worker: str, heartbeat_interval: float = 5.0, max_active: int = 4):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.frontier = frontier
+        self.worker = worker
+        self.heartbeat_interval = heartbeat_interval
+        self.max_active = max_active
+        self.workers = 1
+        # Слот завантажувача -> (кількість воркерів, під яку його налаштовано, власна паралельність)
+        self.throttled = WeakKeyDictionary()
+        self.last_heartbeat = 0.0
+        self.busy = False
+        self.local = []
+        self._local_order = itertools.count()
+        self._wakeup = CallLaterOnce(self._wake)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        frontier_cls = load_object(settings.get('OSBB_FRONTIER_CLASS') or SqliteFrontier)
+        worker = settings.get('OSBB_FRONTIER_WORKER_ID') or f'{socket.gethostname()}:{os.getpid()}'
+        scheduler = cls(
+            crawler,
+            frontier_cls.from_settings(settings),
+            worker,
+            heartbeat_interval=settings.getfloat('OSBB_FRONTIER_HEARTBEAT_INTERVAL', 5.0),
+            max_active=settings.getint('OSBB_FRONTIER_MAX_ACTIVE', 4),
+        )
+        crawler.signals.connect(scheduler.request_reached_downloader, signal=signals.request_reached_downloader)
+        crawler.signals.connect(scheduler.lease_completed, signal=lease_completed)
+        return scheduler
+
+    def open(self, spider):
+        self.spider = spider
+        self.frontier.open_worker(self.worker)
+        self._heartbeat(force=True)
+        logger.info(f"Спільний фронтир {getattr(self.frontier, 'path', '')}: воркер {self.worker}, "
+                    f"живих воркерів {self.workers}")
+
+    def close(self, reason):
+        self._wakeup.cancel()
+        if self.local:
+            logger.warning(f"{len(self.local)} локальних запитів не виконано")
+        cleared = self.frontier.close_worker(self.worker, reason == 'finished')
+        if cleared:
+            logger.info('Обхід завершено всіма воркерами, фронтир очищено')
+        self.frontier.close()
+
+    def has_pending_requests(self) -> bool:
+        self._heartbeat()
+        return bool(self.local) or self.frontier.has_work(self.worker)
+
+    def enqueue_request(self, request) -> bool:
+        # Початкові запити мають dont_filter, але на весь обхід їх досить виконати одному воркеру
+        if request.dont_filter and not request.meta.get('is_start_request'):
+            fingerprint = None
+        else:
+            fingerprint = self.crawler.request_fingerprinter.fingerprint(request).hex()
+        payload = self._serialize(request)
+        request_id = self.frontier.push(fingerprint, request.priority, payload, self.worker)
+        if request_id is None:
+            self.stats.inc_value('osbb/frontier/duplicates')
+            return False
+        if payload is None:
+            heapq.heappush(self.local, (-request.priority, -next(self._local_order), request))
+            self.stats.inc_value('osbb/frontier/local')
+        self.stats.inc_value('scheduler/enqueued')
+        return True
+
+    def next_request(self):
+        self._heartbeat()
+        if self.local:
+            request = heapq.heappop(self.local)[2]
+        elif self._backlog():
+            # Запит, узятий про запас, чекав би в черзі воркера, поки його міг би виконати інший
+            self._wakeup.schedule(self.BACKLOG_POLL_INTERVAL)
+            return None
+        else:
+            leased = self.frontier.lease(self.worker)
+            if leased is None:
+                # Черга порожня, але інші воркери ще можуть додати запити
+                self._wakeup.schedule(self.IDLE_POLL_INTERVAL)
+                return None
+            request = request_from_dict(pickle.loads(leased[1]), spider=self.spider)
+            request.meta[LEASE_META_KEY] = leased[0]
+            self.stats.inc_value('osbb/frontier/leased')
+        self.stats.inc_value('scheduler/dequeued')
+        return request
+
+    def __len__(self):
+        return len(self.local)
+
+    # --- Сигнали ---
+
+    def request_reached_downloader(self, request, spider):
+        slot = self.crawler.engine.downloader.slots.get(self.crawler.engine.downloader.get_slot_key(request))
+        if slot is not None:
+            self._throttle(slot)
+
+    def lease_completed(self, request, spider):
+        if self.frontier.complete(request.meta[LEASE_META_KEY], self.worker):
+            self.stats.inc_value('osbb/frontier/completed')
+
+    # --- Внутрішнє ---
+
+    def _serialize(self, request) -> bytes | None:
+        try:
+            return pickle.dumps(request.to_dict(spider=self.spider), protocol=pickle.HIGHEST_PROTOCOL)
+        except (ValueError, TypeError, AttributeError, pickle.PicklingError):
+            return None
+
+    def _backlog(self) -> bool:
+        """
+        Воркер уже має роботу наперед: запити чекають у слотах завантажувача
+        або відповідей у обробці (розбір файлів) не менше за 'max_active'.
+        """
+        engine = self.crawler.engine
+        if any(slot.queue for slot in engine.downloader.slots.values()):
+            return True
+        slot = engine.scraper.slot
+        return slot is not None and len(slot.queue) + len(slot.active) >= self.max_active
+
+    def _wake(self):
+        if self._backlog():
+            self._wakeup.schedule(self.BACKLOG_POLL_INTERVAL)
+        else:
+            # Рушій сам запитує планувальник лише після завантажень і раз на 5 с;
+            # завершений розбір файлу має звільнити місце для нового запиту одразу
+            slot = self.crawler.engine._slot
+            if slot is not None:
+                slot.nextcall.schedule()
+
+    def _heartbeat(self, force: bool = False):
+        now = time.monotonic()
+        engine = self.crawler.engine
+        busy = bool(self.local or engine.downloader.active
+                    or (engine.scraper.slot is not None and not engine.scraper.slot.is_idle()))
+        # Простій воркера інші мають побачити одразу, інакше вони чекатимуть на нього
+        if not force and busy == self.busy and now - self.last_heartbeat < self.heartbeat_interval:
+            return
+        self.last_heartbeat = now
+        self.busy = busy
+        self.frontier.heartbeat(self.worker, busy)
+
+        workers = max(1, self.frontier.live_workers())
+        if workers != self.workers:
+            logger.info(f"Живих воркерів: {workers}")
+            self.workers = workers
+            self.stats.max_value('osbb/frontier/workers', workers)
+            for slot in engine.downloader.slots.values():
+                self._throttle(slot)
+
+    def _throttle(self, slot):
+        workers, concurrency = self.throttled.get(slot, (1, slot.concurrency))
+        if workers == self.workers:
+            return
+        # Множимо поточну затримку, а не задану: її могли змінити AutoThrottle чи DOWNLOAD_SLOTS
+        slot.delay *= self.workers / workers
+        slot.concurrency = max(1, math.ceil(concurrency / self.workers))
+        self.throttled[slot] = (self.workers, concurrency)
+
+
+class FrontierMiddleware:
+    """
+    Spider middleware для SharedFrontierScheduler: коли колбек відповіді на
+    виданий з фронтиру запит віддав усі результати (запити й записи) або
+    завершився винятком, запит закривається у фронтирі (сигнал
+    lease_completed). Тож після падіння воркера в чергу повертаються лише
+    запити, які були в роботі, і вже оброблені набори не завантажуються й
+    не експортуються вдруге. З іншим планувальником вимкнено.
+    """
+
+    def __init__(self, crawler):
+        self.crawler = crawler
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        scheduler_cls = load_object(crawler.settings['SCHEDULER'])
+        if not (isinstance(scheduler_cls, type) and issubclass(scheduler_cls, SharedFrontierScheduler)):
+            raise NotConfigured('SCHEDULER — не SharedFrontierScheduler')
+        return cls(crawler)
+
+    def process_spider_output(self, response, result, spider):
+        yield from result
+        self._complete(response)
+
+    async def process_spider_output_async(self, response, result, spider):
+        async for output in result:
+            yield output
+        self._complete(response)
+
+    def process_spider_exception(self, response, exception, spider):
+        self._complete(response)
+
+    def _complete(self, response):
+        request = response.request
+        if request is not None and LEASE_META_KEY in request.meta:
+            self.crawler.signals.send_catch_log(signal=lease_completed, request=request, spider=self.crawler.spider)
@@ -0,0 +1,253 @@
+# osbb_crawler/fuzzy.py
+import hashlib
+import re
+import sys
+import zlib
+from array import array
+from functools import lru_cache
+
+import numpy as np
+
+from .address import city_key
+
+# Слова організаційно-правової форми: є в більшості назв і нічого не розрізняють
+LEGAL_FORM_WORDS = frozenset({
+    'осбб', 'об', 'єднання', 'обєднання', 'співвласників', 'співвласник', 'багатоквартирного',
+    'багатоквартирних', 'багатоквартирний', 'будинку', 'будинків', 'будинок', 'жбк', 'житлово',
+    'будівельний', 'кооператив', 'обслуговуючий', 'ок', 'бк', 'товариство', 'з', 'обмеженою',
+    'відповідальністю', 'тов',
+})
+
+# Латинські літери, схожі на кириличні, у назвах, набраних змішаною розкладкою
+_LATIN_TO_CYRILLIC = str.maketrans('aceiopxyk', 'асеіорхук')
+_APOSTROPHES = str.maketrans('', '', "'ʼ’`")
+_TOKEN_RE = re.compile(r'[^\W_]+')
+# Число з можливою літерою корпусу ('66 а' з '66-А'), як номер будинку в address_key
+_NUMBER_RE = re.compile(r'(\d+)(?: ?([а-яіїєґ])(?![а-яіїєґ]))?')
+
+# Параметри MinHash для LSH: BANDS смуг по ROWS значень. Імовірність, що
+# назви з подібністю Жаккара J потраплять в одну корзину, — 1 - (1 - J^ROWS)^BANDS:
+# ~0.66 для J = 0.5 і ~0.97 для J = 0.7
+MINHASH_BANDS = 8
+MINHASH_ROWS = 3
+_MERSENNE_PRIME = (1 << 31) - 1
+_PERMUTATIONS = np.random.default_rng(20240601).integers(
+    1, _MERSENNE_PRIME, size=(2, MINHASH_BANDS * MINHASH_ROWS), dtype=np.uint64,
+)
+# Непарний множник для змішування значень смуги (арифметика за модулем 2**64)
+_BAND_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+
+def normalize_name(name, city: str = '') -> str:
+    """
+    Назва для порівняння: нижній регістр, без лапок і апострофів, без слів
+    організаційно-правової форми та назви міста ('ОСББ "Оберіг-Ужгород"' у
+    місті Ужгород -> 'оберіг').
+    """
+    if not name:
+        return ''
+    city_words = set(city.split())
+    tokens = _TOKEN_RE.findall(str(name).lower().translate(_APOSTROPHES).translate(_LATIN_TO_CYRILLIC))
+    return ' '.join(token for token in tokens if token not in LEGAL_FORM_WORDS and token not in city_words)
+
+
+def name_numbers(normalized: str) -> str:
+    """
+    Числа в назві через пробіл ('Будівельник 2', 'Комфорт-Т3', 'Короленка 66-А'
+    -> '66а'): у записів одного ОСББ вони мають збігатися (крім номера самого
+    будинку, див. FuzzyMatcher).
+    """
+    return ' '.join(sorted({digits + letter for digits, letter in _NUMBER_RE.findall(normalized)}))
+
+
+def shingles(text: str) -> set:
+    """Триграми символів (з пробілами по краях, щоб враховувались межі слів)."""
+    padded = f' {text} '
+    if len(padded) <= 3:
+        return {padded}
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def jaccard(a: set, b: set) -> float:
+    if not a or not b:
+        return 0.0
+    common = len(a & b)
+    return common / (len(a) + len(b) - common)
+
+
+@lru_cache(maxsize=65536)
+def stable_hash(text: str) -> int:
+    """64-бітний хеш рядка, який, на відміну від hash(), не залежить від PYTHONHASHSEED."""
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def minhash_bands(grams: set, seed: int = 0) -> list:
+    """
+    Ключі смуг MinHash-підпису множини триграм. Лише цілочисельна
+    арифметика numpy, тож ключі однакові між запусками; 'seed' (хеш міста)
+    розводить однакові смуги різних міст по різних блоках.
+    """
+    values = np.fromiter((zlib.crc32(gram.encode('utf-8')) for gram in grams), dtype=np.uint64, count=len(grams))
+    a, b = _PERMUTATIONS
+    signature = ((values[:, None] * a + b) % _MERSENNE_PRIME).min(axis=0).reshape(MINHASH_BANDS, MINHASH_ROWS)
+    keys = np.full(MINHASH_BANDS, seed, dtype=np.uint64)
+    for row in range(MINHASH_ROWS):
+        keys = (keys ^ signature[:, row]) * _BAND_MIX
+    return keys.tolist()
+
+
+class FuzzyMatcher:
+    """
+    Потокове групування записів одного ОСББ без спільного ключа.
+
+    Кожен запис порівнюється не з усіма попередніми, а лише з кандидатами з
+    його блоків у межах того самого міста:
+
+    * місто + вулиця з канонічного address_key;
+    * смуги MinHash-підпису триграм назви (LSH): схожі назви з великою
+      імовірністю мають хоча б одну спільну смугу.
+
+    Блок пам'ятає щонайбільше 'max_block_size' останніх записів, тож
+    порівнянь на запис не більше за кількість блоків на цей розмір, і
+    загальна кількість росте лінійно.
+
+    Кандидат — той самий ОСББ, якщо подібність Жаккара триграм назв не
+    менша за 'name_threshold', або за тієї самої адреси (вулиця й будинок) —
+    не менша за 'address_name_threshold'. Не об'єднуються: записи з різними
+    адресами (адреса кластера — перша відома адреса його записів), з різними
+    числами в назвах ('Будівельник 2' і 'Будівельник 3'; номер будинку не
+    враховується: 'Господар 4' за адресою ..., 4 і 'Господар') та з різними
+    ЄДРПОУ.
+
+    assign() повертає ідентифікатор кластера. Кластер називається за першим
+    записом: 'edrpou:<код>', 'addr:<address_key>' або 'name:<місто>|<назва>';
+    усі записи з тим самим ЄДРПОУ потрапляють в один кластер. Групування
+    жадібне: запис приєднується до кластера найсхожішого з уже бачених
+    записів, а сформовані кластери не зливаються, бо їхні записи вже
+    віддані далі.
+    """
+
+    def __init__(self, name_threshold: float = 0.8, address_name_threshold: float = 0.5,
+                 max_block_size: int = 200):
+        self.name_threshold = name_threshold
+        self.address_name_threshold = address_name_threshold
+        self.max_block_size = max_block_size
+        # Компактні дані кожного запису (рядки інтерновані: назви й числа повторюються)
+        self.names = []
+        self.numbers = []
+        self.clusters = array('I')
+        # Ідентифікатори кластерів, зворотний словник, адреси (вулиця, будинок) і ЄДРПОУ кластерів
+        self.cluster_ids = []
+        self.cluster_numbers = {}
+        # Останній суфікс '#N', виданий для кожної назви кластера
+        self.cluster_suffixes = {}
+        self.cluster_addresses = {}
+        self.cluster_codes = {}
+        self.edrpou_clusters = {}
+        # хеш (місто, вулиця або ключ смуги MinHash) -> номери записів; масиви й
+        # цілі ключі не відстежуються збирачем сміття, тож він не сповільнюється з ростом індексу
+        self.blocks = {}
+        self.comparisons = 0
+        self.matched = 0
+
+    def assign(self, name, address_key=None, city=None, edrpou=None) -> str:
+        city = city_key(city)
+        street = house = ''
+        if address_key:
+            parts = address_key.split('|')
+            if len(parts) == 3:
+                key_city, street, house = parts
+                city = city or key_city
+        normalized = normalize_name(name, city)
+        numbers = name_numbers(normalized)
+        grams = shingles(normalized) if normalized else set()
+
+        keys = []
+        if street:
+            keys.append(stable_hash(f'{city}|{street}'))
+        if grams:
+            keys.extend(minhash_bands(grams, stable_hash(city)))
+
+        cluster = self.edrpou_clusters.get(edrpou) if edrpou else None
+        if cluster is None:
+            cluster = self._best_match(keys, grams, street, house, numbers, edrpou)
+            if cluster is not None:
+                self.matched += 1
+            elif edrpou:
+                cluster = self._cluster(f'edrpou:{edrpou}', unique=True)
+            else:
+                founder = f'addr:{address_key}' if address_key else f'name:{city}|{normalized}'
+                cluster = self._cluster(founder, unique=True)
+            if edrpou:
+                self.edrpou_clusters[edrpou] = cluster
+                self.cluster_codes[cluster] = edrpou
+        if (street or house) and cluster not in self.cluster_addresses:
+            self.cluster_addresses[cluster] = (street, house)
+
+        number = len(self.names)
+        self.names.append(sys.intern(normalized))
+        self.numbers.append(sys.intern(numbers))
+        self.clusters.append(cluster)
+        for key in keys:
+            block = self.blocks.get(key)
+            if block is None:
+                self.blocks[key] = array('I', (number,))
+            else:
+                block.append(number)
+                if len(block) > 2 * self.max_block_size:
+                    del block[:-self.max_block_size]
+        return self.cluster_ids[cluster]
+
+    def _best_match(self, keys, grams, street, house, numbers, edrpou):
+        candidates = set()
+        for key in keys:
+            block = self.blocks.get(key)
+            if block:
+                candidates.update(block[-self.max_block_size:])
+        if not candidates:
+            return None
+
+        best_score, best_cluster = 0.0, None
+        seen_names = {}
+        for candidate in candidates:
+            cluster = self.clusters[candidate]
+            if edrpou and self.cluster_codes.get(cluster, edrpou) != edrpou:
+                continue
+            address = self.cluster_addresses.get(cluster)
+            if address and ((street and address[0] and street != address[0])
+                            or (house and address[1] and house != address[1])):
+                continue
+            other_numbers = self.numbers[candidate]
+            if numbers != other_numbers:
+                houses = {house, address[1] if address else ''}
+                if set(numbers.split()) - houses != set(other_numbers.split()) - houses:
+                    continue
+            other_name = self.names[candidate]
+            score = seen_names.get(other_name)
+            if score is None:
+                self.comparisons += 1
+                score = seen_names[other_name] = jaccard(grams, shingles(other_name)) if other_name else 0.0
+            same_address = street and house and address == (street, house)
+            threshold = self.address_name_threshold if same_address else self.name_threshold
+            if score >= threshold and score > best_score:
+                best_score, best_cluster = score, cluster
+        return best_cluster
+
+    def _cluster(self, cluster_id: str, unique: bool = False) -> int:
+        """Номер кластера 'cluster_id'; з 'unique' — завжди новий кластер (з суфіксом '#2', '#3'...)."""
+        number = self.cluster_numbers.get(cluster_id)
+        if number is not None:
+            if not unique:
+                return number
+            # Лічильник на назву; цикл лише обходить рідкісний збіг з назвою, що вже містить '#N'
+            suffix = self.cluster_suffixes.get(cluster_id, 1) + 1
+            while f'{cluster_id}#{suffix}' in self.cluster_numbers:
+                suffix += 1
+            self.cluster_suffixes[cluster_id] = suffix
+            cluster_id = f'{cluster_id}#{suffix}'
+        number = self.cluster_numbers[cluster_id] = len(self.cluster_ids)
+        self.cluster_ids.append(cluster_id)
+        return number
+
+    def __len__(self):
+        return len(self.names)
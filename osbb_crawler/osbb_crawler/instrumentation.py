@@ -0,0 +1,143 @@
+# osbb_crawler/instrumentation.py
+import json
+
+# Причини пропуску рядків/файлів (ключі в статистиці osbb/skip_reason/...)
+SKIP_NO_EDRPOU_OR_ADDRESS = 'no_edrpou_or_address'
+SKIP_NOT_A_DICT = 'record_not_a_dict'
+SKIP_INVALID_JSON = 'invalid_json'
+SKIP_RECORDS_NOT_FOUND = 'records_not_found'
+SKIP_EXCEL_READ_ERROR = 'excel_read_error'
+SKIP_CSV_PARSE_ERROR = 'csv_parse_error'
+SKIP_UNSUPPORTED_FORMAT = 'unsupported_format'
+
+
+class ParseStats:
+    """
+    Лічильники розбору одного файлу. Парсери лише збільшують атрибути
+    (дешево на кожному рядку), а в статистику Scrapy все переноситься
+    один раз наприкінці файлу — див. record_parse.
+    """
+
+    __slots__ = ('rows_emitted', 'rows_skipped', 'skip_reasons', 'decode_seconds', 'parse_seconds')
+
+    def __init__(self):
+        self.rows_emitted = 0
+        self.rows_skipped = 0
+        self.skip_reasons = {}
+        self.decode_seconds = 0.0
+        self.parse_seconds = 0.0
+
+    def skip(self, reason: str, count: int = 1):
+        self.rows_skipped += count
+        self.skip_reasons[reason] = self.skip_reasons.get(reason, 0) + count
+
+    def merge(self, other: 'ParseStats'):
+        self.rows_emitted += other.rows_emitted
+        self.decode_seconds += other.decode_seconds
+        self.parse_seconds += other.parse_seconds
+        for reason, count in other.skip_reasons.items():
+            self.skip(reason, count)
+
+
+def _dataset_prefix(dataset_url: str) -> str:
+    return f'osbb/dataset/{dataset_url}'
+
+
+def record_download(stats, dataset_url: str, response, size: int | None = None):
+    """
+    Розмір і затримка завантаження файлу набору даних. 'size' — розмір тіла,
+    якщо воно не в response.body (записане на диск).
+    """
+    if size is None:
+        size = len(response.body)
+    prefix = _dataset_prefix(dataset_url)
+    stats.inc_value(f'{prefix}/download_bytes', size)
+    stats.inc_value('osbb/download_bytes', size)
+    latency = response.meta.get('download_latency')
+    if latency is not None:
+        stats.inc_value(f'{prefix}/download_latency', latency)
+
+
+def record_selection(stats, dataset_url: str, ranked: list, by_priority: dict | None):
+    """
+    Рішення про вибір ресурсу набору: обраний формат, розмір і вартість,
+    а також усі кандидати (selection) — ranked[0] обрано.
+    """
+    prefix = _dataset_prefix(dataset_url)
+    selected = ranked[0]
+    stats.set_value(f'{prefix}/selected_format', selected['format'])
+    stats.set_value(f'{prefix}/selected_cost', selected['cost'])
+    if selected.get('size') is not None:
+        stats.set_value(f'{prefix}/selected_size', selected['size'])
+    stats.set_value(f'{prefix}/selection', [
+        {key: candidate.get(key) for key in ('format', 'url', 'size', 'last_modified', 'cost', 'probe')}
+        for candidate in ranked
+    ])
+    stats.inc_value('osbb/selection/datasets')
+    if by_priority is not None and by_priority is not selected:
+        # Вибір за вартістю відрізняється від вибору лише за порядком форматів
+        stats.inc_value('osbb/selection/overrode_priority')
+
+
+def record_parse(stats, dataset_url: str, parse_stats: ParseStats):
+    """Переносить лічильники розбору файлу в статистику Scrapy."""
+    prefix = _dataset_prefix(dataset_url)
+    stats.inc_value(f'{prefix}/decode_seconds', parse_stats.decode_seconds)
+    stats.inc_value(f'{prefix}/parse_seconds', parse_stats.parse_seconds)
+    stats.inc_value(f'{prefix}/rows_emitted', parse_stats.rows_emitted)
+    stats.inc_value(f'{prefix}/rows_skipped', parse_stats.rows_skipped)
+    stats.inc_value('osbb/rows_emitted', parse_stats.rows_emitted)
+    stats.inc_value('osbb/rows_skipped', parse_stats.rows_skipped)
+    for reason, count in parse_stats.skip_reasons.items():
+        stats.inc_value(f'{prefix}/skip_reason/{reason}', count)
+        stats.inc_value(f'osbb/skip_reason/{reason}', count)
+
+
+def dataset_report(stats) -> dict:
+    """
+    Збирає пласкі ключі osbb/dataset/<url>/<метрика> у словник
+    {url: {метрика: значення}}; skip_reason/* — вкладеним словником.
+    """
+    prefix = 'osbb/dataset/'
+    report = {}
+    for key, value in stats.get_stats().items():
+        if not key.startswith(prefix):
+            continue
+        # URL сам містить '/', тому метрику шукаємо за відомими назвами
+        rest = key[len(prefix):]
+        if '/skip_reason/' in rest:
+            dataset_url, reason = rest.rsplit('/skip_reason/', 1)
+            report.setdefault(dataset_url, {}).setdefault('skip_reasons', {})[reason] = value
+        else:
+            dataset_url, metric = rest.rsplit('/', 1)
+            report.setdefault(dataset_url, {})[metric] = round(value, 4) if isinstance(value, float) else value
+    return report
+
+
+def write_dataset_report(stats, path: str | None, logger, top: int = 10):
+    """
+    Підсумок на закритті павука: у лог — найповільніші набори даних,
+    у файл 'path' (якщо задано) — повний звіт у JSON.
+    """
+    report = dataset_report(stats)
+    if not report:
+        return report
+
+    def total_seconds(metrics):
+        return (metrics.get('download_latency', 0) + metrics.get('decode_seconds', 0)
+                + metrics.get('parse_seconds', 0))
+
+    slowest = sorted(report.items(), key=lambda kv: total_seconds(kv[1]), reverse=True)[:top]
+    for dataset_url, metrics in slowest:
+        logger.info(
+            f"Набір {dataset_url}: {metrics.get('download_bytes', 0)} байт, "
+            f"завантаження {metrics.get('download_latency', 0):.2f}с, "
+            f"декодування {metrics.get('decode_seconds', 0):.2f}с, розбір {metrics.get('parse_seconds', 0):.2f}с, "
+            f"записів {metrics.get('rows_emitted', 0)}, пропущено {metrics.get('rows_skipped', 0)}"
+        )
+
+    if path:
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        logger.info(f"Звіт по наборах даних збережено: {path}")
+    return report
@@ -4,6 +4,8 @@
 # https://docs.scrapy.org/en/latest/topics/items.html
 
 # osbb_crawler/items.py
+from typing import NamedTuple
+
 import scrapy
 
 class DatasetItem(scrapy.Item):
@@ -30,11 +32,21 @@ class OsbbRecordItem(scrapy.Item):
     # Фізична адреса реєстрації
     address = scrapy.Field()
 
+    # Адреса в єдиному написанні ('вул. Шевченка, 9А'); address лишається як у джерелі
+    normalized_address = scrapy.Field()
+
+    # Канонічний ключ адреси 'місто|вулиця|будинок' (див. address.py)
+    address_key = scrapy.Field()
+
     #Місто
     city = scrapy.Field()
 
     #Область
     region = scrapy.Field()
+
+    # Координати будинку (WGS84, градуси з 6 знаками після коми)
+    latitude = scrapy.Field()
+    longitude = scrapy.Field()
     
     # Контактний телефон
     phone = scrapy.Field()
@@ -44,5 +56,37 @@ class OsbbRecordItem(scrapy.Item):
     
     # URL сторінки, з якої витягнуто дані
     source_dataset_url = scrapy.Field()
+
+    # Кластер записів одного ОСББ ('edrpou:<код>', 'addr:...' або 'name:...', див. fuzzy.py)
+    cluster_id = scrapy.Field()
     
     pass
+
+
+class OsbbRecord(NamedTuple):
+    """
+    Компактний запис ОСББ, який створюють парсери (processors.py): кортеж
+    без словника полів на кожен рядок файлу. В OsbbRecordItem перетворюється
+    лише на межі зі Scrapy (to_item); пакетні сховища (ResourceCache)
+    приймають його напряму. Усі поля — рядки, порожні значення — ''.
+    Координати — останні й необов'язкові: відомі не для кожного джерела.
+    """
+
+    name: str
+    edrpou: str
+    phone: str
+    email: str
+    region: str
+    city: str
+    address: str
+    source_dataset_url: str
+    latitude: str = ''
+    longitude: str = ''
+
+    def to_item(self) -> OsbbRecordItem:
+        # Поля, яких парсер не заповнює (address_key), — порожні рядки, як і раніше
+        return OsbbRecordItem(zip(_ITEM_FIELDS, (*self, *_ITEM_DEFAULTS)))
+
+
+_ITEM_FIELDS = OsbbRecord._fields + tuple(field for field in OsbbRecordItem.fields if field not in OsbbRecord._fields)
+_ITEM_DEFAULTS = ('',) * (len(_ITEM_FIELDS) - len(OsbbRecord._fields))
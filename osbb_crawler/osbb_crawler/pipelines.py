@@ -7,6 +7,33 @@
 # useful for handling different item types with a single interface
 from itemadapter import ItemAdapter
 
+import csv
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import time
+from urllib.parse import quote
+from array import array
+from bisect import bisect_left
+
+from scrapy import signals
+from scrapy.exceptions import DropItem, NotConfigured
+from scrapy.utils.project import data_path
+
+from .address import AddressNormalizer, address_key
+from .fuzzy import FuzzyMatcher
+from .items import OsbbRecordItem
+from .spatial import DEFAULT_CITY_KEYS, DEFAULT_REGION_KEYS, load_boundary_index, parse_coordinate
+
+try:
+    # pyarrow потрібен лише для ParquetExportPipeline
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
 # Константа, яка зіставляє унікальні URL датасетів з назвою міста.
 # Ви можете розширити цей список, коли знайдете нові джерела.
 URL_CITY_MAPPING = {
@@ -27,11 +54,83 @@ URL_CITY_MAPPING = {
 }
 
 
+def load_city_mapping(path: str) -> dict:
+    """
+    Завантажує додаткові відповідності 'URL джерела -> місто' з файлу:
+    JSON-об'єкт {url: місто} або CSV з колонками url,city.
+    """
+    if path.lower().endswith('.json'):
+        with open(path, encoding='utf-8') as f:
+            return dict(json.load(f))
+    with open(path, encoding='utf-8', newline='') as f:
+        return {row['url'].strip(): row['city'].strip() for row in csv.DictReader(f) if row.get('url')}
+
+
+def city_mapping(settings) -> dict:
+    """URL_CITY_MAPPING, доповнений файлом з OSBB_CITY_MAPPING_FILE."""
+    mapping = dict(URL_CITY_MAPPING)
+    path = settings.get('OSBB_CITY_MAPPING_FILE')
+    if path:
+        mapping.update(load_city_mapping(path))
+    return mapping
+
+
+class CityResolver:
+    """
+    Індекс для пошуку міста за URL джерела.
+
+    Ключі мапінгу — абсолютні URL наборів, тому збіг 'base_url in source_url'
+    на практиці є збігом префікса. Замість перебору всього мапінгу перевіряємо
+    у словнику лише префікси самого source_url (вартість залежить від довжини
+    URL, а не від кількості джерел); за кількох збігів перемагає ключ, що
+    стоїть раніше в мапінгу, — як у лінійному переборі. Результат для кожного
+    source_url запам'ятовується.
+    """
+
+    def __init__(self, mapping: dict):
+        self.index = {}
+        for order, (base_url, city_name) in enumerate(mapping.items()):
+            self.index.setdefault(base_url, (order, city_name))
+        self.lengths = sorted({len(base_url) for base_url in self.index})
+        self.memo = {}
+
+    @property
+    def cities(self) -> set:
+        """Усі міста індексу (назви, які можуть стояти в адресі без 'м.')."""
+        return {city_name for _, city_name in self.index.values()}
+
+    def resolve(self, source_url: str) -> str | None:
+        try:
+            return self.memo[source_url]
+        except KeyError:
+            pass
+
+        best = None
+        for length in self.lengths:
+            if length > len(source_url):
+                break
+            match = self.index.get(source_url[:length])
+            if match is not None and (best is None or match[0] < best[0]):
+                best = match
+
+        city_name = best[1] if best else None
+        self.memo[source_url] = city_name
+        return city_name
+
+
 class CityEnrichmentPipeline:
     """
     Додає назву міста до OsbbRecordItem на основі його джерела (source_dataset_url),
     якщо поле 'city' відсутнє або порожнє.
+    Мапінг можна розширити файлом з налаштування OSBB_CITY_MAPPING_FILE.
     """
+
+    def __init__(self, mapping: dict = URL_CITY_MAPPING):
+        self.resolver = CityResolver(mapping)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(city_mapping(crawler.settings))
     
     def process_item(self, item, spider):
         # 1. Перевірка, чи вже є місто
@@ -44,16 +143,8 @@ class CityEnrichmentPipeline:
         if not source_url:
             return item
             
-        # 2. Пошук міста у мапінгу
-        
-        # Ми перебираємо всі URL у мапінгу, щоб знайти відповідність.
-        # Це дозволяє працювати з частковими збігами (наприклад, base_url містить download_link)
-        
-        found_city = None
-        for base_url, city_name in URL_CITY_MAPPING.items():
-            if base_url in source_url:
-                found_city = city_name
-                break
+        # 2. Пошук міста у мапінгу (індекс + кеш на кожне джерело)
+        found_city = self.resolver.resolve(source_url)
         
         # 3. Збагачення
         if found_city:
@@ -62,3 +153,586 @@ class CityEnrichmentPipeline:
             spider.logger.debug(f"Збагачено місто '{found_city}' для {source_url}")
             
         return item
+
+
+class GeoEnrichmentPipeline:
+    """
+    Заповнює порожні 'region' і 'city' за координатами запису: точка
+    шукається в межах з локальних файлів GeoJSON (OSBB_BOUNDARIES_PATH)
+    через просторовий індекс (spatial.BoundaryIndex), тож пошук не
+    перебирає всі полігони. Індекс будується один раз і зберігається в
+    OSBB_BOUNDARIES_INDEX_PATH. Стоїть після CityEnrichmentPipeline (мапінг
+    джерел має пріоритет) і до AddressNormalizationPipeline (місто входить
+    у ключ адреси).
+    """
+
+    def __init__(self, crawler, index):
+        self.crawler = crawler
+        self.index = index
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        paths = settings.getlist('OSBB_BOUNDARIES_PATH')
+        if not paths:
+            raise NotConfigured('OSBB_BOUNDARIES_PATH не задано')
+        index = load_boundary_index(
+            paths,
+            settings.get('OSBB_BOUNDARIES_INDEX_PATH') or data_path('osbb_boundaries.index', createdir=True),
+            region_keys=settings.getlist('OSBB_BOUNDARIES_REGION_KEYS') or DEFAULT_REGION_KEYS,
+            city_keys=settings.getlist('OSBB_BOUNDARIES_CITY_KEYS') or DEFAULT_CITY_KEYS,
+        )
+        crawler.stats.set_value('osbb/geo/boundaries', len(index))
+        return cls(crawler, index)
+
+    def process_item(self, item, spider):
+        if item.get('region') and item.get('city'):
+            return item
+        lat = parse_coordinate(item.get('latitude'))
+        lon = parse_coordinate(item.get('longitude'))
+        if lat is None or lon is None:
+            return item
+
+        stats = self.crawler.stats
+        stats.inc_value('osbb/geo/lookups')
+        found = self.index.lookup(lon, lat)
+        if not found:
+            stats.inc_value('osbb/geo/outside')
+        for field in ('region', 'city'):
+            if field in found and not item.get(field):
+                item[field] = found[field]
+                stats.inc_value(f'osbb/geo/{field}_filled')
+        return item
+
+
+class AddressNormalizationPipeline:
+    """
+    Додає адресу в єдиному написанні (типи вулиць, номер будинку з
+    літерою, пробіли, лапки) у поле normalized_address і канонічний ключ
+    address_key 'місто|вулиця|будинок', за яким зіставляються записи з
+    різних джерел. Поле address лишається таким, як у джерелі. Стоїть
+    після CityEnrichmentPipeline, бо місто входить у ключ; назви міст з
+    мапінгу джерел (CityResolver) в адресі не вважаються вулицею.
+
+    Нормалізація кешується (OSBB_ADDRESS_CACHE_SIZE адрес у LRU-кеші);
+    вимикається OSBB_NORMALIZE_ADDRESSES = False.
+    """
+
+    def __init__(self, crawler, cache_size: int, cities=()):
+        self.crawler = crawler
+        self.normalizer = AddressNormalizer(cache_size, cities)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('OSBB_NORMALIZE_ADDRESSES', True):
+            raise NotConfigured('OSBB_NORMALIZE_ADDRESSES вимкнено')
+        cities = CityResolver(city_mapping(settings)).cities
+        return cls(crawler, settings.getint('OSBB_ADDRESS_CACHE_SIZE', 100000), cities)
+
+    def process_item(self, item, spider):
+        address = item.get('address')
+        if address:
+            item['normalized_address'], item['address_key'] = self.normalizer.normalize_with_key(
+                address, item.get('city'),
+            )
+        return item
+
+    def close_spider(self, spider):
+        info = self.normalizer.cache_info()
+        self.crawler.stats.set_value('osbb/address/cache_hits', info.hits)
+        self.crawler.stats.set_value('osbb/address/cache_misses', info.misses)
+
+
+def normalize_edrpou(value) -> str | None:
+    """
+    Нормалізує код ЄДРПОУ: лише цифри, без хвоста '.0' з Excel, з нулями
+    попереду до 8 знаків. Повертає None, якщо це не схоже на код.
+    """
+    if not value:
+        return None
+    value = str(value).strip()
+    if value.endswith('.0'):
+        value = value[:-2]
+    digits = re.sub(r'\D', '', value)
+    if not 5 <= len(digits) <= 10:
+        return None
+    return digits.zfill(8)
+
+
+class FuzzyDedupPipeline:
+    """
+    Групує записи одного ОСББ, які не зводяться до спільного ключа: без
+    ЄДРПОУ, з назвою в іншому написанні ('ОСББ "Оберіг"' і 'Об'єднання
+    співвласників багатоквартирного будинку Оберіг'), з адресою, що не
+    розпізналась. Кожен запис отримує cluster_id (див. fuzzy.FuzzyMatcher):
+    записи з тим самим ЄДРПОУ і схожі на них записи без коду — один
+    кластер. Порівняння обмежені блоками (місто + вулиця, смуги MinHash
+    назви), тож час росте лінійно з кількістю записів.
+
+    Стоїть після AddressNormalizationPipeline (потрібен address_key).
+    Тримає всі записи обходу в пам'яті, тому вмикається лише
+    OSBB_FUZZY_DEDUP_ENABLED = True.
+    """
+
+    def __init__(self, crawler, matcher: FuzzyMatcher):
+        self.crawler = crawler
+        self.matcher = matcher
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if not settings.getbool('OSBB_FUZZY_DEDUP_ENABLED', False):
+            raise NotConfigured('OSBB_FUZZY_DEDUP_ENABLED вимкнено')
+        matcher = FuzzyMatcher(
+            name_threshold=settings.getfloat('OSBB_FUZZY_NAME_THRESHOLD', 0.8),
+            address_name_threshold=settings.getfloat('OSBB_FUZZY_ADDRESS_NAME_THRESHOLD', 0.5),
+            max_block_size=settings.getint('OSBB_FUZZY_MAX_BLOCK_SIZE', 200),
+        )
+        return cls(crawler, matcher)
+
+    def process_item(self, item, spider):
+        item['cluster_id'] = self.matcher.assign(
+            item.get('name'), item.get('address_key'), item.get('city'), normalize_edrpou(item.get('edrpou')),
+        )
+        return item
+
+    def close_spider(self, spider):
+        stats = self.crawler.stats
+        stats.set_value('osbb/fuzzy/records', len(self.matcher))
+        stats.set_value('osbb/fuzzy/clusters', len(self.matcher.cluster_ids))
+        stats.set_value('osbb/fuzzy/matched', self.matcher.matched)
+        stats.set_value('osbb/fuzzy/comparisons', self.matcher.comparisons)
+
+
+# Сигнал EdrpouDedupPipeline: дублікат доповнив уже відданий запис (аргумент item — повний
+# запис). Для сховищ з upsert; feed-експорт і Parquet його не слухають.
+record_merged = object()
+
+
+class EdrpouDedupPipeline:
+    """
+    Об'єднує записи одного ОСББ з різних наборів даних за нормалізованим ЄДРПОУ.
+
+    Перший запис з кожним ЄДРПОУ проходить далі одразу, тож feed-експорт,
+    Parquet і CLOSESPIDER_ITEMCOUNT бачать кожен ОСББ рівно один раз.
+    Наступні відкидаються як дублікати (DropItem) і лише доповнюють порожні
+    поля збереженої копії. Якщо дублікат щось доповнив, повніший запис
+    надсилається сигналом record_merged — його отримують лише сховища з
+    upsert (SqliteSinkPipeline оновлює той самий рядок за ключем); у
+    feed-експорт і Parquet, які рядки лише дописують, він не потрапляє.
+    Записи без ЄДРПОУ проходять без змін.
+
+    Індекс компактний: ціле число ЄДРПОУ -> номер рядка. Текстові поля
+    рядка упаковані в один рядок байтів UTF-8, а місто, область і джерело
+    зберігаються номерами в спільному словнику значень (array). Коли
+    записів у пам'яті більше за OSBB_DEDUP_MAX_MEMORY_RECORDS, вони
+    вивантажуються в тимчасовий SQLite-файл, а в пам'яті лишається
+    відсортований масив кодів (8 байт на запис).
+    """
+
+    FIELDS = ('name', 'edrpou', 'address', 'normalized_address', 'address_key', 'city', 'region', 'phone', 'email',
+              'source_dataset_url', 'latitude', 'longitude', 'cluster_id')
+    # Поля з невеликою кількістю різних значень — номерами в словнику
+    DICTIONARY_FIELDS = ('city', 'region', 'source_dataset_url')
+    # Роздільник текстових полів в упакованому рядку
+    SEPARATOR = '\x1f'
+
+    def __init__(self, crawler, max_memory_records: int):
+        self.crawler = crawler
+        self.max_memory_records = max_memory_records
+        # код -> номер рядка в packed / dictionary_columns
+        self.index = {}
+        self.packed = []
+        self.dictionary_columns = {field: array('I') for field in self.DICTIONARY_FIELDS}
+        self.dictionary = ['']
+        self.dictionary_ids = {'': 0}
+        # Лише для рядків з дублікатами: номер рядка -> множина джерел (номери в словнику)
+        self.sources = {}
+        self.text_fields = tuple(field for field in self.FIELDS if field not in self.DICTIONARY_FIELDS)
+        self.spilled = array('q')
+        self.spill_db = None
+        self.spill_path = None
+        self.pair_counts = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler, crawler.settings.getint('OSBB_DEDUP_MAX_MEMORY_RECORDS', 200000))
+
+    def process_item(self, item, spider):
+        code = normalize_edrpou(item.get('edrpou'))
+        if code is None:
+            return item
+
+        key = int(code)
+        values = [code if field == 'edrpou' else str(item.get(field) or '') for field in self.FIELDS]
+        row = self.index.get(key)
+        if row is None and not self._is_spilled(key):
+            self._add(key, values)
+            return item
+
+        # Дублікат: рахуємо пари джерел і доповнюємо порожні поля
+        source = self._dictionary_id(item.get('source_dataset_url') or '')
+        if row is None:
+            record = self._merge_spilled(key, values, source)
+        else:
+            sources = self.sources.setdefault(row, {self.dictionary_columns['source_dataset_url'][row]})
+            self._count_pairs(sources, source)
+            record = self._row_values(row)
+            if _fill_empty(record, values):
+                self._store_row(row, record)
+            else:
+                record = None
+        stats = self.crawler.stats
+        stats.inc_value('osbb/dedup/duplicates')
+        if record is not None:
+            stats.inc_value('osbb/dedup/merged')
+            self.crawler.signals.send_catch_log(
+                signal=record_merged, item=OsbbRecordItem(zip(self.FIELDS, record)), spider=spider
+            )
+        raise DropItem(f"ЄДРПОУ {code}: дублікат об'єднано", log_level='DEBUG')
+
+    def close_spider(self, spider):
+        stats = self.crawler.stats
+        stats.set_value('osbb/dedup/unique', len(self.index) + len(self.spilled))
+
+        # Звіт: скільки дублікатів між кожною парою джерел
+        report = {
+            f"{self.dictionary[a]} | {self.dictionary[b]}": count
+            for (a, b), count in sorted(self.pair_counts.items(), key=lambda kv: -kv[1])
+        }
+        stats.set_value('osbb/dedup/source_pairs', report)
+        for pair, count in report.items():
+            spider.logger.info(f"Дублікати ЄДРПОУ: {count} між {pair}")
+
+        if self.spill_db is not None:
+            self.spill_db.close()
+            os.remove(self.spill_path)
+
+    # --- Внутрішнє ---
+
+    def _dictionary_id(self, value: str) -> int:
+        value_id = self.dictionary_ids.get(value)
+        if value_id is None:
+            value_id = self.dictionary_ids[value] = len(self.dictionary)
+            self.dictionary.append(value)
+        return value_id
+
+    def _add(self, key: int, values: list):
+        self.index[key] = len(self.packed)
+        self.packed.append(b'')
+        for column in self.dictionary_columns.values():
+            column.append(0)
+        self._store_row(len(self.packed) - 1, values)
+        if len(self.index) > self.max_memory_records:
+            self._spill()
+
+    def _row_values(self, row: int) -> list:
+        texts = dict(zip(self.text_fields, self.packed[row].decode('utf-8').split(self.SEPARATOR)))
+        return [
+            self.dictionary[self.dictionary_columns[field][row]] if field in self.dictionary_columns else texts[field]
+            for field in self.FIELDS
+        ]
+
+    def _store_row(self, row: int, values: list):
+        texts = []
+        for field, value in zip(self.FIELDS, values):
+            if field in self.dictionary_columns:
+                self.dictionary_columns[field][row] = self._dictionary_id(value)
+            else:
+                texts.append(value.replace(self.SEPARATOR, ' '))
+        self.packed[row] = self.SEPARATOR.join(texts).encode('utf-8')
+
+    def _count_pairs(self, sources: set, source: int):
+        for other in sources:
+            pair = (other, source) if other <= source else (source, other)
+            self.pair_counts[pair] = self.pair_counts.get(pair, 0) + 1
+        sources.add(source)
+
+    def _is_spilled(self, key: int) -> bool:
+        position = bisect_left(self.spilled, key)
+        return position < len(self.spilled) and self.spilled[position] == key
+
+    def _spill(self):
+        if self.spill_db is None:
+            fd, self.spill_path = tempfile.mkstemp(prefix='osbb_dedup_', suffix='.sqlite')
+            os.close(fd)
+            self.spill_db = sqlite3.connect(self.spill_path)
+            columns = ', '.join(f'{field} TEXT' for field in self.FIELDS)
+            self.spill_db.execute(
+                f'CREATE TABLE records (code INTEGER PRIMARY KEY, sources TEXT, {columns})'
+            )
+
+        sources = self.dictionary_columns['source_dataset_url']
+        self.spill_db.executemany(
+            f'INSERT INTO records VALUES (?, ?{", ?" * len(self.FIELDS)})',
+            (
+                (key, _pack_sources(self.sources.get(row) or (sources[row],)), *self._row_values(row))
+                for key, row in self.index.items()
+            ),
+        )
+        self.spill_db.commit()
+        self.spilled = array('q', sorted([*self.spilled, *self.index]))
+        self.crawler.stats.inc_value('osbb/dedup/spilled', len(self.index))
+        self.index = {}
+        self.packed = []
+        self.dictionary_columns = {field: array('I') for field in self.DICTIONARY_FIELDS}
+        self.sources = {}
+
+    def _merge_spilled(self, key: int, values: list, source: int) -> list | None:
+        """Доповнює вивантажений запис; повертає його, якщо щось змінилося."""
+        row = self.spill_db.execute('SELECT * FROM records WHERE code = ?', (key,)).fetchone()
+        sources = _unpack_sources(row[1])
+        self._count_pairs(sources, source)
+        record = list(row[2:])
+        changed = _fill_empty(record, values)
+        assignments = ', '.join(f'{field} = ?' for field in self.FIELDS)
+        self.spill_db.execute(
+            f'UPDATE records SET sources = ?, {assignments} WHERE code = ?',
+            (_pack_sources(sources), *record, key),
+        )
+        return record if changed else None
+
+
+def _fill_empty(record: list, values: list) -> bool:
+    """Доповнює порожні поля 'record' значеннями 'values'; True, якщо щось змінилося."""
+    changed = False
+    for position, value in enumerate(values):
+        if value and not record[position]:
+            record[position] = value
+            changed = True
+    return changed
+
+
+def _pack_sources(sources) -> str:
+    return ','.join(map(str, sorted(sources)))
+
+
+def _unpack_sources(packed: str) -> set:
+    return {int(source) for source in packed.split(',')}
+
+
+class SqliteSinkPipeline:
+    """
+    Записує OsbbRecordItem у SQLite великими пакетними транзакціями з upsert.
+
+    Ключ запису — нормалізований ЄДРПОУ, а якщо його немає — місто + адреса,
+    тож повторні обходи оновлюють рядки, а не дублюють їх (порожні значення
+    не затирають уже відомі). Записи пишуться з сигналу item_scraped, тобто
+    база отримує те саме, що й feed-експорт, а також із сигналу
+    record_merged: записи, які EdrpouDedupPipeline доповнив дублікатами.
+
+    Налаштування: OSBB_SQLITE_PATH (без нього пайплайн вимкнено),
+    OSBB_SQLITE_BATCH_SIZE, OSBB_SQLITE_FLUSH_INTERVAL (секунди),
+    OSBB_SQLITE_CACHE_SIZE_KB.
+    """
+
+    FIELDS = ('name', 'edrpou', 'address', 'normalized_address', 'address_key', 'city', 'region', 'phone', 'email',
+              'source_dataset_url', 'latitude', 'longitude', 'cluster_id')
+
+    def __init__(self, crawler, path: str, batch_size: int, flush_interval: float, cache_size_kb: int = 65536):
+        self.crawler = crawler
+        self.path = path
+        # Кеш сторінок SQLite: індекси з випадковими ключами (ЄДРПОУ) мають
+        # поміщатися в пам'ять, інакше швидкість upsert падає з ростом таблиці
+        self.cache_size_kb = cache_size_kb
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.conn = None
+        self.batch = []
+        self.last_flush = time.monotonic()
+
+        columns = ', '.join(self.FIELDS)
+        placeholders = ', '.join('?' for _ in self.FIELDS)
+        # Порожнє значення з нового обходу не затирає вже відоме
+        updates = ', '.join(
+            f"{field} = COALESCE(NULLIF(excluded.{field}, ''), osbb_records.{field})" for field in self.FIELDS
+        )
+        self.upsert_sql = (
+            f'INSERT INTO osbb_records (record_key, {columns}, updated_at) VALUES (?, {placeholders}, ?) '
+            f'ON CONFLICT(record_key) DO UPDATE SET {updates}, updated_at = excluded.updated_at'
+        )
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        path = settings.get('OSBB_SQLITE_PATH')
+        if not path:
+            raise NotConfigured('OSBB_SQLITE_PATH не задано')
+        pipeline = cls(
+            crawler,
+            path,
+            batch_size=settings.getint('OSBB_SQLITE_BATCH_SIZE', 50000),
+            flush_interval=settings.getfloat('OSBB_SQLITE_FLUSH_INTERVAL', 10.0),
+            cache_size_kb=settings.getint('OSBB_SQLITE_CACHE_SIZE_KB', 65536),
+        )
+        crawler.signals.connect(pipeline.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(pipeline.item_scraped, signal=record_merged)
+        crawler.signals.connect(pipeline.spider_closed, signal=signals.spider_closed)
+        return pipeline
+
+    def open_spider(self, spider):
+        self.conn = sqlite3.connect(self.path)
+        self.conn.executescript(f'''
+            PRAGMA journal_mode = WAL;
+            PRAGMA synchronous = NORMAL;
+            PRAGMA cache_size = -{self.cache_size_kb};
+            CREATE TABLE IF NOT EXISTS osbb_records (
+                record_key TEXT PRIMARY KEY,
+                {', '.join(f'{field} TEXT' for field in self.FIELDS)},
+                updated_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS osbb_records_edrpou ON osbb_records (edrpou);
+            CREATE INDEX IF NOT EXISTS osbb_records_city ON osbb_records (city);
+            CREATE INDEX IF NOT EXISTS osbb_records_region ON osbb_records (region);
+        ''')
+        # Бази, створені до появи нових полів (address_key), доповнюємо колонками
+        existing = {row[1] for row in self.conn.execute('PRAGMA table_info(osbb_records)')}
+        for field in self.FIELDS:
+            if field not in existing:
+                self.conn.execute(f'ALTER TABLE osbb_records ADD COLUMN {field} TEXT')
+        self.conn.commit()
+
+    def process_item(self, item, spider):
+        # Запис у базу відбувається в item_scraped — див. docstring
+        return item
+
+    def item_scraped(self, item, spider):
+        key = record_key(item)
+        if key is None:
+            return
+        self.batch.append((key, *((item.get(field) or '') for field in self.FIELDS), time.time()))
+        if len(self.batch) >= self.batch_size or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if self.batch:
+            # Відсортований за ключем пакет змінює менше сторінок B-дерева
+            # (і WAL) на транзакцію, ніж випадковий порядок ЄДРПОУ
+            self.batch.sort(key=lambda row: row[0])
+            with self.conn:
+                self.conn.executemany(self.upsert_sql, self.batch)
+            self.crawler.stats.inc_value('osbb/sqlite/rows_written', len(self.batch))
+            self.batch = []
+        self.last_flush = time.monotonic()
+
+    def spider_closed(self, spider):
+        # spider_closed приходить уже після close_spider усіх пайплайнів
+        self.flush()
+        self.conn.close()
+
+
+def record_key(item) -> str | None:
+    """
+    Стабільний ключ запису: 'edrpou:<код>' або, якщо коду немає,
+    'addr:<канонічний ключ адреси>' (address_key, див. address.py).
+    """
+    code = normalize_edrpou(item.get('edrpou'))
+    if code:
+        return f'edrpou:{code}'
+    key = item.get('address_key') or address_key(item.get('address'), item.get('city'))
+    if not key:
+        return None
+    return f'addr:{key}'
+
+
+class ParquetExportPipeline:
+    """
+    Експорт OsbbRecordItem у Parquet (колонковий формат Arrow).
+
+    Колонки city, region і source_dataset_url мають словникове кодування:
+    повторювані значення зберігаються один раз, а при читанні стають
+    категоріальними. Записи накопичуються і пишуться групами рядків по
+    OSBB_PARQUET_ROW_GROUP_SIZE. Якщо OSBB_PARQUET_PARTITION_BY = 'region',
+    OSBB_PARQUET_PATH стає каталогом у hive-розкладці
+    (region=<область>/part-0.parquet), інакше — одним файлом.
+
+    Як і SqliteSinkPipeline, бере записи з сигналу item_scraped.
+    """
+
+    FIELDS = ('name', 'edrpou', 'address', 'normalized_address', 'address_key', 'city', 'region', 'phone', 'email',
+              'source_dataset_url', 'latitude', 'longitude', 'cluster_id')
+    DICTIONARY_FIELDS = ('city', 'region', 'source_dataset_url')
+    # Так pyarrow позначає порожнє значення ключа розбиття
+    EMPTY_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+
+    def __init__(self, crawler, path: str, row_group_size: int, partition_by: str | None, compression: str):
+        self.crawler = crawler
+        self.path = path
+        self.row_group_size = row_group_size
+        self.partition_by = partition_by
+        self.compression = compression
+        # Колонка розбиття зберігається в назві каталогу, а не у файлах
+        self.fields = tuple(field for field in self.FIELDS if field != partition_by)
+        self.schema = pa.schema([
+            (field, pa.dictionary(pa.int32(), pa.string()) if field in self.DICTIONARY_FIELDS else pa.string())
+            for field in self.fields
+        ])
+        # Ключ розбиття -> (ParquetWriter, буфер колонок)
+        self.writers = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        path = settings.get('OSBB_PARQUET_PATH')
+        if not path:
+            raise NotConfigured('OSBB_PARQUET_PATH не задано')
+        if pa is None:
+            raise NotConfigured('для експорту в Parquet потрібен пакет pyarrow')
+        partition_by = settings.get('OSBB_PARQUET_PARTITION_BY')
+        if partition_by and partition_by not in cls.FIELDS:
+            raise ValueError(f"Невідоме поле OSBB_PARQUET_PARTITION_BY: {partition_by}")
+        pipeline = cls(
+            crawler,
+            path,
+            row_group_size=settings.getint('OSBB_PARQUET_ROW_GROUP_SIZE', 100000),
+            partition_by=partition_by,
+            compression=settings.get('OSBB_PARQUET_COMPRESSION', 'zstd'),
+        )
+        crawler.signals.connect(pipeline.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(pipeline.spider_closed, signal=signals.spider_closed)
+        return pipeline
+
+    def process_item(self, item, spider):
+        # Запис відбувається в item_scraped — див. docstring
+        return item
+
+    def item_scraped(self, item, spider):
+        partition = (item.get(self.partition_by) or '') if self.partition_by else None
+        slot = self.writers.get(partition)
+        if slot is None:
+            slot = self.writers[partition] = [None, {field: [] for field in self.fields}]
+        columns = slot[1]
+        for field in self.fields:
+            columns[field].append(item.get(field) or '')
+        if len(columns['edrpou']) >= self.row_group_size:
+            self._write_row_group(partition, slot)
+
+    def spider_closed(self, spider):
+        for partition, slot in self.writers.items():
+            if slot[1]['edrpou']:
+                self._write_row_group(partition, slot)
+            if slot[0] is not None:
+                slot[0].close()
+        self.writers = {}
+
+    def _write_row_group(self, partition, slot):
+        columns = slot[1]
+        arrays = [
+            pa.array(columns[field], type=pa.string()).dictionary_encode()
+            if field in self.DICTIONARY_FIELDS else pa.array(columns[field], type=pa.string())
+            for field in self.fields
+        ]
+        table = pa.Table.from_arrays(arrays, schema=self.schema)
+        if slot[0] is None:
+            slot[0] = pq.ParquetWriter(self._partition_path(partition), self.schema, compression=self.compression)
+        slot[0].write_table(table, row_group_size=self.row_group_size)
+        self.crawler.stats.inc_value('osbb/parquet/rows_written', table.num_rows)
+        slot[1] = {field: [] for field in self.fields}
+
+    def _partition_path(self, partition) -> str:
+        if partition is None:
+            return self.path
+        directory = os.path.join(self.path, f"{self.partition_by}={quote(partition or self.EMPTY_PARTITION, safe='')}")
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, 'part-0.parquet')
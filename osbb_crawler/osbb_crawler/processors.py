@@ -3,8 +3,39 @@ import io
 import csv
 import json
 import re
+import codecs
+import functools
+import itertools
+import logging
+import time
 import pandas as pd
-from .items import OsbbRecordItem
+import openpyxl
+
+try:
+    # xlrd потрібен лише для старих XLS-файлів у потоковому режимі
+    import xlrd
+except ImportError:
+    xlrd = None
+
+try:
+    # ijson потрібен лише для потокового розбору великих JSON-файлів
+    import ijson
+except ImportError:
+    ijson = None
+from .items import OsbbRecord
+from .spatial import is_mercator, representative_point
+from .instrumentation import (
+    ParseStats,
+    SKIP_CSV_PARSE_ERROR,
+    SKIP_EXCEL_READ_ERROR,
+    SKIP_INVALID_JSON,
+    SKIP_NO_EDRPOU_OR_ADDRESS,
+    SKIP_NOT_A_DICT,
+    SKIP_RECORDS_NOT_FOUND,
+    SKIP_UNSUPPORTED_FORMAT,
+)
+
+logger = logging.getLogger(__name__)
 # Якщо потрібен Excel, тут знадобиться 'pandas' або 'openpyxl'
 
 # osbb_crawler/processors.py (або osbb_crawler/constants.py)
@@ -58,112 +89,383 @@ FIELD_MAPPINGS = {
     'city': ['Місто', 'city', 'addressPostName', 'adminunitl4'],
     'region': ['Область', 'region', 'addressAdminUnitL2', 'address_admin_unit_l2'],
 
+    # Координати будинку (для GeoJSON — з 'geometry', якщо колонок немає)
+    'latitude': ['Широта', 'latitude', 'lat', 'geo_lat'],
+    'longitude': ['Довгота', 'longitude', 'lon', 'lng', 'geo_lon'],
+
     # Компоненти адреси (використовуються для спеціальної логіки в parse_csv)
     'address_street': ['addressThoroughfare', 'Street', 'Вулиця', 'address_thoroughfare'],
     'address_house': ['addressLocatorDesignator', 'address_locator_designator', 'House', 'Номер будинку', 'будинок'],
     
 }
 
-def process_file_content(raw_content: bytes, data_format: str, source_url: str):
+# --- Скомпільований план зіставлення колонок ---
+# find_value_by_priority очищує регулярним виразом увесь запис при кожному виклику,
+# а парсери викликають її дев'ять разів на рядок. Натомість заголовки файлу
+# зіставляються з FIELD_MAPPINGS один раз, а рядки читаються за готовими індексами.
+
+# Поля, які парсери збирають з кожного рядка
+RECORD_FIELDS = ('name', 'edrpou', 'phone', 'email', 'region', 'city',
+                 'address', 'address_street', 'address_house', 'latitude', 'longitude')
+
+_CLEAN_KEY_RE = re.compile(r'[\W_]+')
+
+
+@functools.lru_cache(maxsize=4096)
+def _clean_record_key(key: str) -> str:
+    # Та сама нормалізація, що й для ключів датасету у find_value_by_priority
+    return _CLEAN_KEY_RE.sub('', key.strip().lower())
+
+
+@functools.lru_cache(maxsize=4096)
+def _clean_mapping_key(key: str) -> str:
+    # Та сама нормалізація, що й для ключів FIELD_MAPPINGS у find_value_by_priority
+    return _CLEAN_KEY_RE.sub('', key).strip().lower()
+
+
+def compile_field_plan(keys, mappings: dict = FIELD_MAPPINGS) -> dict:
+    """
+    Зіставляє заголовки файлу (або ключі JSON-запису) з 'mappings' один раз.
+    Повертає словник {поле: кортеж позицій у 'keys'} у порядку пріоритету.
+    Якщо кілька заголовків очищуються до одного ключа, перемагає останній —
+    так само, як у find_value_by_priority.
+    """
+    cleaned_positions = {}
+    for position, key in enumerate(keys):
+        if key is None:
+            continue
+        cleaned_positions[_clean_record_key(str(key))] = position
+
+    plan = {}
+    for field_name, possible_keys in mappings.items():
+        positions = []
+        for mapping_key in possible_keys:
+            position = cleaned_positions.get(_clean_mapping_key(mapping_key))
+            if position is not None and position not in positions:
+                positions.append(position)
+        plan[field_name] = tuple(positions)
+    return plan
+
+
+def resolve_field(values, positions) -> str | None:
+    """
+    Повертає перше непорожнє значення з 'values' за позиціями з плану.
+    Семантика збігається з find_value_by_priority.
+    """
+    for position in positions:
+        value = values[position]
+        if value:
+            return str(value).strip()
+    return None
+
+
+def build_osbb_record(values, plan: dict, source_url: str, address_field: str = 'address'):
+    """
+    Збирає OsbbRecord з рядка 'values' за скомпільованим планом.
+    Повертає None, якщо в записі немає ні ЄДРПОУ, ні адреси.
+    """
+    # --- 1. Фільтрація: ЄДРПОУ АБО адреса (решту полів для пропущених рядків не збираємо) ---
+    edrpou = resolve_field(values, plan['edrpou']) or ''
+    address = resolve_field(values, plan.get(address_field, ()))
+    if not address:
+        # Об'єднання адреси з вулиці та будинку
+        street = resolve_field(values, plan['address_street'])
+        house = resolve_field(values, plan['address_house'])
+        address = ', '.join([p for p in [street, house] if p])
+    if not edrpou and not address:
+        return None
+
+    # --- 2. Збір даних; усі поля — рядки, щоб уникнути помилок експорту CSV ---
+    return OsbbRecord(
+        resolve_field(values, plan['name']) or '',
+        edrpou,
+        resolve_field(values, plan['phone']) or '',
+        resolve_field(values, plan['email']) or '',
+        resolve_field(values, plan['region']) or '',
+        resolve_field(values, plan['city']) or '',
+        address,
+        source_url,
+        resolve_field(values, plan['latitude']) or '',
+        resolve_field(values, plan['longitude']) or '',
+    )
+
+def process_file_content(raw_content: bytes, data_format: str, source_url: str, streaming: bool = False,
+                         stats: ParseStats | None = None, vectorized: bool = False):
     """
     Головна функція-диспетчер, яка викликає відповідний парсер.
-    Повертає генератор OsbbRecordItem.
+    Повертає генератор OsbbRecord (в OsbbRecordItem перетворює павук).
+    Якщо 'streaming' увімкнено, файл розбирається потоково, частинами
+    по STREAM_CHUNK_SIZE байт, без повної декодованої копії в пам'яті.
+    Якщо 'vectorized' увімкнено, CSV та Excel (крім потокового режиму Excel)
+    розбираються через pandas операціями над колонками — див. extract_frame_items.
+    У 'stats' (ParseStats) парсери рахують записи, пропуски та час декодування.
     """
+    if stats is None:
+        stats = ParseStats()
     data_format = data_format.upper()
     
     if data_format == 'CSV':
-        yield from parse_csv(raw_content, source_url)
+        if vectorized:
+            yield from parse_csv_frames(raw_content, source_url, stats, streaming=streaming)
+        elif streaming:
+            yield from parse_csv_stream(iter_chunks(raw_content), source_url, stats)
+        else:
+            yield from parse_csv(raw_content, source_url, stats)
     elif data_format in ['JSON', 'API']:
-        yield from parse_json(raw_content, source_url)
+        if streaming:
+            yield from parse_json_stream(raw_content, source_url, stats)
+        else:
+            yield from parse_json(raw_content, source_url, stats)
     elif data_format in ['XLS', 'XLSX']: 
-        yield from parse_excel(raw_content, source_url)
+        if streaming:
+            yield from parse_excel_stream(raw_content, source_url, stats)
+        else:
+            yield from parse_excel(raw_content, source_url, stats, vectorized=vectorized)
     else:
-        print(f"Непідтримуваний формат: {data_format}")
+        stats.skip(SKIP_UNSUPPORTED_FORMAT)
+        logger.warning(f"Непідтримуваний формат: {data_format} ({source_url})")
 
 # --- Конкретні функції парсингу ---
 
-def parse_csv(raw_content: bytes, source_url: str):
+def parse_csv(raw_content: bytes, source_url: str, stats: ParseStats | None = None):
     """
-    Парсить вміст CSV-файлу і генерує OsbbRecordItem,
+    Парсить вміст CSV-файлу і генерує OsbbRecord,
     з логікою об'єднання вулиці та номера будинку.
     """
-    try:
-        text_content = raw_content.decode('utf-8')
-    except UnicodeDecodeError:
-        text_content = raw_content.decode('cp1251', errors='ignore')
+    if stats is None:
+        stats = ParseStats()
+
+    text_content = _decode_csv(raw_content, stats)
     
     csv_file = io.StringIO(text_content)
-    
-    # Важливо: нормалізуємо заголовки CSV до нижнього регістру без пробілів 
-    # перед тим, як передавати DictReader, щоб find_value_by_priority працював коректно.
-    # Для простоти поки що сподіваємося, що DictReader робить це або заголовки чисті.
-    # Якщо будуть проблеми, цей етап треба додати.
 
     try:
         # Пробуємо вивести діалект/роздільник
         dialect = csv.Sniffer().sniff(text_content[:1024])
-        reader = csv.DictReader(csv_file, dialect=dialect)
+        reader = csv.reader(csv_file, dialect=dialect)
     except Exception:
         # Якщо Sniffer не впорався, використовуємо кому за замовчуванням
         csv_file.seek(0) # Переводимо курсор на початок
-        reader = csv.DictReader(csv_file)
-    
+        reader = csv.reader(csv_file)
+
+    yield from _parse_csv_rows(reader, source_url, stats)
+
+
+def _decode_csv(raw_content: bytes, stats: ParseStats) -> str:
+    started = time.perf_counter()
+    try:
+        text_content = str(raw_content, 'utf-8')
+    except UnicodeDecodeError:
+        text_content = str(raw_content, 'cp1251', errors='ignore')
+    stats.decode_seconds += time.perf_counter() - started
+    return text_content
+
+
+def _parse_csv_rows(reader, source_url: str, stats: ParseStats):
+    """
+    Обробляє рядки csv.reader: перший рядок — заголовки, за якими один раз
+    будується план зіставлення, далі — прямі звертання за індексами.
+    """
+    header = next(reader, None)
+    if header is None:
+        return
+
+    plan = compile_field_plan(header)
+    width = len(header)
+    padding = [''] * width
+
     for row in reader:
-        # Для DictReader ключі row — це заголовки файлу. 
-        # Приводимо ключі рядка до нижнього регістру для коректної роботи find_value_by_priority
-        # Захист від None у ключах та нормалізація
-        normalized_row = {
-            (k.strip().lower() if k is not None else ''): (str(v).strip() if v is not None else '')
-            for k, v in row.items() 
-            if not (k is None and v is None) 
-        }
-        
-        osbb = OsbbRecordItem()
-        # --- 1. Збір даних ---
-        osbb['name'] = find_value_by_priority(normalized_row, 'name', FIELD_MAPPINGS)
-        osbb['edrpou'] = find_value_by_priority(normalized_row, 'edrpou', FIELD_MAPPINGS)
-        osbb['phone'] = find_value_by_priority(normalized_row, 'phone', FIELD_MAPPINGS)
-        osbb['email'] = find_value_by_priority(normalized_row, 'email', FIELD_MAPPINGS)
-        
-        osbb['region'] = find_value_by_priority(normalized_row, 'region', FIELD_MAPPINGS)
-        osbb['city'] = find_value_by_priority(normalized_row, 'city', FIELD_MAPPINGS)
-
-        # --- 2. Об'єднання адреси ---
-        final_address = find_value_by_priority(normalized_row, 'address', FIELD_MAPPINGS)
-        street = find_value_by_priority(normalized_row, 'address_street', FIELD_MAPPINGS)
-        house = find_value_by_priority(normalized_row, 'address_house', FIELD_MAPPINGS)
-       
-        if not final_address:
-             final_address = ', '.join([p for p in [street, house] if p])
-        
-        osbb['address'] = final_address
-        osbb['source_dataset_url'] = source_url
-        
-        # --- 3. Фінальне очищення та фільтрація ---
-        
-        # Гарантуємо, що всі поля є рядками, щоб уникнути помилок експорту CSV
-        for key, value in osbb.items():
-            if value is None:
-                osbb[key] = "" 
+        # Як і DictReader, пропускаємо повністю порожні рядки
+        if not row:
+            continue
+        # Відсутні в кінці рядка комірки вважаємо порожніми (restval DictReader)
+        if len(row) < width:
+            row = row + padding[len(row):]
+        values = [cell.strip() for cell in row]
 
-        # НОВА ЛОГІКА ФІЛЬТРАЦІЇ: ЄДРПОУ АБО Адреса
-        if osbb.get('edrpou') or osbb.get('address'):
+        osbb = build_osbb_record(values, plan, source_url)
+        if osbb is not None:
+            stats.rows_emitted += 1
             yield osbb
         else:
-            print(f"!!! ПОПЕРЕДЖЕННЯ: Пропущено рядок (немає ЄДРПОУ/Адреси) з файлу: {source_url}")
+            stats.skip(SKIP_NO_EDRPOU_OR_ADDRESS)
+
+# --- Потоковий розбір CSV ---
+
+# Розмір частини, якою читається та декодується вміст файлу
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Скільки символів з початку файлу використовується для визначення діалекту
+SNIFF_SIZE = 1024
+
+
+def open_binary(raw_content):
+    """
+    Файлоподібний об'єкт для читання вмісту файлу. Для bytes — BytesIO
+    (без копіювання), для інших буферів (mmap тимчасового файлу, memoryview) —
+    BufferedReader над memoryview, теж без копії всього вмісту.
+    """
+    if isinstance(raw_content, bytes):
+        return io.BytesIO(raw_content)
+    return io.BufferedReader(_BufferReader(raw_content))
+
+
+class _BufferReader(io.RawIOBase):
+    """Читання буфера (mmap, memoryview) як двійкового файлу з довільним доступом."""
+
+    def __init__(self, buffer):
+        self._view = memoryview(buffer)
+        self._position = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, b):
+        chunk = self._view[self._position:self._position + len(b)]
+        size = len(chunk)
+        b[:size] = chunk
+        self._position += size
+        return size
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += len(self._view)
+        self._position = max(offset, 0)
+        return self._position
+
+    def tell(self):
+        return self._position
+
+    def close(self):
+        if not self.closed:
+            self._view.release()
+        super().close()
+
+
+def iter_chunks(raw_content, chunk_size: int = STREAM_CHUNK_SIZE):
+    """
+    Віддає вміст 'raw_content' частинами без копіювання (через memoryview).
+    """
+    view = memoryview(raw_content)
+    for offset in range(0, len(view), chunk_size):
+        yield view[offset:offset + chunk_size]
+
+
+def _utf8_valid_prefix(data: bytes) -> int:
+    try:
+        data.decode('utf-8')
+    except UnicodeDecodeError as e:
+        return e.start
+    return len(data)
+
+
+def iter_decoded(chunks, stats: ParseStats | None = None):
+    """
+    Інкрементально декодує байтові частини в текст.
+    Спочатку пробуємо UTF-8; якщо трапляється некоректна послідовність,
+    решта потоку (разом із недекодованим залишком) читається як cp1251.
+    Час декодування додається до stats.decode_seconds.
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    fallback = None
+
+    for chunk in chunks:
+        started = time.perf_counter()
+        if fallback is None:
+            try:
+                text = decoder.decode(chunk)
+            except UnicodeDecodeError:
+                # Коректний UTF-8 префікс залишаємо, решту читаємо як cp1251
+                data = decoder.getstate()[0] + bytes(chunk)
+                valid = _utf8_valid_prefix(data)
+                fallback = codecs.getincrementaldecoder('cp1251')(errors='ignore')
+                text = data[:valid].decode('utf-8') + fallback.decode(data[valid:])
+        else:
+            text = fallback.decode(chunk)
+        if stats is not None:
+            stats.decode_seconds += time.perf_counter() - started
+        if text:
+            yield text
+
+    if fallback is None:
+        try:
+            text = decoder.decode(b'', final=True)
+        except UnicodeDecodeError:
+            text = decoder.getstate()[0].decode('cp1251', errors='ignore')
+    else:
+        text = fallback.decode(b'', final=True)
+    if text:
+        yield text
+
+
+def iter_lines(texts):
+    """
+    Розбиває потік тексту на рядки (із символом '\n' у кінці), як це робить
+    ітерація по io.StringIO. Рядки з переносами в лапках збирає csv.reader.
+    """
+    pending = ''
+    for text in texts:
+        pending += text
+        lines = pending.split('\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line + '\n'
+    if pending:
+        yield pending
+
+
+def parse_csv_stream(chunks, source_url: str, stats: ParseStats | None = None):
+    """
+    Потоковий варіант parse_csv: приймає ітератор байтових частин,
+    визначає діалект за першими SNIFF_SIZE символами і генерує OsbbRecord
+    у міру розбору рядків. Пам'ять обмежена розміром частини, а не файлу.
+    """
+    if stats is None:
+        stats = ParseStats()
+    texts = iter_decoded(chunks, stats)
+
+    # Накопичуємо початок файлу, достатній для Sniffer
+    head = []
+    head_size = 0
+    for text in texts:
+        head.append(text)
+        head_size += len(text)
+        if head_size >= SNIFF_SIZE:
+            break
+    head = ''.join(head)
+
+    lines = iter_lines(itertools.chain([head], texts))
+    try:
+        # Пробуємо вивести діалект/роздільник
+        dialect = csv.Sniffer().sniff(head[:SNIFF_SIZE])
+        reader = csv.reader(lines, dialect=dialect)
+    except Exception:
+        # Якщо Sniffer не впорався, використовуємо кому за замовчуванням
+        reader = csv.reader(lines)
+
+    yield from _parse_csv_rows(reader, source_url, stats)
 
 # Функція parse_json залишається без змін (просто додайте нові поля, 
 # якщо JSON-файли містять їх у простих ключах)
 
-def parse_json(raw_content: bytes, source_url: str):
+def parse_json(raw_content: bytes, source_url: str, stats: ParseStats | None = None):
     """
-    Парсить вміст JSON-файлу і генерує OsbbRecordItem.
+    Парсить вміст JSON-файлу і генерує OsbbRecord.
     Підтримує прямий список, а також вкладення у ключах 'records', 'data' або 'features' (GeoJSON).
     """
+    if stats is None:
+        stats = ParseStats()
+
     try:
-        data = json.loads(raw_content)
-    except json.JSONDecodeError:
-        print("!!! ПОМИЛКА: Неправильний JSON або кодування.")
+        data = json.loads(raw_content if isinstance(raw_content, bytes) else bytes(raw_content))
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        stats.skip(SKIP_INVALID_JSON)
+        logger.warning(f"Неправильний JSON або кодування: {source_url}")
         return
 
     records = []
@@ -184,10 +486,23 @@ def parse_json(raw_content: bytes, source_url: str):
             
     
     if not records:
-        print(f"!!! ПОПЕРЕДЖЕННЯ: Список об'єктів ОСББ не знайдено в корені, 'data', 'records' або 'features'. Перевірте структуру: {source_url}")
+        stats.skip(SKIP_RECORDS_NOT_FOUND)
+        logger.warning(f"Список об'єктів ОСББ не знайдено в корені, 'data', 'records' або 'features'. Перевірте структуру: {source_url}")
         return
 
-    # 2. Обробка знайденого списку та нормалізація джерела
+    mercator = isinstance(data, dict) and is_mercator(data.get('crs'))
+    yield from _parse_json_records(records, source_url, stats, mercator=mercator)
+
+
+def _parse_json_records(records, source_url: str, stats: ParseStats, mercator: bool = False):
+    """
+    Обробляє ітератор JSON-записів. План зіставлення будується один раз
+    для кожного унікального набору ключів. Для GeoJSON Feature без колонок
+    координат широта й довгота беруться з 'geometry' (representative_point;
+    'mercator' — координати колекції в EPSG:3857).
+    """
+    plans = {}
+
     for record in records:
         
         # Визначаємо джерело даних. Якщо це GeoJSON Feature, 
@@ -200,46 +515,96 @@ def parse_json(raw_content: bytes, source_url: str):
             
         # Якщо з якоїсь причини запис не є словником, пропускаємо його
         if not isinstance(source_record, dict):
-             print(f"!!! ПОПЕРЕДЖЕННЯ: Запис не є словником і буде пропущений: {source_url}")
+             stats.skip(SKIP_NOT_A_DICT)
              continue
-            
-        osbb = OsbbRecordItem()
-        
-        # --- 1. Збір даних (використовуємо source_record) ---
-        osbb['name'] = find_value_by_priority(source_record, 'name', FIELD_MAPPINGS)
-        osbb['edrpou'] = find_value_by_priority(source_record, 'edrpou', FIELD_MAPPINGS)
-        osbb['phone'] = find_value_by_priority(source_record, 'phone', FIELD_MAPPINGS)
-        osbb['email'] = find_value_by_priority(source_record, 'email', FIELD_MAPPINGS)
-        
-        osbb['region'] = find_value_by_priority(source_record, 'region', FIELD_MAPPINGS)
-        osbb['city'] = find_value_by_priority(source_record, 'city', FIELD_MAPPINGS)
-        
-        # --- 2. Об'єднання адреси ---
-        # Спочатку шукаємо повну адресу
-        final_address = find_value_by_priority(source_record, 'address', FIELD_MAPPINGS)
-        
-        # Якщо повну адресу не знайдено, пробуємо зібрати з компонентів
-        street = find_value_by_priority(source_record, 'address_street', FIELD_MAPPINGS)
-        house = find_value_by_priority(source_record, 'address_house', FIELD_MAPPINGS)
-        
-        if not final_address:
-             final_address = ', '.join([p for p in [street, house] if p])
-        
-        osbb['address'] = final_address
-        osbb['source_dataset_url'] = source_url
-        
-        # --- 3. Фінальне очищення та фільтрація ---
-        
-        # Гарантуємо, що всі поля є рядками, щоб уникнути помилок експорту CSV
-        for key in osbb.fields:
-            if osbb.get(key) is None:
-                osbb[key] = "" 
 
-        # НОВА ЛОГІКА ФІЛЬТРАЦІЇ: ЄДРПОУ АБО Адреса
-        if osbb.get('edrpou') or osbb.get('address'):
+        keys = tuple(source_record)
+        plan = plans.get(keys)
+        if plan is None:
+            plan = plans[keys] = compile_field_plan(keys)
+
+        osbb = build_osbb_record(list(source_record.values()), plan, source_url)
+        if osbb is not None:
+            if source_record is not record and not (osbb.latitude and osbb.longitude):
+                point = representative_point(record.get('geometry'), mercator)
+                if point is not None:
+                    osbb = osbb._replace(latitude=f'{point[1]:.6f}', longitude=f'{point[0]:.6f}')
+            stats.rows_emitted += 1
             yield osbb
         else:
-            print(f"!!! ПОПЕРЕДЖЕННЯ: Пропущено рядок (немає ЄДРПОУ/Адреси) з JSON/API: {source_url}")
+            stats.skip(SKIP_NO_EDRPOU_OR_ADDRESS)
+
+# --- Потоковий розбір JSON ---
+
+# Файли, менші за цей розмір, розбираються звичайним json.loads
+JSON_STREAMING_MIN_SIZE = 4 * 1024 * 1024
+
+# Ключі кореневого словника, у яких шукається масив записів (як у parse_json)
+JSON_RECORD_KEYS = ('data', 'records', 'features')
+
+
+def parse_json_stream(raw_content: bytes, source_url: str, stats: ParseStats | None = None):
+    """
+    Потоковий варіант parse_json для великих файлів: знаходить масив записів
+    інкрементально і віддає записи по одному, тож у пам'яті одночасно лише
+    один запис (для GeoJSON — разом з його 'geometry', з якої беруться координати).
+    Для малих файлів, без ijson або для незвичної структури — parse_json.
+    """
+    if stats is None:
+        stats = ParseStats()
+
+    if ijson is None or len(raw_content) < JSON_STREAMING_MIN_SIZE:
+        yield from parse_json(raw_content, source_url, stats)
+        return
+
+    try:
+        records_prefix = _find_json_records_prefix(raw_content)
+    except Exception:
+        records_prefix = None
+
+    if records_prefix is None:
+        yield from parse_json(raw_content, source_url, stats)
+        return
+
+    mercator = records_prefix == 'features.item' and is_mercator(_find_geojson_crs(raw_content))
+    records = ijson.items(open_binary(raw_content), records_prefix, use_float=True)
+
+    try:
+        yield from _parse_json_records(records, source_url, stats, mercator=mercator)
+    except ijson.JSONError as e:
+        stats.skip(SKIP_INVALID_JSON)
+        logger.warning(f"Неправильний JSON або кодування: {source_url}: {e}")
+
+
+def _find_json_records_prefix(raw_content: bytes) -> str | None:
+    """
+    Переглядає лише початок структури документа й повертає ijson-префікс
+    масиву записів: 'item' для кореневого списку або '<ключ>.item' для
+    першого з JSON_RECORD_KEYS, значенням якого є список.
+    """
+    events = ijson.parse(open_binary(raw_content))
+
+    # Перша подія визначає тип кореня
+    _, event, _ = next(events, ('', None, None))
+    if event == 'start_array':
+        return 'item'
+    if event != 'start_map':
+        return None
+
+    for prefix, event, value in events:
+        if event == 'start_array' and prefix in JSON_RECORD_KEYS:
+            return f'{prefix}.item'
+    return None
+
+
+def _find_geojson_crs(raw_content: bytes) -> dict | None:
+    """Член 'crs' GeoJSON, якщо він стоїть до масиву 'features' (як зазвичай)."""
+    for prefix, event, value in ijson.parse(open_binary(raw_content)):
+        if prefix == 'crs.properties.name' and event == 'string':
+            return {'properties': {'name': value}}
+        if prefix == 'features' and event == 'start_array':
+            return None
+    return None
 
 # osbb_crawler/processors.py
 
@@ -247,56 +612,366 @@ def parse_json(raw_content: bytes, source_url: str):
 # ... (parse_csv)
 # ... (parse_json)
 
-def parse_excel(raw_content: bytes, source_url: str):
+def parse_excel(raw_content: bytes, source_url: str, stats: ParseStats | None = None, vectorized: bool = False):
     """
-    Парсить вміст Excel-файлу (XLS/XLSX) і генерує OsbbRecordItem.
-    Вимагає pandas та openpyxl.
+    Парсить вміст Excel-файлу (XLS/XLSX) і генерує OsbbRecord.
+    Вимагає pandas та openpyxl (для XLS — xlrd). З 'vectorized' поля
+    витягуються операціями над колонками DataFrame, а не по рядках.
+
+    Комірки читаються як є (dtype=object), без виведення типів колонок:
+    текст '01234567' лишається текстом, а ціле число в колонці з пропусками
+    не стає float. Порожня комірка дає '' — як у parse_excel_stream.
     """
+    if stats is None:
+        stats = ParseStats()
+
     try:
         # 1. Читаємо Excel-файл з бінарного вмісту в DataFrame
-        # io.BytesIO(raw_content) дозволяє pandas читати дані з пам'яті
-        df = pd.read_excel(io.BytesIO(raw_content), engine='openpyxl')
+        # open_binary(raw_content) дозволяє pandas читати дані з пам'яті
+        df = pd.read_excel(open_binary(raw_content), engine=_excel_engine(raw_content), dtype=object)
     except Exception as e:
-        print(f"!!! ПОМИЛКА: Не вдалося прочитати Excel-файл {source_url}: {e}")
+        stats.skip(SKIP_EXCEL_READ_ERROR)
+        logger.warning(f"Не вдалося прочитати Excel-файл {source_url}: {e}")
         return
 
-    # 2. Перетворюємо DataFrame на список словників і обробляємо кожен рядок
-    for row_dict in df.to_dict('records'):
-        # Normalize keys (pandas columns) to lowercase for find_value_by_priority
-        source_record = {
-            (k.strip().lower() if k is not None else ''): (str(v).strip() if v is not None else '')
-            for k, v in row_dict.items() 
-        }
-        
-        osbb = OsbbRecordItem()
-        
-        # --- 1. Збір даних (Аналогічно CSV/JSON) ---
-        osbb['name'] = find_value_by_priority(source_record, 'name', FIELD_MAPPINGS)
-        osbb['edrpou'] = find_value_by_priority(source_record, 'edrpou', FIELD_MAPPINGS)
-        osbb['phone'] = find_value_by_priority(source_record, 'phone', FIELD_MAPPINGS)
-        osbb['email'] = find_value_by_priority(source_record, 'email', FIELD_MAPPINGS)
-        
-        osbb['region'] = find_value_by_priority(source_record, 'region', FIELD_MAPPINGS)
-        osbb['city'] = find_value_by_priority(source_record, 'city', FIELD_MAPPINGS)
-
-        # --- 2. Об'єднання адреси ---
-        final_address = find_value_by_priority(source_record, 'address_full', FIELD_MAPPINGS)
-        street = find_value_by_priority(source_record, 'address_street', FIELD_MAPPINGS)
-        house = find_value_by_priority(source_record, 'address_house', FIELD_MAPPINGS)
-       
-        if not final_address: 
-             final_address = ', '.join([p for p in [street, house] if p])
-        
-        osbb['address'] = final_address
-        osbb['source_dataset_url'] = source_url
-        
-        # --- 3. Фінальне очищення та фільтрація ---
-        for key in osbb.fields:
-            if osbb.get(key) is None:
-                osbb[key] = "" 
+    # Повністю порожні рядки пропускаємо, як parse_excel_stream
+    df = df.dropna(how='all')
 
-        if osbb.get('edrpou') or osbb.get('address'):
+    # 2. Колонки зіставляємо один раз, потім обробляємо кожен рядок
+    plan = compile_field_plan(list(df.columns))
+
+    if vectorized:
+        yield from extract_frame_items(df, plan, source_url, stats, address_field='address_full')
+        return
+
+    for row in df.itertuples(index=False, name=None):
+        values = [_excel_cell(v) for v in row]
+
+        # Excel-парсер історично шукає повну адресу під ключем 'address_full',
+        # якого немає у FIELD_MAPPINGS, тож адреса збирається з вулиці та будинку.
+        osbb = build_osbb_record(values, plan, source_url, address_field='address_full')
+        if osbb is not None:
+            stats.rows_emitted += 1
+            yield osbb
+        else:
+            stats.skip(SKIP_NO_EDRPOU_OR_ADDRESS)
+
+
+# --- Потоковий розбір Excel ---
+
+# Сигнатура OLE2-контейнера, у якому зберігаються старі XLS-файли
+# (XLSX — це zip-архів і починається з b'PK')
+XLS_MAGIC = b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1'
+
+
+def parse_excel_stream(raw_content: bytes, source_url: str, stats: ParseStats | None = None):
+    """
+    Потоковий варіант parse_excel: читає аркуш рядок за рядком, не будуючи
+    DataFrame і списку словників. XLSX читається через openpyxl у режимі
+    read_only (iterparse по XML аркуша), старий XLS — через xlrd з on_demand.
+
+    Значення комірок збігаються з pandas-шляхом: обидва перетворюють комірки
+    на текст через _excel_cell.
+    """
+    if stats is None:
+        stats = ParseStats()
+
+    try:
+        if _excel_engine(raw_content) == 'xlrd':
+            rows = _iter_xls_rows(raw_content)
+        else:
+            rows = _iter_xlsx_rows(raw_content)
+        header = _next_header(rows)
+    except Exception as e:
+        stats.skip(SKIP_EXCEL_READ_ERROR)
+        logger.warning(f"Не вдалося прочитати Excel-файл {source_url}: {e}")
+        return
+
+    if header is None:
+        return
+
+    plan = compile_field_plan(_dedupe_columns(header))
+    width = len(header)
+
+    for row in rows:
+        values = [_excel_cell(v) for v in row[:width]]
+        if not any(values):
+            continue
+        if len(values) < width:
+            values.extend([''] * (width - len(values)))
+
+        # Як і в parse_excel, повна адреса шукається під ключем 'address_full'
+        osbb = build_osbb_record(values, plan, source_url, address_field='address_full')
+        if osbb is not None:
+            stats.rows_emitted += 1
             yield osbb
         else:
-            print(f"!!! ПОПЕРЕДЖЕННЯ: Пропущено рядок (немає ЄДРПОУ/Адреси) з Excel: {source_url}")
+            stats.skip(SKIP_NO_EDRPOU_OR_ADDRESS)
+
+
+def _excel_engine(raw_content) -> str:
+    """Рушій pandas для файлу: xlrd для старого XLS, openpyxl для XLSX."""
+    return 'xlrd' if bytes(raw_content[:len(XLS_MAGIC)]) == XLS_MAGIC else 'openpyxl'
+
+
+def _iter_xlsx_rows(raw_content):
+    workbook = openpyxl.load_workbook(open_binary(raw_content), read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        yield from sheet.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def _iter_xls_rows(raw_content):
+    if xlrd is None:
+        raise RuntimeError("для читання XLS потрібен пакет xlrd")
+
+    # xlrd сам читає файли через mmap, тож приймає його як file_contents без копії
+    if isinstance(raw_content, memoryview):
+        raw_content = bytes(raw_content)
+    workbook = xlrd.open_workbook(file_contents=raw_content, on_demand=True)
+    try:
+        sheet = workbook.sheet_by_index(0)
+        for row_index in range(sheet.nrows):
+            yield [_xls_cell(cell, workbook.datemode) for cell in sheet.row(row_index)]
+    finally:
+        workbook.release_resources()
+
+
+def _xls_cell(cell, datemode):
+    # Те саме перетворення типів, яке робить pandas для xlrd
+    if cell.ctype == xlrd.XL_CELL_DATE:
+        return xlrd.xldate.xldate_as_datetime(cell.value, datemode)
+    if cell.ctype == xlrd.XL_CELL_BOOLEAN:
+        return bool(cell.value)
+    if cell.ctype == xlrd.XL_CELL_NUMBER:
+        value = cell.value
+        return int(value) if value == int(value) else value
+    if cell.ctype in (xlrd.XL_CELL_EMPTY, xlrd.XL_CELL_BLANK, xlrd.XL_CELL_ERROR):
+        return None
+    return cell.value
+
+
+def _next_header(rows):
+    """Повертає перший непорожній рядок аркуша — заголовки колонок."""
+    for row in rows:
+        if any(v is not None and str(v).strip() for v in row):
+            return list(row)
+    return None
+
+
+def _dedupe_columns(header):
+    """
+    Перейменовує дублікати заголовків так само, як pandas ('Назва', 'Назва.1'),
+    щоб пріоритет колонок збігався з pandas-шляхом.
+    """
+    seen = {}
+    columns = []
+    for value in header:
+        column = '' if value is None else str(value)
+        count = seen.get(column, 0)
+        seen[column] = count + 1
+        columns.append(column if count == 0 else f'{column}.{count}')
+    return columns
+
+
+def _excel_cell(value) -> str:
+    """
+    Комірка Excel як текст — однаково для потокового і pandas-шляху.
+    Порожня комірка (None, а в pandas — NaN/NaT) дає '', ціле число,
+    збережене як float, — запис без '.0' (так його віддає pandas).
+    """
+    if value is None or value is pd.NaT:
+        return ''
+    if isinstance(value, float):
+        if value != value:
+            return ''
+        if value.is_integer():
+            value = int(value)
+    return str(value).strip()
+
+
+# --- Векторизований розбір табличних даних (pandas) ---
+# Колонки FIELD_MAPPINGS зіставляються один раз, а очищення, вибір першого
+# непорожнього значення, склеювання вулиці з будинком і фільтр
+# "ЄДРПОУ або адреса" виконуються над цілими колонками. OsbbRecord
+# створюються лише для рядків, що пройшли фільтр. Результат збігається
+# з рядковим шляхом (build_osbb_record).
+
+# Скільки рядків CSV читати за раз у потоковому векторизованому режимі
+FRAME_CHUNK_ROWS = 50000
+
+
+def extract_frame_items(frame, plan: dict, source_url: str, stats: ParseStats, address_field: str = 'address'):
+    """
+    Генерує OsbbRecord з DataFrame за планом compile_field_plan
+    (позиції в плані — номери колонок 'frame').
+    """
+    texts = {}
+
+    def column(position):
+        if position not in texts:
+            texts[position] = _frame_text(frame.iloc[:, position])
+        return texts[position]
+
+    def coalesce(positions):
+        # Перше непорожнє значення за пріоритетом, як у resolve_field
+        result = None
+        for position in reversed(positions):
+            values = column(position)
+            result = values if result is None else values.where(values != '', result)
+        if result is None:
+            return pd.Series('', index=frame.index, dtype=object)
+        return result
+
+    name = coalesce(plan['name'])
+    edrpou = coalesce(plan['edrpou'])
+    phone = coalesce(plan['phone'])
+    email = coalesce(plan['email'])
+    region = coalesce(plan['region'])
+    city = coalesce(plan['city'])
+
+    # Адреса: повна, інакше "вулиця, будинок" з непорожніх частин
+    address = coalesce(plan.get(address_field, ()))
+    street = coalesce(plan['address_street'])
+    house = coalesce(plan['address_house'])
+    has_street = street != ''
+    has_house = house != ''
+    street_house = street.where(~(has_street & has_house), street + ', ' + house)
+    street_house = street_house.where(has_street, house)
+    address = address.where(address != '', street_house)
+
+    keep = ((edrpou != '') | (address != '')).to_numpy()
+    kept = int(keep.sum())
+    if kept < len(keep):
+        stats.skip(SKIP_NO_EDRPOU_OR_ADDRESS, len(keep) - kept)
+
+    latitude = coalesce(plan['latitude'])
+    longitude = coalesce(plan['longitude'])
+
+    columns = [values[keep].tolist() for values in (name, edrpou, phone, email, region, city, address)]
+    coordinates = [values[keep].tolist() for values in (latitude, longitude)]
+    stats.rows_emitted += kept
+    # Кортежі полів одразу стають OsbbRecord, без проміжних словників
+    yield from map(OsbbRecord._make, zip(*columns, itertools.repeat(source_url, kept), *coordinates))
+
+
+def _frame_text(values):
+    """
+    Колонка як рядки, обрізані з обох боків, — те саме, що str(v).strip()
+    у рядковому шляху; порожня комірка (None, NaN, NaT) дає '', як у _excel_cell.
+    """
+    if values.dtype.kind in 'mM':
+        # Дати — через str(Timestamp), як при обході рядків
+        values = values.astype(object)
+    missing = values.isna()
+    text = values.astype(str)
+    if missing.any():
+        text = text.astype(object)
+        text[missing] = ''
+    return text.str.strip()
+
+
+def parse_csv_frames(raw_content, source_url: str, stats: ParseStats | None = None, streaming: bool = False):
+    """
+    Векторизований варіант parse_csv: файл читає швидкий C-парсер pandas
+    (лише колонки з плану), а поля витягує extract_frame_items.
+    З 'streaming' текст декодується частинами, а DataFrame будується
+    по FRAME_CHUNK_ROWS рядків.
+    """
+    if stats is None:
+        stats = ParseStats()
+
+    if streaming:
+        texts = iter_decoded(iter_chunks(raw_content), stats)
+    else:
+        texts = iter([_decode_csv(raw_content, stats)])
+
+    # Початок файлу: для Sniffer і для повного рядка заголовків
+    head = ''
+    for text in texts:
+        head += text
+        if len(head) >= SNIFF_SIZE and '\n' in head:
+            break
+
+    try:
+        # Пробуємо вивести діалект/роздільник
+        dialect = csv.Sniffer().sniff(head[:SNIFF_SIZE])
+    except Exception:
+        # Якщо Sniffer не впорався, використовуємо кому за замовчуванням
+        dialect = csv.excel
+
+    header_reader = csv.reader(iter_lines([head]), dialect=dialect)
+    header = next(header_reader, None)
+    # Заголовок з переносами в лапках може не вміститися в початок файлу
+    # (або файл починається з порожнього рядка) — такий файл читаємо по рядках
+    if not header or header_reader.line_num >= head.count('\n'):
+        lines = iter_lines(itertools.chain([head], texts))
+        yield from _parse_csv_rows(csv.reader(lines, dialect=dialect), source_url, stats)
+        return
+
+    plan = compile_field_plan(header)
+    # Читаємо лише потрібні колонки; для файлу без жодної відомої колонки
+    # беремо першу, щоб порахувати пропущені рядки
+    usecols = sorted({position for positions in plan.values() for position in positions}) or [0]
+    frame_positions = {position: index for index, position in enumerate(usecols)}
+    frame_plan = {
+        field: tuple(frame_positions[position] for position in positions)
+        for field, positions in plan.items()
+    }
+
+    try:
+        frames = pd.read_csv(
+            _TextStream(texts, head), dialect=dialect, header=None, usecols=usecols,
+            dtype=object, na_filter=False, chunksize=FRAME_CHUNK_ROWS if streaming else None,
+        )
+        if not streaming:
+            frames = [frames]
+        first = True
+        for frame in frames:
+            if first:
+                # Перший рядок — заголовки, уже розібрані csv.reader
+                frame = frame.iloc[1:]
+                first = False
+            yield from extract_frame_items(frame, frame_plan, source_url, stats)
+    except pd.errors.ParserError as e:
+        if streaming:
+            stats.skip(SKIP_CSV_PARSE_ERROR)
+            logger.warning(f"Не вдалося розібрати CSV {source_url}: {e}")
+            return
+        # Файл цілком у пам'яті — повторюємо розбір по рядках
+        logger.info(f"CSV {source_url} не читається через pandas ({e}), розбір по рядках")
+        lines = iter_lines([head])
+        yield from _parse_csv_rows(csv.reader(lines, dialect=dialect), source_url, stats)
+
+
+class _TextStream:
+    """
+    Файлоподібний об'єкт над ітератором текстових частин для pd.read_csv:
+    спершу віддає вже прочитаний початок 'head', далі — решту частин.
+    """
+
+    def __init__(self, texts, head: str = ''):
+        self._texts = texts
+        self._buffer = head
+        # Позиція в буфері: не копіюємо залишок (для файлу в пам'яті — весь текст)
+        self._position = 0
+
+    def read(self, size: int = -1) -> str:
+        while size < 0 or len(self._buffer) - self._position < size:
+            text = next(self._texts, None)
+            if text is None:
+                break
+            self._buffer = self._buffer[self._position:] + text
+            self._position = 0
+        end = len(self._buffer) if size < 0 else self._position + size
+        data = self._buffer[self._position:end]
+        self._position += len(data)
+        return data
 
+    def __iter__(self):
+        # pandas вважає джерело файлом, лише якщо воно ще й ітерується
+        rest = self._buffer[self._position:]
+        self._buffer, self._position = '', 0
+        return iter_lines(itertools.chain([rest], self._texts))
@@ -0,0 +1,522 @@
+# osbb_crawler/query.py
+import csv
+import functools
+import json
+import logging
+import os
+import re
+import signal
+import sqlite3
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+import numpy as np
+
+from .address import address_key
+from .pipelines import SqliteSinkPipeline, normalize_edrpou
+
+try:
+    # pyarrow потрібен лише для читання результатів ParquetExportPipeline
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+logger = logging.getLogger(__name__)
+
+# Поля запису в індексі — ті самі, що в SQLite-базі результатів
+FIELDS = SqliteSinkPipeline.FIELDS
+_FIELD_INDEX = {field: position for position, field in enumerate(FIELDS)}
+
+# Слова, які є майже в кожній назві ОСББ: у пошуку вони нічого не звужують
+NAME_STOPWORDS = frozenset({
+    'осбб', 'об', 'єднання', 'обєднання', 'співвласників', 'співвласн', 'багатоквартирного',
+    'багатоквартирних', 'будинку', 'будинків', 'будинок',
+})
+
+# Слово запиту шукається як префікс, якщо в ньому щонайменше стільки літер (коротші — точно)
+MIN_PREFIX_LENGTH = 3
+
+# Скільки об'єднаних списків номерів за префіксом тримати в кеші індексу
+PREFIX_CACHE_SIZE = 4096
+
+# Значення фасетів (city, region), за якими можна фільтрувати пошук
+FACET_FIELDS = ('city', 'region')
+
+_TOKEN_RE = re.compile(r"[^\W_]+")
+_APOSTROPHES = str.maketrans('', '', "'ʼ’`")
+
+
+def tokenize(text) -> list:
+    """Слова тексту в нижньому регістрі, без апострофів і лапок."""
+    if not text:
+        return []
+    return _TOKEN_RE.findall(str(text).lower().translate(_APOSTROPHES))
+
+
+def facet_key(value) -> str:
+    return ' '.join(tokenize(value))
+
+
+class QueryIndex:
+    """
+    Незмінний індекс результатів обходу в пам'яті для QueryService.
+
+    Записи зберігаються кортежами полів FIELDS, ідентифікатор запису — його
+    номер. Індекси:
+
+    * ЄДРПОУ — словник нормалізований код -> номер (або кортеж номерів);
+    * назви та адреси — інвертовані індекси слово -> відсортований масив
+      номерів (numpy uint32) і відсортовані списки слів для пошуку за
+      префіксами слів запиту;
+    * адреса — словник 'вулиця|будинок' з канонічного address_key ->
+      номери, щоб знаходити будинок незалежно від написання адреси;
+    * фасети — значення city/region -> масив номерів, а також колонка
+      номерів значень на кожен запис: фільтр і підрахунок фасетів серед
+      результатів не торкаються самих записів.
+    """
+
+    def __init__(self, records, source: str = ''):
+        self.source = source
+        self.loaded_at = time.time()
+        self.records = []
+        edrpou = {}
+        names = {}
+        streets = {}
+        addresses = {}
+        facets = {field: {} for field in FACET_FIELDS}
+        # Номер значення фасету (0 — порожнє) і його показуване написання (перше)
+        self.facet_ids = {field: {} for field in FACET_FIELDS}
+        self.facet_labels = {field: [''] for field in FACET_FIELDS}
+        self.facet_columns = {field: array('I') for field in FACET_FIELDS}
+
+        for record in records:
+            number = len(self.records)
+            values = tuple(str(record.get(field) or '') for field in FIELDS)
+            self.records.append(values)
+
+            code = normalize_edrpou(values[_FIELD_INDEX['edrpou']])
+            if code:
+                edrpou.setdefault(code, []).append(number)
+            for token in set(tokenize(values[_FIELD_INDEX['name']])) - NAME_STOPWORDS:
+                names.setdefault(token, []).append(number)
+
+            key = values[_FIELD_INDEX['address_key']] or address_key(
+                values[_FIELD_INDEX['address']], values[_FIELD_INDEX['city']]) or ''
+            if key:
+                street_house = key.split('|', 1)[-1]
+                addresses.setdefault(street_house, []).append(number)
+                for token in set(tokenize(street_house)):
+                    streets.setdefault(token, []).append(number)
+
+            for field in FACET_FIELDS:
+                label = values[_FIELD_INDEX[field]]
+                value = facet_key(label)
+                value_id = 0
+                if value:
+                    facets[field].setdefault(value, []).append(number)
+                    value_id = self.facet_ids[field].get(value)
+                    if value_id is None:
+                        value_id = self.facet_ids[field][value] = len(self.facet_labels[field])
+                        self.facet_labels[field].append(label)
+                self.facet_columns[field].append(value_id)
+
+        # Одиничні значення — числом, а не списком: більшість кодів унікальні
+        self.edrpou = {code: numbers[0] if len(numbers) == 1 else tuple(numbers) for code, numbers in edrpou.items()}
+        self.names = _postings(names)
+        self.name_tokens = sorted(self.names)
+        self.streets = _postings(streets)
+        self.street_tokens = sorted(self.streets)
+        self.addresses = _postings(addresses)
+        self.facets = {field: _postings(values) for field, values in facets.items()}
+        self.facet_columns = {field: np.frombuffer(column, dtype=np.uint32) for field, column in self.facet_columns.items()}
+        # Об'єднання списків за префіксом ('світ' -> 'світанок', 'світлиця') повторюються між запитами
+        self._prefix_postings = functools.lru_cache(maxsize=PREFIX_CACHE_SIZE)(self._expand_prefix)
+
+    def __len__(self):
+        return len(self.records)
+
+    def record(self, number: int) -> dict:
+        return dict(zip(FIELDS, self.records[number]))
+
+    # --- Запити; всі повертають відсортовані номери записів (список або масив numpy) ---
+
+    def find_edrpou(self, code) -> list:
+        numbers = self.edrpou.get(normalize_edrpou(code))
+        if numbers is None:
+            return []
+        return [numbers] if isinstance(numbers, int) else list(numbers)
+
+    def find_address(self, address, city=None) -> list:
+        """Будинок за адресою в будь-якому написанні; 'city' звужує пошук."""
+        key = address_key(address, city)
+        if not key:
+            return []
+        city_key, street_house = key.split('|', 1)
+        numbers = list(self.addresses.get(street_house, ()))
+        if city_key:
+            numbers = [
+                number for number in numbers
+                if (self.records[number][_FIELD_INDEX['address_key']] or '|').split('|', 1)[0] in (city_key, '')
+            ]
+        return numbers
+
+    def search(self, name=None, address=None, city=None, region=None):
+        """
+        Записи, в назві яких є всі слова 'name', а в адресі — всі слова
+        'address' (слова від MIN_PREFIX_LENGTH літер — як префікси), з
+        містом 'city' і областю 'region'. Повертає масив номерів або None, якщо умов немає.
+        """
+        sets = []
+        if name:
+            sets.append(self._match_tokens(tokenize(name), 'names', NAME_STOPWORDS))
+        if address:
+            sets.append(self._match_tokens(_address_tokens(address), 'streets'))
+        sets = [numbers for numbers in sets if numbers is not None]
+        numbers = _intersect(sets) if sets else None
+
+        for field, value in (('city', city), ('region', region)):
+            if not value:
+                continue
+            value = facet_key(value)
+            if numbers is None:
+                numbers = self.facets[field].get(value, _EMPTY)
+            else:
+                # Фільтр за колонкою номерів значень, без перетину з довгим списком фасету
+                value_id = self.facet_ids[field].get(value, -1)
+                numbers = numbers[self.facet_columns[field][numbers] == value_id]
+        return numbers
+
+    def facet_counts(self, numbers, limit: int = 10) -> dict:
+        """Найчастіші міста й області серед записів 'numbers'."""
+        result = {}
+        for field in FACET_FIELDS:
+            labels = self.facet_labels[field]
+            counts = np.bincount(self.facet_columns[field][numbers], minlength=len(labels))
+            counts[0] = 0
+            top = np.argsort(-counts, kind='stable')[:limit]
+            result[field] = [[labels[value_id], int(counts[value_id])] for value_id in top if counts[value_id]]
+        return result
+
+    def facet_values(self, field: str, limit: int = 100) -> list:
+        """Значення фасету по всьому індексу: [[значення, кількість], ...]."""
+        values = self.facets.get(field, {})
+        top = sorted(values.items(), key=lambda item: -len(item[1]))[:limit]
+        return [[self.facet_labels[field][self.facet_ids[field][value]], len(numbers)] for value, numbers in top]
+
+    def _match_tokens(self, tokens, kind: str, stopwords=frozenset()):
+        tokens = [token for token in tokens if token not in stopwords]
+        if not tokens:
+            return None
+        postings = getattr(self, kind)
+        sets = [
+            postings.get(token, _EMPTY) if len(token) < MIN_PREFIX_LENGTH else self._prefix_postings(kind, token)
+            for token in tokens
+        ]
+        return _intersect(sets)
+
+    def _expand_prefix(self, kind: str, prefix: str):
+        """Номери записів зі словами, що починаються з 'prefix', в індексі 'kind' (names або streets)."""
+        postings = getattr(self, kind)
+        words = self.name_tokens if kind == 'names' else self.street_tokens
+        # Слова з цим префіксом лежать поспіль у відсортованому списку
+        start = bisect_left(words, prefix)
+        end = bisect_left(words, prefix + '\uffff', start)
+        if end - start == 1:
+            return postings[words[start]]
+        if end == start:
+            return _EMPTY
+        return np.unique(np.concatenate([postings[word] for word in words[start:end]]))
+
+
+_EMPTY = np.empty(0, dtype=np.uint32)
+
+
+def _postings(index: dict) -> dict:
+    return {key: np.array(numbers, dtype=np.uint32) for key, numbers in index.items()}
+
+
+def _intersect(sets):
+    """Перетин відсортованих масивів номерів, починаючи з найкоротшого."""
+    sets = sorted(sets, key=len)
+    result = sets[0]
+    for numbers in sets[1:]:
+        if not len(result):
+            break
+        # Бінарний пошук кожного номера з коротшого масиву в довшому
+        positions = np.minimum(np.searchsorted(numbers, result), len(numbers) - 1)
+        result = result[numbers[positions] == result]
+    return result
+
+
+def _address_tokens(address) -> list:
+    # Слова канонічного ключа: 'вулиця Шевченка, буд. 9-а' і 'Шевченка 9А' дають те саме
+    key = address_key(address)
+    return tokenize(key.split('|', 1)[-1]) if key else tokenize(address)
+
+
+# --- Джерела даних ---
+
+SQLITE_SUFFIXES = ('.sqlite', '.sqlite3', '.db')
+
+
+def iter_source_records(path: str):
+    """
+    Записи (словники) з результатів обходу: SQLite-база SqliteSinkPipeline,
+    Parquet-файл або каталог ParquetExportPipeline, CSV, JSON Lines чи JSON.
+    """
+    lower = path.lower()
+    if os.path.isdir(path) or lower.endswith('.parquet'):
+        if pq is None:
+            raise RuntimeError('Для читання Parquet потрібен pyarrow')
+        for batch in pq.read_table(path).to_batches():
+            yield from batch.to_pylist()
+    elif lower.endswith(SQLITE_SUFFIXES):
+        # Лише читання: обхід може писати в ту саму базу
+        conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True)
+        conn.row_factory = sqlite3.Row
+        try:
+            for row in conn.execute('SELECT * FROM osbb_records'):
+                yield dict(row)
+        finally:
+            conn.close()
+    elif lower.endswith('.csv'):
+        with open(path, encoding='utf-8-sig', newline='') as f:
+            yield from csv.DictReader(f)
+    elif lower.endswith(('.jl', '.jsonl')):
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        with open(path, encoding='utf-8') as f:
+            yield from json.load(f)
+
+
+def source_signature(path: str) -> tuple:
+    """
+    (час зміни, розмір) джерела, для каталогу — всіх його файлів. Для SQLite
+    лише основний файл: поки обхід пише, зміни лежать у WAL, а в основний
+    файл переносяться, коли SqliteSinkPipeline закриває базу наприкінці обходу.
+    """
+    if os.path.isdir(path):
+        files = [os.path.join(root, name) for root, _, names in os.walk(path) for name in names]
+    else:
+        files = [path]
+    signature = []
+    for file_path in sorted(files):
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            continue
+        signature.append((file_path, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+class QueryService:
+    """
+    HTTP-сервіс лише для читання над результатами обходу (QueryIndex).
+
+    Ендпоінти (GET, відповіді — JSON):
+
+    * /edrpou/<код> — записи з цим ЄДРПОУ;
+    * /address?q=<адреса>&city=<місто> — записи за адресою будинку;
+    * /search?name=&address=&city=&region=&limit=&offset= — пошук за
+      словами назви та адреси з фільтрами; у відповіді — фасети city/region;
+    * /facets?field=city|region&limit= — значення фасету по всьому індексу;
+    * /status — джерело, кількість записів, час завантаження.
+
+    Гаряче перезавантаження: джерело перевіряється раз на
+    'reload_interval' секунд, і якщо воно змінилося (новий обхід записав
+    результати) й не змінюється між двома перевірками, новий індекс
+    будується у фоні і підміняє старий; запити, що виконуються, дочитують
+    старий. SIGHUP — перезавантаження негайно.
+    """
+
+    def __init__(self, source: str, host: str = '127.0.0.1', port: int = 8090,
+                 reload_interval: float = 5.0, max_limit: int = 1000):
+        self.source = source
+        self.reload_interval = reload_interval
+        self.max_limit = max_limit
+        self.reloads = 0
+        self._reload_now = threading.Event()
+        self._stopped = threading.Event()
+        self.signature = source_signature(source)
+        self.index = self.load()
+        self.server = ThreadingHTTPServer((host, port), _QueryHandler)
+        self.server.daemon_threads = True
+        self.server.service = self
+
+    @classmethod
+    def from_settings(cls, settings, **overrides):
+        options = {
+            'source': settings.get('OSBB_QUERY_SOURCE') or settings.get('OSBB_SQLITE_PATH'),
+            'host': settings.get('OSBB_QUERY_HOST', '127.0.0.1'),
+            'port': settings.getint('OSBB_QUERY_PORT', 8090),
+            'reload_interval': settings.getfloat('OSBB_QUERY_RELOAD_INTERVAL', 5.0),
+            'max_limit': settings.getint('OSBB_QUERY_MAX_LIMIT', 1000),
+        }
+        options.update({key: value for key, value in overrides.items() if value is not None})
+        if not options['source']:
+            raise ValueError('Не задано джерело: OSBB_QUERY_SOURCE або OSBB_SQLITE_PATH')
+        return cls(**options)
+
+    @property
+    def address(self) -> tuple:
+        return self.server.server_address
+
+    def load(self) -> QueryIndex:
+        started = time.monotonic()
+        index = QueryIndex(iter_source_records(self.source), source=self.source)
+        logger.info(f"Індекс: {len(index)} записів з {self.source} за {time.monotonic() - started:.1f} с")
+        return index
+
+    def reload(self):
+        self._reload_now.set()
+
+    def serve_forever(self):
+        watcher = threading.Thread(target=self._watch, name='osbb-query-reload', daemon=True)
+        watcher.start()
+        try:
+            self.server.serve_forever()
+        finally:
+            self._stopped.set()
+            self._reload_now.set()
+            self.server.server_close()
+
+    def shutdown(self):
+        self.server.shutdown()
+
+    def _watch(self):
+        pending = None
+        while not self._stopped.is_set():
+            forced = self._reload_now.wait(self.reload_interval)
+            self._reload_now.clear()
+            if self._stopped.is_set():
+                return
+            signature = source_signature(self.source)
+            if not forced:
+                if signature == self.signature:
+                    pending = None
+                    continue
+                if signature != pending:
+                    # Джерело ще пишеться — чекаємо, поки воно перестане змінюватися
+                    pending = signature
+                    continue
+            pending = None
+            try:
+                index = self.load()
+            except Exception:
+                logger.exception(f"Не вдалося перезавантажити {self.source}, лишається попередній індекс")
+                continue
+            self.index = index
+            self.signature = signature
+            self.reloads += 1
+
+
+class _QueryHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'osbb-query'
+    # Заголовки й тіло пишуться окремо: без TCP_NODELAY keep-alive відповідь чекає ~40 мс
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        service = self.server.service
+        # Один індекс на весь запит, навіть якщо тим часом відбулося перезавантаження
+        index = service.index
+        url = urlsplit(_request_path(self.path))
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        try:
+            status, body = self._route(service, index, url.path.rstrip('/'), params)
+        except ValueError as e:
+            status, body = 400, {'error': str(e)}
+        self._send(status, body)
+
+    def _route(self, service, index, path, params):
+        limit = min(int(params.get('limit', 20)), service.max_limit)
+        offset = int(params.get('offset', 0))
+        if path.startswith('/edrpou/'):
+            return 200, self._page(index, index.find_edrpou(unquote(path[len('/edrpou/'):])), limit, offset)
+        if path == '/address':
+            if not params.get('q'):
+                raise ValueError("Потрібен параметр 'q'")
+            return 200, self._page(index, index.find_address(params['q'], params.get('city')), limit, offset)
+        if path == '/search':
+            numbers = index.search(params.get('name'), params.get('address'), params.get('city'), params.get('region'))
+            if numbers is None:
+                raise ValueError("Потрібен хоча б один з параметрів 'name', 'address', 'city', 'region'")
+            body = self._page(index, numbers, limit, offset)
+            body['facets'] = index.facet_counts(numbers)
+            return 200, body
+        if path == '/facets':
+            field = params.get('field', 'city')
+            if field not in FACET_FIELDS:
+                raise ValueError(f"Фасет має бути одним з {FACET_FIELDS}")
+            return 200, {'field': field, 'values': index.facet_values(field, limit)}
+        if path == '/status':
+            return 200, {
+                'source': index.source,
+                'records': len(index),
+                'loaded_at': index.loaded_at,
+                'reloads': service.reloads,
+            }
+        return 404, {'error': 'Невідомий шлях'}
+
+    @staticmethod
+    def _page(index, numbers, limit, offset) -> dict:
+        page = numbers[offset:offset + limit]
+        return {'total': len(numbers), 'records': [index.record(int(n)) for n in page]}
+
+    def _send(self, status: int, body: dict):
+        payload = json.dumps(body, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        logger.debug(f"{self.address_string()} {format % args}")
+
+
+def _request_path(path: str) -> str:
+    # http.server читає рядок запиту як latin-1; клієнти, що не кодують
+    # кирилицю через %XX (curl), надсилають її як UTF-8
+    try:
+        return path.encode('latin-1').decode('utf-8')
+    except UnicodeError:
+        return path
+
+
+def main(argv=None):
+    import argparse
+
+    from scrapy.utils.project import get_project_settings
+
+    parser = argparse.ArgumentParser(description='HTTP-сервіс запитів до результатів обходу ОСББ')
+    parser.add_argument('source', nargs='?', help='SQLite, Parquet, CSV або JSON Lines (типово OSBB_SQLITE_PATH)')
+    parser.add_argument('--host')
+    parser.add_argument('--port', type=int)
+    parser.add_argument('--reload-interval', type=float)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s [%(name)s] %(levelname)s: %(message)s')
+    service = QueryService.from_settings(
+        get_project_settings(), source=args.source, host=args.host, port=args.port,
+        reload_interval=args.reload_interval,
+    )
+    if hasattr(signal, 'SIGHUP'):
+        signal.signal(signal.SIGHUP, lambda signum, frame: service.reload())
+    host, port = service.address[:2]
+    logger.info(f"Сервіс запитів: http://{host}:{port}/status")
+    try:
+        service.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+# osbb_crawler/resource_cache.py
+import hashlib
+import json
+import sqlite3
+import time
+
+
+class ResourceCache:
+    """
+    Постійне сховище (SQLite) відомостей про вже завантажені файли даних,
+    ключ — download_link:
+
+    * ETag, Last-Modified і sha1 вмісту — для умовних GET-запитів і перевірки,
+      чи змінився файл;
+    * (необов'язково) записи, які файл дав минулого разу, — щоб відтворити
+      їх без повторного парсингу.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS resources (
+                download_link TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                content_hash TEXT,
+                record_count INTEGER,
+                records_cached INTEGER,
+                fetched_at REAL
+            );
+            CREATE TABLE IF NOT EXISTS resource_records (
+                download_link TEXT NOT NULL,
+                content_hash TEXT NOT NULL,
+                payload TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS resource_records_link
+                ON resource_records (download_link, content_hash);
+        ''')
+
+    def get(self, download_link: str) -> dict | None:
+        row = self.conn.execute(
+            'SELECT etag, last_modified, content_hash, record_count, records_cached '
+            'FROM resources WHERE download_link = ?',
+            (download_link,),
+        ).fetchone()
+        if row is None:
+            return None
+        return {'etag': row[0], 'last_modified': row[1], 'content_hash': row[2],
+                'record_count': row[3], 'records_cached': bool(row[4])}
+
+    def conditional_headers(self, download_link: str) -> dict:
+        """Заголовки If-None-Match / If-Modified-Since для повторного запиту файлу."""
+        entry = self.get(download_link)
+        headers = {}
+        if entry:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def iter_records(self, download_link: str):
+        """Записи, збережені під час останнього повного розбору файлу."""
+        cursor = self.conn.execute(
+            'SELECT r.payload FROM resource_records r '
+            'JOIN resources s ON s.download_link = r.download_link AND s.content_hash = r.content_hash '
+            'WHERE r.download_link = ? ORDER BY r.rowid',
+            (download_link,),
+        )
+        for (payload,) in cursor:
+            yield json.loads(payload)
+
+    # Записи нової версії файлу пишуться з її content_hash і стають видимими
+    # для iter_records лише після store(), тому перерваний розбір не підмінить
+    # збережені записи неповним набором.
+
+    def start_records(self, download_link: str, content_hash: str):
+        self.conn.execute(
+            'DELETE FROM resource_records WHERE download_link = ? AND content_hash = ?',
+            (download_link, content_hash),
+        )
+
+    def add_records(self, download_link: str, content_hash: str, records):
+        """'records' — OsbbRecord від парсерів (або будь-які записи, з яких будується dict)."""
+        self.conn.executemany(
+            'INSERT INTO resource_records (download_link, content_hash, payload) VALUES (?, ?, ?)',
+            ((download_link, content_hash, json.dumps(_as_dict(record), ensure_ascii=False)) for record in records),
+        )
+
+    def store(self, download_link: str, etag, last_modified, content_hash: str, record_count: int,
+              records_cached: bool):
+        """
+        Фіксує файл як повністю оброблений. Викликається лише після успішного
+        розбору, тож перерваний парсинг не позначить файл як актуальний.
+        """
+        self.conn.execute(
+            'INSERT OR REPLACE INTO resources '
+            '(download_link, etag, last_modified, content_hash, record_count, records_cached, fetched_at) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+            (download_link, etag, last_modified, content_hash, record_count, records_cached, time.time()),
+        )
+        self.conn.execute(
+            'DELETE FROM resource_records WHERE download_link = ? AND content_hash != ?',
+            (download_link, content_hash),
+        )
+        self.conn.commit()
+
+    def close(self):
+        # Незавершені (не зафіксовані через store) зміни відкидаються
+        self.conn.close()
+
+
+def _as_dict(record) -> dict:
+    return record._asdict() if isinstance(record, tuple) else dict(record)
+
+
+def content_hash(raw_content) -> str:
+    return hashlib.sha1(raw_content).hexdigest()
@@ -0,0 +1,116 @@
+# osbb_crawler/selection.py
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+
+# Модель вартості ресурсу: формат -> (фіксована вартість, вартість за МБ) в
+# умовних секундах завантаження та розбору. CSV розбирається найшвидше,
+# JSON 'api' — повільні посторінкові ендпоінти, Excel — найдорожчий розбір.
+# За невідомих розмірів порядок збігається з TARGET_FORMATS павука.
+# Перевизначається налаштуванням OSBB_FORMAT_COSTS.
+DEFAULT_FORMAT_COSTS = {
+    'csv': (0.0, 1.0),
+    'json': (0.0, 1.5),
+    'api': (5.0, 2.0),
+    'xlsx': (1.0, 8.0),
+    'xls': (1.0, 8.0),
+}
+
+# Результати HEAD-запиту (ключ 'probe' кандидата), після яких ресурс вважається зниклим
+GONE_PROBES = ('http_404', 'http_410')
+
+# Розмір, який припускається для ресурсу без Content-Length і метаданих
+DEFAULT_UNKNOWN_SIZE_MB = 10.0
+
+
+def parse_size(value) -> int | None:
+    """Розмір у байтах із метаданих CKAN або Content-Length; None, якщо невідомий."""
+    if value in (None, ''):
+        return None
+    if isinstance(value, bytes):
+        value = value.decode('latin-1')
+    try:
+        size = int(float(value))
+    except (TypeError, ValueError):
+        return None
+    return size if size >= 0 else None
+
+
+def parse_modified(value) -> float | None:
+    """
+    Час зміни ресурсу як timestamp: ISO 8601 з метаданих CKAN або
+    HTTP-дата з заголовка Last-Modified.
+    """
+    if not value:
+        return None
+    if isinstance(value, bytes):
+        value = value.decode('latin-1')
+    try:
+        moment = datetime.fromisoformat(value)
+    except ValueError:
+        try:
+            moment = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+class ResourceSelector:
+    """
+    Обирає з ресурсів набору даних найдешевший для завантаження і розбору.
+
+    Кандидат — словник з ключами 'format', 'url' і, якщо відомо, 'size'
+    (байти) та 'last_modified'. Вартість — fixed + per_mb * розмір у МБ за
+    моделлю 'costs'; за однакової вартості перемагає новіший ресурс, далі —
+    формат, що стоїть раніше у 'format_order'. Ресурси, на які HEAD-запит
+    відповів 404/410, ідуть останніми.
+    """
+
+    def __init__(self, format_order, costs: dict | None = None,
+                 unknown_size_mb: float = DEFAULT_UNKNOWN_SIZE_MB):
+        self.format_order = list(format_order)
+        self.costs = dict(DEFAULT_FORMAT_COSTS)
+        for data_format, cost in (costs or {}).items():
+            self.costs[data_format.lower()] = tuple(cost)
+        self.unknown_size_mb = unknown_size_mb
+
+    @classmethod
+    def from_settings(cls, settings, format_order):
+        return cls(
+            format_order,
+            costs=settings.getdict('OSBB_FORMAT_COSTS'),
+            unknown_size_mb=settings.getfloat('OSBB_RESOURCE_UNKNOWN_SIZE_MB', DEFAULT_UNKNOWN_SIZE_MB),
+        )
+
+    def cost(self, candidate: dict) -> float:
+        fixed, per_mb = self.costs.get(candidate['format'], (0.0, 1.0))
+        size = candidate.get('size')
+        size_mb = size / (1024 * 1024) if size is not None else self.unknown_size_mb
+        return fixed + per_mb * size_mb
+
+    def rank(self, candidates) -> list:
+        """Кандидати від найдешевшого; кожному додається ключ 'cost'."""
+        def order(candidate):
+            modified = parse_modified(candidate.get('last_modified'))
+            return (
+                # Ресурс, якого за HEAD-запитом уже немає, — лише в крайньому разі
+                candidate.get('probe') in GONE_PROBES,
+                candidate['cost'],
+                -(modified or 0.0),
+                self.format_order.index(candidate['format']),
+            )
+
+        for candidate in candidates:
+            candidate['cost'] = round(self.cost(candidate), 4)
+        # Сортування стабільне: з рівних ресурсів одного формату, як і раніше, перемагає останній
+        return sorted(reversed(candidates), key=order)
+
+    def by_priority(self, candidates) -> dict | None:
+        """Кого обрав би лише порядок форматів (для статистики)."""
+        for data_format in self.format_order:
+            # Раніше з кількох ресурсів одного формату лишався останній
+            for candidate in reversed(candidates):
+                if candidate['format'] == data_format:
+                    return candidate
+        return None
@@ -40,15 +40,21 @@ DOWNLOAD_DELAY = 1
 
 # Enable or disable spider middlewares
 # See https://docs.scrapy.org/en/latest/topics/spider-middleware.html
-#SPIDER_MIDDLEWARES = {
-#    "osbb_crawler.middlewares.OsbbCrawlerSpiderMiddleware": 543,
-#}
+SPIDER_MIDDLEWARES = {
+    # Найближче до рушія: закриває запит у спільному фронтирі, коли колбек віддав усі
+    # результати (працює з SCHEDULER = SharedFrontierScheduler)
+    'osbb_crawler.frontier.FrontierMiddleware': 40,
+    # Найближче до павука: зберігає сирі результати колбеків (працює з OSBB_CHECKPOINT_ENABLED)
+    'osbb_crawler.checkpoint.CheckpointMiddleware': 950,
+}
 
 # Enable or disable downloader middlewares
 # See https://docs.scrapy.org/en/latest/topics/downloader-middleware.html
-#DOWNLOADER_MIDDLEWARES = {
-#    "osbb_crawler.middlewares.OsbbCrawlerDownloaderMiddleware": 543,
-#}
+DOWNLOADER_MIDDLEWARES = {
+    # Поруч із завантажувачем, як HttpCacheMiddleware: запис і відтворення сирих відповідей
+    # (працює з OSBB_ARCHIVE_MODE)
+    'osbb_crawler.archive.ArchiveMiddleware': 900,
+}
 
 # Enable or disable extensions
 # See https://docs.scrapy.org/en/latest/topics/extensions.html
@@ -60,8 +66,195 @@ DOWNLOAD_DELAY = 1
 # See https://docs.scrapy.org/en/latest/topics/item-pipeline.html
 ITEM_PIPELINES = {
     'osbb_crawler.pipelines.CityEnrichmentPipeline': 400,
+    # Працює лише якщо задано OSBB_BOUNDARIES_PATH
+    'osbb_crawler.pipelines.GeoEnrichmentPipeline': 420,
+    # Після збагачення містом: місто входить у ключ адреси
+    'osbb_crawler.pipelines.AddressNormalizationPipeline': 450,
+    # Працює лише якщо OSBB_FUZZY_DEDUP_ENABLED = True; після нормалізації адрес,
+    # бо групування використовує address_key
+    'osbb_crawler.pipelines.FuzzyDedupPipeline': 470,
+    # Після збагачення й групування: перший запис з ЄДРПОУ проходить далі, дублікати
+    # відкидаються, а доповнені ними записи отримують лише сховища з upsert (SQLite)
+    'osbb_crawler.pipelines.EdrpouDedupPipeline': 900,
+    # Працює лише якщо задано OSBB_SQLITE_PATH
+    'osbb_crawler.pipelines.SqliteSinkPipeline': 950,
+    # Працює лише якщо задано OSBB_PARQUET_PATH
+    'osbb_crawler.pipelines.ParquetExportPipeline': 960,
+}
+
+# SQLite-база з результатами (upsert за ЄДРПОУ або адресою); None — вимкнено
+OSBB_SQLITE_PATH = None
+OSBB_SQLITE_BATCH_SIZE = 50000
+OSBB_SQLITE_FLUSH_INTERVAL = 10.0
+OSBB_SQLITE_CACHE_SIZE_KB = 65536
+
+# Сервіс запитів до результатів (python -m osbb_crawler.query, див. query.py):
+# джерело — SQLite, Parquet, CSV або JSON Lines (None — OSBB_SQLITE_PATH).
+# Джерело перевіряється раз на OSBB_QUERY_RELOAD_INTERVAL секунд; після
+# нового обходу індекс перебудовується без зупинки сервісу.
+OSBB_QUERY_SOURCE = None
+OSBB_QUERY_HOST = '127.0.0.1'
+OSBB_QUERY_PORT = 8090
+OSBB_QUERY_RELOAD_INTERVAL = 5.0
+OSBB_QUERY_MAX_LIMIT = 1000
+
+# Експорт у Parquet (потрібен pyarrow); None — вимкнено.
+# OSBB_PARQUET_PARTITION_BY = 'region' пише каталог region=<область>/...
+OSBB_PARQUET_PATH = None
+OSBB_PARQUET_ROW_GROUP_SIZE = 100000
+OSBB_PARQUET_PARTITION_BY = None
+OSBB_PARQUET_COMPRESSION = 'zstd'
+
+# Додатковий мапінг 'URL джерела -> місто' (JSON {url: місто} або CSV url,city),
+# доповнює URL_CITY_MAPPING з pipelines.py
+OSBB_CITY_MAPPING_FILE = None
+
+# Межі областей/міст (GeoJSON з полігонами, шлях або список шляхів): порожні
+# region/city записів з координатами заповнюються пошуком точки в межах;
+# None — вимкнено. Просторовий індекс меж будується один раз і зберігається
+# в OSBB_BOUNDARIES_INDEX_PATH (None — файл у .scrapy/), перебудовується при
+# зміні файлів меж; заздалегідь: python -m osbb_crawler.spatial <індекс> <межі...>.
+# Ключі 'properties' полігона з назвою області й міста — перший непорожній.
+OSBB_BOUNDARIES_PATH = None
+OSBB_BOUNDARIES_INDEX_PATH = None
+OSBB_BOUNDARIES_REGION_KEYS = ['region', 'oblast', 'Область', 'ADM1_UA']
+OSBB_BOUNDARIES_CITY_KEYS = ['city', 'settlement', 'Місто', 'ADM4_UA']
+
+# Нечітке групування записів одного ОСББ без спільного ЄДРПОУ (див. fuzzy.py):
+# кожен запис отримує cluster_id. Записи зливаються, якщо подібність
+# триграм назв не менша за OSBB_FUZZY_NAME_THRESHOLD, а за тієї самої
+# адреси — за OSBB_FUZZY_ADDRESS_NAME_THRESHOLD. OSBB_FUZZY_MAX_BLOCK_SIZE —
+# скільки останніх записів блоку (місто + вулиця, смуга MinHash) порівнювати.
+# Вимкнено за замовчуванням: індекс блоків тримає в пам'яті всі записи обходу
+# (близько +410 МБ пікової RSS на 500 тис. записів, див. benchmarks/bench_fuzzy.py).
+OSBB_FUZZY_DEDUP_ENABLED = False
+OSBB_FUZZY_NAME_THRESHOLD = 0.8
+OSBB_FUZZY_ADDRESS_NAME_THRESHOLD = 0.5
+OSBB_FUZZY_MAX_BLOCK_SIZE = 200
+
+# Нормалізація адрес (типи вулиць, номер будинку, пробіли, лапки) у поле
+# normalized_address (address лишається як у джерелі) і канонічний ключ
+# address_key 'місто|вулиця|будинок' — лише якщо розпізнано вулицю й будинок.
+# Кеш — скільки різних адрес пам'ятати.
+OSBB_NORMALIZE_ADDRESSES = True
+OSBB_ADDRESS_CACHE_SIZE = 100000
+
+# Скільки унікальних ОСББ тримати в пам'яті до вивантаження індексу на диск
+OSBB_DEDUP_MAX_MEMORY_RECORDS = 200000
+
+# Потоковий розбір файлів даних: вміст декодується та розбирається частинами,
+# без повної копії файлу в пам'яті. False — старий розбір цілого файлу.
+OSBB_STREAMING_PARSE = True
+
+# Векторизований розбір CSV і Excel через pandas: колонки зіставляються один раз,
+# очищення та фільтрація виконуються над цілими колонками. Результат той самий,
+# що й у розбору по рядках. CSV читається частинами по FRAME_CHUNK_ROWS рядків,
+# якщо увімкнено OSBB_STREAMING_PARSE; Excel у потоковому режимі розбирається як раніше.
+OSBB_VECTORIZED_PARSE = False
+
+# Де виконується парсинг файлів даних: 'thread' (пул потоків, записи надходять
+# пачками), 'process' (пул процесів) або 'inline' (у потоці реактора, як раніше).
+# Режими 'thread' і 'process' потребують asyncio-реактора (типовий у Scrapy).
+OSBB_PARSE_EXECUTOR = 'thread'
+OSBB_PARSE_EXECUTOR_SIZE = 2
+# Скільки записів пул повертає в реактор за один раз (в обох режимах пулу)
+OSBB_PARSE_BATCH_SIZE = 500
+
+# Великі файли даних пишуться на диск замість пам'яті: тіло відповіді, більше за
+# OSBB_SPOOL_THRESHOLD байт, SpoolingDownloadHandler дописує частинами в тимчасовий
+# файл (у OSBB_SPOOL_DIR або системному тимчасовому каталозі), а парсери читають
+# його через mmap. Файл видаляється після розбору, каталог — після завершення обходу.
+# Тіла, більші за OSBB_SPOOL_MAX_SIZE, не завантажуються (0 — без обмеження).
+# HTML-сторінки та запити через проксі завантажуються стандартним обробником.
+OSBB_SPOOL_DOWNLOADS = True
+OSBB_SPOOL_THRESHOLD = 8 * 1024 * 1024
+OSBB_SPOOL_MAX_SIZE = 2 * 1024 * 1024 * 1024
+OSBB_SPOOL_DIR = None
+
+DOWNLOAD_HANDLERS = {
+    'http': 'osbb_crawler.spool.SpoolingDownloadHandler',
+    'https': 'osbb_crawler.spool.SpoolingDownloadHandler',
 }
 
+# Статистика по кожному набору даних (osbb/dataset/<url>/...): обсяг і час
+# завантаження, час декодування й розбору, кількість записів і причини пропусків.
+# На закритті павука найповільніші набори виводяться в лог; якщо задано шлях,
+# повний звіт зберігається у JSON-файл.
+OSBB_STATS_REPORT_PATH = None
+
+# Інкрементальний повторний обхід: для кожного файлу даних зберігаються ETag,
+# Last-Modified і хеш вмісту (типово у .scrapy/osbb_resources.sqlite).
+# Незмінені файли (304 або той самий хеш) не розбираються повторно; якщо
+# OSBB_RESOURCE_CACHE_REPLAY увімкнено, їхні записи відтворюються з кешу.
+OSBB_RESOURCE_CACHE_ENABLED = True
+OSBB_RESOURCE_CACHE_PATH = None
+OSBB_RESOURCE_CACHE_REPLAY = True
+
+# Відновлення обірваного обходу (CheckpointMiddleware): завершені сторінки пошуку,
+# сторінки наборів і файли разом із їхніми записами зберігаються в SQLite
+# (типово .scrapy/osbb_checkpoint.sqlite). Повторний запуск не завантажує їх
+# знову, а відтворює збережене; після повного завершення обходу сховище
+# очищується. Зміни фіксуються пачками по OSBB_CHECKPOINT_BATCH_SIZE записів
+# або раз на OSBB_CHECKPOINT_FLUSH_INTERVAL секунд.
+OSBB_CHECKPOINT_ENABLED = False
+OSBB_CHECKPOINT_PATH = None
+OSBB_CHECKPOINT_BATCH_SIZE = 5000
+OSBB_CHECKPOINT_FLUSH_INTERVAL = 10.0
+
+# Архів відповідей для повторної обробки без мережі (ArchiveMiddleware, archive.py):
+# 'record' — усі відповіді (сторінки пошуку й наборів, запити CKAN, файли даних)
+# стискаються в архів OSBB_ARCHIVE_PATH (типово каталог .scrapy/osbb_archive) за
+# відбитком запиту; 'replay' — обхід іде лише з архіву, без мережі й затримок.
+# В обох режимах кеш ресурсів (OSBB_RESOURCE_CACHE_*) не використовується: запис
+# потребує повних тіл файлів, а відтворення — повного розбору кожного файлу.
+# None — вимкнено.
+OSBB_ARCHIVE_MODE = None
+OSBB_ARCHIVE_PATH = None
+
+# Обхід кількома процесами (воркерами) зі спільною чергою запитів, див. frontier.py.
+# Вмикається планувальником SCHEDULER = "osbb_crawler.frontier.SharedFrontierScheduler";
+# усі воркери запускаються з тим самим OSBB_FRONTIER_PATH (типово
+# .scrapy/osbb_frontier.sqlite). Виданий запит закривається, щойно його відповідь
+# оброблено (FrontierMiddleware); незакриті запити воркера, що не подає ознак
+# життя довше за OSBB_FRONTIER_LEASE_TIMEOUT секунд, повертаються в чергу.
+# Воркер бере з черги новий запит, лише коли обробляє менше за
+# OSBB_FRONTIER_MAX_ACTIVE відповідей (решту розберуть інші воркери).
+# OSBB_FRONTIER_WORKER_ID — стала назва воркера (типово хост:pid);
+# OSBB_FRONTIER_CLASS — інше сховище черги з інтерфейсом SqliteFrontier.
+OSBB_FRONTIER_PATH = None
+OSBB_FRONTIER_LEASE_TIMEOUT = 300.0
+OSBB_FRONTIER_HEARTBEAT_INTERVAL = 5.0
+OSBB_FRONTIER_MAX_ACTIVE = 4
+OSBB_FRONTIER_WORKER_ID = None
+OSBB_FRONTIER_CLASS = None
+
+# Як шукати набори даних: 'html' — обхід сторінок пошуку data.gov.ua,
+# 'ckan' — запити package_search до CKAN API порталу (усі метадані ресурсів
+# кількома JSON-запитами замість сотень HTML-сторінок).
+OSBB_DISCOVERY = 'html'
+OSBB_CKAN_API_URL = 'https://data.gov.ua/api/3/action/'
+OSBB_CKAN_PORTAL_URL = 'https://data.gov.ua'
+OSBB_CKAN_QUERY = 'осбб'
+OSBB_CKAN_ROWS = 1000
+
+# Паралельний обхід сторінок пошуку (HTML і CKAN): кількість сторінок
+# визначається з першої (номери в пагінації, напис 'Знайдено N', поле 'count'
+# CKAN), і всі наступні сторінки плануються одразу, а не по одній за
+# посиланням 'далі'. Якщо кількість невідома — як раніше, за посиланням.
+# OSBB_SEARCH_MAX_PAGES обмежує кількість розпланованих сторінок.
+OSBB_SEARCH_FANOUT = True
+OSBB_SEARCH_MAX_PAGES = 1000
+
+# Вибір ресурсу набору: з кількох файлів (CSV, JSON, XLSX...) завантажується
+# найдешевший за моделлю вартості format -> (фіксована, за МБ), див. selection.py.
+# Розмір береться з метаданих CKAN або HEAD-запиту (OSBB_RESOURCE_PROBE);
+# ресурсу з невідомим розміром приписується OSBB_RESOURCE_UNKNOWN_SIZE_MB.
+# Приклад: OSBB_FORMAT_COSTS = {'xlsx': (1.0, 4.0)}
+OSBB_RESOURCE_PROBE = True
+OSBB_RESOURCE_PROBE_TIMEOUT = 15
+OSBB_RESOURCE_UNKNOWN_SIZE_MB = 10.0
+OSBB_FORMAT_COSTS = {}
+
 # Enable and configure the AutoThrottle extension (disabled by default)
 # See https://docs.scrapy.org/en/latest/topics/autothrottle.html
 #AUTOTHROTTLE_ENABLED = True
@@ -0,0 +1,358 @@
+# osbb_crawler/spatial.py
+import json
+import logging
+import math
+import os
+import pickle
+from bisect import bisect_right
+
+logger = logging.getLogger(__name__)
+
+# Назви CRS GeoJSON, координати в яких — Web Mercator (метри), а не градуси
+MERCATOR_CRS = ('3857', '900913', '3785', '102100')
+_MERCATOR_RADIUS = 6378137.0
+
+# Ключі 'properties' меж, з яких береться назва області та міста
+# (ADM1_UA/ADM4_UA — атрибути адміністративних меж України з HDX)
+DEFAULT_REGION_KEYS = ('region', 'oblast', 'Область', 'ADM1_UA')
+DEFAULT_CITY_KEYS = ('city', 'settlement', 'Місто', 'ADM4_UA')
+
+# Версія формату збереженого індексу: інша версія — індекс будується заново
+INDEX_VERSION = 1
+
+
+def is_mercator(crs) -> bool:
+    """Чи задає член 'crs' GeoJSON (старий формат {'properties': {'name': ...}}) Web Mercator."""
+    if not isinstance(crs, dict):
+        return False
+    name = str((crs.get('properties') or {}).get('name') or '')
+    return any(code in name for code in MERCATOR_CRS)
+
+
+def from_mercator(x: float, y: float) -> tuple:
+    lon = math.degrees(x / _MERCATOR_RADIUS)
+    lat = math.degrees(2 * math.atan(math.exp(y / _MERCATOR_RADIUS)) - math.pi / 2)
+    return lon, lat
+
+
+def representative_point(geometry, mercator: bool = False) -> tuple | None:
+    """
+    (довгота, широта) геометрії GeoJSON: сама точка, центроїд полігона
+    (для мультиполігона — найбільшого) або середнє вершин лінії. None, якщо
+    геометрії немає або координати не в градусах.
+    """
+    if not isinstance(geometry, dict):
+        return None
+    kind = geometry.get('type')
+    coordinates = geometry.get('coordinates')
+    try:
+        if kind == 'Point':
+            point = (float(coordinates[0]), float(coordinates[1]))
+        elif kind == 'MultiPoint':
+            point = (float(coordinates[0][0]), float(coordinates[0][1]))
+        elif kind == 'Polygon':
+            point = _ring_centroid(coordinates[0])[:2]
+        elif kind == 'MultiPolygon':
+            point = max((_ring_centroid(polygon[0]) for polygon in coordinates), key=lambda c: c[2])[:2]
+        elif kind in ('LineString', 'MultiLineString'):
+            vertices = coordinates if kind == 'LineString' else [v for line in coordinates for v in line]
+            point = (sum(float(v[0]) for v in vertices) / len(vertices),
+                     sum(float(v[1]) for v in vertices) / len(vertices))
+        else:
+            return None
+    except (TypeError, ValueError, IndexError, ZeroDivisionError):
+        return None
+
+    if mercator:
+        point = from_mercator(*point)
+    lon, lat = point
+    if not (-180 <= lon <= 180 and -90 <= lat <= 90):
+        return None
+    return lon, lat
+
+
+def _ring_centroid(ring) -> tuple:
+    """(x, y, площа) кільця за формулою площі Гаусса; для виродженого — середнє вершин."""
+    area = cx = cy = 0.0
+    x0, y0 = float(ring[0][0]), float(ring[0][1])
+    for (ax, ay, *_), (bx, by, *_) in zip(ring, ring[1:]):
+        # Відносно першої вершини — менша похибка на великих координатах
+        ax, ay, bx, by = float(ax) - x0, float(ay) - y0, float(bx) - x0, float(by) - y0
+        cross = ax * by - bx * ay
+        area += cross
+        cx += (ax + bx) * cross
+        cy += (ay + by) * cross
+    if abs(area) < 1e-18:
+        return (sum(float(v[0]) for v in ring) / len(ring), sum(float(v[1]) for v in ring) / len(ring), 0.0)
+    return x0 + cx / (3 * area), y0 + cy / (3 * area), abs(area) / 2
+
+
+def parse_coordinate(value) -> float | None:
+    """Число з рядка координати ('50.45', '50,45'); None, якщо це не число."""
+    if value in (None, ''):
+        return None
+    try:
+        return float(str(value).strip().replace(',', '.'))
+    except ValueError:
+        return None
+
+
+def _segments_cross(ax, ay, bx, by, cx, cy, px, py) -> bool:
+    """
+    Чи перетинає відрізок (c, p) ребро (a, b). Нульова орієнтація
+    вважається від'ємною: вершина на шляху належить лише одному з двох
+    ребер, тож парність перетинів лишається правильною.
+    """
+    if ((bx - ax) * (cy - ay) - (by - ay) * (cx - ax) > 0) == ((bx - ax) * (py - ay) - (by - ay) * (px - ax) > 0):
+        return False
+    return ((px - cx) * (ay - cy) - (py - cy) * (ax - cx) > 0) != ((px - cx) * (by - cy) - (py - cy) * (bx - cx) > 0)
+
+
+def _segment_hits_box(ax, ay, bx, by, x0, y0, x1, y1) -> bool:
+    """Чи має відрізок спільні точки з прямокутником (відсікання Лян — Барскі)."""
+    t0, t1 = 0.0, 1.0
+    dx, dy = bx - ax, by - ay
+    for p, q in ((-dx, ax - x0), (dx, x1 - ax), (-dy, ay - y0), (dy, y1 - ay)):
+        if p == 0:
+            if q < 0:
+                return False
+        else:
+            t = q / p
+            if p < 0:
+                t0 = max(t0, t)
+            else:
+                t1 = min(t1, t)
+            if t0 > t1:
+                return False
+    return True
+
+
+class _PolygonGrid:
+    """
+    Полігон (з дірками і частинами мультиполігона — за правилом парності)
+    на власній сітці. Для кожної клітинки заздалегідь відомо, чи лежить її
+    центр усередині, і які ребра її перетинають. Клітинка без ребер цілком
+    усередині або цілком зовні; в іншій перевіряються лише її ребра —
+    перетини відрізка від центру клітинки до точки змінюють відповідь.
+    """
+
+    # Скільки клітинок на бік сітки: ~sqrt(кількості ребер), щоб на
+    # граничну клітинку припадало кілька ребер
+    MAX_SIDE = 256
+
+    def __init__(self, rings, attributes: dict):
+        self.attributes = attributes
+        edges = []
+        for ring in rings:
+            points = [(float(v[0]), float(v[1])) for v in ring]
+            if len(points) < 3:
+                continue
+            if points[0] != points[-1]:
+                points.append(points[0])
+            edges.extend((a[0], a[1], b[0], b[1]) for a, b in zip(points, points[1:]) if a != b)
+        self.edge_count = len(edges)
+
+        xs = [x for edge in edges for x in (edge[0], edge[2])] or [0.0]
+        ys = [y for edge in edges for y in (edge[1], edge[3])] or [0.0]
+        self.bbox = (min(xs), min(ys), max(xs), max(ys))
+        x0, y0, x1, y1 = self.bbox
+        # Для впорядкування вкладених меж (місто в області) досить площі охопного прямокутника
+        self.area = (x1 - x0) * (y1 - y0)
+        side = max(1, min(self.MAX_SIDE, math.ceil(math.sqrt(len(edges)))))
+        self.nx = self.ny = side
+        # Ненульовий розмір клітинки навіть для виродженого полігона
+        self.w = (x1 - x0) / side or 1e-12
+        self.h = (y1 - y0) / side or 1e-12
+
+        cell_edges = [[] for _ in range(side * side)]
+        for edge in edges:
+            ax, ay, bx, by = edge
+            i0, j0 = self._cell(min(ax, bx), min(ay, by))
+            i1, j1 = self._cell(max(ax, bx), max(ay, by))
+            exact = (i1 - i0 + 1) * (j1 - j0 + 1) > 4
+            # Клітинка трохи збільшена, щоб похибка округлення не загубила ребро біля її кута
+            dw, dh = self.w * 1e-6, self.h * 1e-6
+            for j in range(j0, j1 + 1):
+                for i in range(i0, i1 + 1):
+                    if exact and not _segment_hits_box(ax, ay, bx, by,
+                                                       x0 + i * self.w - dw, y0 + j * self.h - dh,
+                                                       x0 + (i + 1) * self.w + dw, y0 + (j + 1) * self.h + dh):
+                        continue
+                    cell_edges[j * side + i].append(edge)
+
+        self.cells = []
+        for j in range(side):
+            cy = y0 + (j + 0.5) * self.h
+            # Перетини горизонталі через центри клітинок ряду з усіма ребрами
+            crossings = sorted(
+                ax + (cy - ay) * (bx - ax) / (by - ay) for ax, ay, bx, by in edges if (ay > cy) != (by > cy)
+            )
+            for i in range(side):
+                cx = x0 + (i + 0.5) * self.w
+                inside = (len(crossings) - bisect_right(crossings, cx)) % 2 == 1
+                local = cell_edges[j * side + i]
+                self.cells.append((inside, cx, cy, tuple(local)) if local else inside)
+
+    def _cell(self, x: float, y: float) -> tuple:
+        i = min(max(int((x - self.bbox[0]) / self.w), 0), self.nx - 1)
+        j = min(max(int((y - self.bbox[1]) / self.h), 0), self.ny - 1)
+        return i, j
+
+    def contains(self, x: float, y: float) -> bool:
+        x0, y0, x1, y1 = self.bbox
+        if not (x0 <= x <= x1 and y0 <= y <= y1):
+            return False
+        i, j = self._cell(x, y)
+        cell = self.cells[j * self.nx + i]
+        if cell is True or cell is False:
+            return cell
+        inside, cx, cy, edges = cell
+        for ax, ay, bx, by in edges:
+            if _segments_cross(ax, ay, bx, by, cx, cy, x, y):
+                inside = not inside
+        return inside
+
+
+class BoundaryIndex:
+    """
+    Просторовий індекс меж (областей, міст) для визначення, в яку межу
+    потрапляє точка. Два рівні сітки: груба спільна сітка зводить пошук
+    до кількох полігонів, власна сітка полігона — до кількох ребер, тож
+    пошук не залежить від кількості полігонів і вершин у них.
+
+    lookup() повертає {'region': ..., 'city': ...} з атрибутів полігонів,
+    що містять точку; якщо їх кілька (місто всередині області), для
+    кожного атрибута перемагає найменший (за охопним прямокутником).
+    """
+
+    # Клітинок на бік спільної сітки
+    SIDE = 128
+
+    def __init__(self, polygons):
+        self.polygons = [polygon for polygon in polygons if polygon.edge_count]
+        if self.polygons:
+            self.bbox = (
+                min(p.bbox[0] for p in self.polygons), min(p.bbox[1] for p in self.polygons),
+                max(p.bbox[2] for p in self.polygons), max(p.bbox[3] for p in self.polygons),
+            )
+        else:
+            self.bbox = (0.0, 0.0, 0.0, 0.0)
+        x0, y0, x1, y1 = self.bbox
+        self.w = (x1 - x0) / self.SIDE or 1e-12
+        self.h = (y1 - y0) / self.SIDE or 1e-12
+
+        # Менші полігони першими: перший збіг для атрибута — найменша межа
+        self.polygons.sort(key=lambda p: p.area)
+        self.grid = [[] for _ in range(self.SIDE * self.SIDE)]
+        for number, polygon in enumerate(self.polygons):
+            i0, j0 = self._cell(polygon.bbox[0], polygon.bbox[1])
+            i1, j1 = self._cell(polygon.bbox[2], polygon.bbox[3])
+            for j in range(j0, j1 + 1):
+                for i in range(i0, i1 + 1):
+                    self.grid[j * self.SIDE + i].append(number)
+        self.grid = [tuple(cell) for cell in self.grid]
+
+    @classmethod
+    def from_geojson(cls, paths, region_keys=DEFAULT_REGION_KEYS, city_keys=DEFAULT_CITY_KEYS):
+        """Будує індекс з файлів GeoJSON з полігонами меж (FeatureCollection)."""
+        polygons = []
+        for path in paths:
+            with open(path, encoding='utf-8') as f:
+                data = json.load(f)
+            mercator = is_mercator(data.get('crs'))
+            for feature in data.get('features') or ():
+                attributes = _boundary_attributes(feature.get('properties') or {}, region_keys, city_keys)
+                rings = _geometry_rings(feature.get('geometry'), mercator)
+                if attributes and rings:
+                    polygons.append(_PolygonGrid(rings, attributes))
+        return cls(polygons)
+
+    def _cell(self, x: float, y: float) -> tuple:
+        i = min(max(int((x - self.bbox[0]) / self.w), 0), self.SIDE - 1)
+        j = min(max(int((y - self.bbox[1]) / self.h), 0), self.SIDE - 1)
+        return i, j
+
+    def lookup(self, lon: float, lat: float) -> dict:
+        x0, y0, x1, y1 = self.bbox
+        if not (x0 <= lon <= x1 and y0 <= lat <= y1):
+            return {}
+        i, j = self._cell(lon, lat)
+        found = {}
+        for number in self.grid[j * self.SIDE + i]:
+            polygon = self.polygons[number]
+            if polygon.contains(lon, lat):
+                for key, value in polygon.attributes.items():
+                    found.setdefault(key, value)
+                if len(found) == 2:
+                    break
+        return found
+
+    def __len__(self):
+        return len(self.polygons)
+
+
+def _boundary_attributes(properties: dict, region_keys, city_keys) -> dict:
+    attributes = {}
+    for field, keys in (('region', region_keys), ('city', city_keys)):
+        for key in keys:
+            value = properties.get(key)
+            if value not in (None, ''):
+                attributes[field] = str(value).strip()
+                break
+    return attributes
+
+
+def _geometry_rings(geometry, mercator: bool) -> list:
+    """Усі кільця (зовнішні й дірки) полігона чи мультиполігона в градусах."""
+    if not isinstance(geometry, dict):
+        return []
+    if geometry.get('type') == 'Polygon':
+        rings = geometry.get('coordinates') or []
+    elif geometry.get('type') == 'MultiPolygon':
+        rings = [ring for polygon in geometry.get('coordinates') or [] for ring in polygon]
+    else:
+        return []
+    if mercator:
+        rings = [[from_mercator(float(v[0]), float(v[1])) for v in ring] for ring in rings]
+    return rings
+
+
+def load_boundary_index(paths, index_path: str, region_keys=DEFAULT_REGION_KEYS,
+                        city_keys=DEFAULT_CITY_KEYS) -> BoundaryIndex:
+    """
+    Індекс меж з файлу 'index_path', якщо він побудований з тих самих
+    файлів меж (шлях, розмір, час зміни) і ключів атрибутів; інакше індекс
+    будується і зберігається туди для наступних запусків.
+    """
+    signature = (
+        INDEX_VERSION,
+        tuple((os.path.abspath(path), os.path.getsize(path), os.path.getmtime(path)) for path in paths),
+        tuple(region_keys),
+        tuple(city_keys),
+    )
+    try:
+        with open(index_path, 'rb') as f:
+            stored_signature, index = pickle.load(f)
+        if stored_signature == signature:
+            return index
+    except (OSError, pickle.UnpicklingError, EOFError, ValueError, AttributeError):
+        pass
+
+    index = BoundaryIndex.from_geojson(paths, region_keys, city_keys)
+    logger.info(f"Побудовано індекс меж: {len(index)} полігонів, збережено в {index_path}")
+    temp_path = f'{index_path}.tmp'
+    with open(temp_path, 'wb') as f:
+        pickle.dump((signature, index), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, index_path)
+    return index
+
+
+if __name__ == '__main__':
+    # Побудова індексу заздалегідь: python -m osbb_crawler.spatial index.pickle boundaries.geojson [...]
+    import sys
+
+    # Класи індексу мають зберегтися під іменем модуля пакета, а не __main__
+    from osbb_crawler.spatial import load_boundary_index as load
+
+    logging.basicConfig(level=logging.INFO)
+    load(sys.argv[2:], sys.argv[1])
@@ -1,10 +1,20 @@
 # osbb_crawler/spiders/osbb_registry_spider.py
 import scrapy
 import os
+import json
+import math
 import mimetypes
+import re
+from urllib.parse import urlencode
+from w3lib.url import add_or_replace_parameter, url_query_parameter
 from ..items import OsbbRecordItem
 from ..items import DatasetItem
-from ..processors import process_file_content
+from scrapy.utils.project import data_path
+from ..executors import ParseExecutor
+from ..resource_cache import ResourceCache, content_hash
+from ..instrumentation import ParseStats, record_download, record_parse, record_selection, write_dataset_report
+from ..selection import ResourceSelector, parse_size
+from ..spool import SPOOL_META_KEY, SPOOL_PATH_META_KEY, close_spooled, open_spooled, remove_spooled
 
 class OsbbRegistrySpider(scrapy.Spider):
     name = 'osbb_registry'
@@ -18,8 +28,58 @@ class OsbbRegistrySpider(scrapy.Spider):
     # Формати, які ми хочемо завантажити (файли даних)
     TARGET_FORMATS = ['csv', 'json', 'api', 'xlsx', 'xls'] 
 
+    # Параметр номера сторінки в URL пошуку і напис з кількістю результатів
+    # ('Знайдено 1 234 набори даних') для паралельного обходу сторінок
+    SEARCH_PAGE_PARAM = 'page'
+    SEARCH_RESULT_COUNT_RE = re.compile(r'(?:[Зз]найдено|[Ff]ound)\D{0,20}?(\d[\d\s]*)')
 
-    # У вашому Spider (osbb_crawler/spiders/osbb_registry.py)
+    @classmethod
+    def from_crawler(cls, crawler, *args, **kwargs):
+        spider = super().from_crawler(crawler, *args, **kwargs)
+        # Парсинг файлів виконується поза реактором (див. OSBB_PARSE_EXECUTOR)
+        spider.parse_executor = ParseExecutor.from_crawler(crawler)
+        # Вибір ресурсу набору за розміром і форматом (див. selection.py)
+        spider.resource_selector = ResourceSelector.from_settings(crawler.settings, cls.TARGET_FORMATS)
+
+        # Кеш завантажених файлів для інкрементального повторного обходу; в архіві
+        # відповідей (OSBB_ARCHIVE_MODE) потрібні повні тіла й розбір кожного файлу
+        spider.resource_cache = None
+        if crawler.settings.getbool('OSBB_RESOURCE_CACHE_ENABLED', True) and not crawler.settings.get('OSBB_ARCHIVE_MODE'):
+            path = crawler.settings.get('OSBB_RESOURCE_CACHE_PATH') or data_path('osbb_resources.sqlite', createdir=True)
+            spider.resource_cache = ResourceCache(path)
+        return spider
+
+    async def start(self):
+        # Режим пошуку наборів: сторінки пошуку HTML або CKAN API порталу
+        if self.settings.get('OSBB_DISCOVERY', 'html') == 'ckan':
+            yield self.ckan_search_request()
+            return
+        async for item_or_request in super().start():
+            yield item_or_request
+
+    def closed(self, reason):
+        write_dataset_report(self.crawler.stats, self.settings.get('OSBB_STATS_REPORT_PATH'), self.logger)
+        self.parse_executor.close()
+        if self.resource_cache is not None:
+            self.resource_cache.close()
+
+
+    # Колбеки, результат яких залежить лише від URL запиту, — одиниці відновлення обходу
+    CHECKPOINT_CALLBACKS = ('parse', 'parse_dataset_details', 'parse_ckan_search', 'parse_ckan_package')
+
+    def checkpoint_key(self, request):
+        """
+        Ключ одиниці обходу для CheckpointMiddleware або None, якщо запит не
+        зберігається (HEAD-проби ресурсів дешеві й залежать від meta).
+        Файл, на який посилаються кілька наборів, — окрема одиниця для кожного.
+        """
+        # Запит без колбеку обробляє parse
+        callback = getattr(request.callback, '__name__', 'parse')
+        if callback in self.CHECKPOINT_CALLBACKS:
+            return f'{callback}:{request.url}'
+        if callback == 'parse_file_content':
+            return f"file:{request.meta['dataset_metadata']['page_url']}:{request.url}"
+        return None
 
     # У вашому Spider (osbb_crawler/spiders/osbb_registry.py)
 
@@ -50,10 +110,67 @@ class OsbbRegistrySpider(scrapy.Spider):
                     }
                 )
 
-        # Логіка пагінації
+        # Логіка пагінації: з першої сторінки — усі сторінки одразу, якщо відома їх кількість
+        if self.search_fanout_pending(response.meta):
+            page_count = self.search_page_count(response, len(dataset_items))
+            if page_count:
+                for page, meta in self.search_fanout_pages(page_count):
+                    yield scrapy.Request(
+                        add_or_replace_parameter(response.url, self.SEARCH_PAGE_PARAM, str(page)),
+                        callback=self.parse,
+                        meta=meta,
+                    )
+                return
+        elif not self.search_follows_next(response.meta):
+            return
+
+        # Кількість сторінок невідома (або це остання з розпланованих): за посиланням 'далі'
         next_page = response.css('.pagination a[rel="next"]::attr(href)').get()
         if next_page:
-            yield response.follow(next_page, callback=self.parse)
+            yield response.follow(next_page, callback=self.parse, meta={'search_fanout': False})
+
+    def search_page_count(self, response, page_size: int) -> int | None:
+        """
+        Кількість сторінок пошуку: найбільший номер сторінки в посиланнях
+        пагінації або кількість результатів, поділена на розмір сторінки.
+        None, якщо з першої сторінки цього не видно.
+        """
+        pages = []
+        for href in response.css('.pagination a::attr(href)').getall():
+            page = url_query_parameter(response.urljoin(href), self.SEARCH_PAGE_PARAM)
+            if page and page.isdigit():
+                pages.append(int(page))
+
+        heading = ' '.join(response.css('h1 ::text, h2 ::text').getall())
+        match = self.SEARCH_RESULT_COUNT_RE.search(heading)
+        if match and page_size:
+            pages.append(math.ceil(int(re.sub(r'\D', '', match.group(1))) / page_size))
+
+        page_count = max(pages, default=0)
+        return page_count if page_count > 1 else None
+
+    def search_fanout_pages(self, page_count: int):
+        """
+        (номер сторінки, meta) для сторінок 2..page_count — їх планують
+        одразу після першої, далі їх обмежує звичайне тротлінгування.
+        Остання запланована сторінка ще й переходить за посиланням 'далі'
+        (на випадок, якщо результатів побільшало або пагінація показує не
+        всі номери). Кількість обмежена OSBB_SEARCH_MAX_PAGES.
+        """
+        page_count = min(page_count, self.settings.getint('OSBB_SEARCH_MAX_PAGES', 1000))
+        self.crawler.stats.set_value('osbb/search/page_count', page_count)
+        self.crawler.stats.inc_value('osbb/search/fanout_pages', page_count - 1)
+        for page in range(2, page_count + 1):
+            yield page, {'search_fanout': True, 'search_last_page': page == page_count}
+
+    def search_fanout_pending(self, meta) -> bool:
+        """Перша сторінка пошуку, з якої ще можна розпланувати решту."""
+        return 'search_fanout' not in meta and self.settings.getbool('OSBB_SEARCH_FANOUT', True)
+
+    @staticmethod
+    def search_follows_next(meta) -> bool:
+        """Чи шукати наступну сторінку самій (а не покладатися на розплановані)."""
+        return not meta.get('search_fanout') or meta.get('search_last_page', False)
         
 
 
@@ -69,7 +186,7 @@ class OsbbRegistrySpider(scrapy.Spider):
         name = response.meta.get('dataset_title', 'N/A')
         description = response.meta.get('dataset_description', 'N/A')
 
-        available_resources = {}
+        candidates = []
 
         # *** ОНОВЛЕНІ СЕЛЕКТОРИ КОНТЕЙНЕРІВ РЕСУРСІВ ***
         # Використовуємо клас, що містить і посилання, і формат
@@ -104,53 +221,212 @@ class OsbbRegistrySpider(scrapy.Spider):
                 
                 # Перевірка, чи це один із цільових форматів
                 if norm_format in self.TARGET_FORMATS:
-                    available_resources[norm_format] = response.urljoin(download_url)
-            
-        # Етап 2: Знаходимо найбільш пріоритетний ресурс
-        best_format = None
-        best_url = None
-        
-        for target_format in self.TARGET_FORMATS:
-            if target_format in available_resources:
-                best_format = target_format
-                best_url = available_resources[target_format]
-                break
-        
-        # Етап 3: Створення запиту, якщо ресурс знайдено
-        if best_url:
-            # Тут треба використати вашу модель Item, наприклад, OsbbCrawlerItem
-            # Я використовую фіктивний DatasetItem для прикладу
-            dataset_item = {
-                'title': name,
-                'description': description,
-                'page_url': response.url,
-                'download_link': best_url,
-                'data_format': best_format.upper(), 
-            }
-            
-            self.logger.info(f"Набір '{name}' обрано: {best_format.upper()}")
-            
-            # Генеруємо запит на ПРІОРИТЕТНИЙ файл
-            yield scrapy.Request(
-                url=best_url,
-                callback=self.parse_file_content,
-                meta={'dataset_metadata': dataset_item}
-            )
-        else:
+                    candidates.append({'format': norm_format, 'url': response.urljoin(download_url)})
+
+        # Етап 2-3: Вибір найдешевшого ресурсу (розміри — з HEAD-запитів) і запит на нього
+        dataset_item = {
+            'title': name,
+            'description': description,
+            'page_url': response.url,
+        }
+        yield from self.resource_requests(dataset_item, candidates)
+
+    # --- Вибір ресурсу набору за вартістю ---
+
+    def resource_requests(self, dataset_item, candidates):
+        """
+        Обирає ресурс набору моделлю вартості ResourceSelector і повертає запит
+        на файл. Якщо кандидатів кілька, а розмір когось невідомий, спершу по
+        черзі надсилаються HEAD-запити (OSBB_RESOURCE_PROBE); рішення
+        приймається після останньої відповіді і записується в статистику.
+        """
+        name = dataset_item['title']
+        if not candidates:
             self.logger.info(f"Набір '{name}' ігнорується: не знайдено жодного цільового формату.")
+            return
+
+        if len(candidates) > 1 and self.settings.getbool('OSBB_RESOURCE_PROBE', True):
+            for candidate in candidates:
+                if candidate.get('size') is None and 'probe' not in candidate:
+                    yield self.probe_request(dataset_item, candidates, candidate)
+                    return
+
+        selector = self.resource_selector
+        ranked = selector.rank(candidates)
+        selected = ranked[0]
+        record_selection(self.crawler.stats, dataset_item['page_url'], ranked, selector.by_priority(candidates))
 
-    def parse_file_content(self, response):
+        dataset_item = dict(
+            dataset_item,
+            download_link=selected['url'],
+            data_format=selected['format'].upper(),
+            size=selected.get('size'),
+            last_modified=selected.get('last_modified'),
+        )
+        size = f"{selected['size']} байт" if selected.get('size') is not None else 'розмір невідомий'
+        self.logger.info(
+            f"Набір '{name}' обрано: {selected['format'].upper()} ({size}, вартість {selected['cost']}, "
+            f"кандидатів {len(candidates)})"
+        )
+        yield self.file_request(dataset_item)
+
+    def probe_request(self, dataset_item, candidates, candidate):
+        """HEAD-запит: розмір (Content-Length) і дата зміни ресурсу без завантаження."""
+        candidate['probe'] = 'pending'
+        return scrapy.Request(
+            candidate['url'],
+            method='HEAD',
+            callback=self.parse_resource_probe,
+            errback=self.resource_probe_failed,
+            dont_filter=True,
+            meta={
+                'dataset_metadata': dataset_item,
+                'resource_candidates': candidates,
+                'resource_candidate': candidate,
+                'handle_httpstatus_all': True,
+                'download_timeout': self.settings.getfloat('OSBB_RESOURCE_PROBE_TIMEOUT', 15),
+                'max_retry_times': 0,
+            },
+        )
+
+    def parse_resource_probe(self, response):
+        candidate = response.meta['resource_candidate']
+        self.crawler.stats.inc_value('osbb/selection/probes')
+        if 200 <= response.status < 300:
+            candidate['probe'] = 'ok'
+            candidate['size'] = parse_size(response.headers.get('Content-Length'))
+            candidate['last_modified'] = candidate.get('last_modified') or _header(response, b'Last-Modified')
+        else:
+            candidate['probe'] = f'http_{response.status}'
+        yield from self.resource_requests(response.meta['dataset_metadata'], response.meta['resource_candidates'])
+
+    def resource_probe_failed(self, failure):
+        # Невдала проба не скасовує набір: кандидат лишається з невідомим розміром
+        meta = failure.request.meta
+        meta['resource_candidate']['probe'] = 'failed'
+        self.crawler.stats.inc_value('osbb/selection/probes_failed')
+        yield from self.resource_requests(meta['dataset_metadata'], meta['resource_candidates'])
+
+    def file_request(self, dataset_item):
+        """Запит на ПРІОРИТЕТНИЙ файл набору даних."""
+        # Якщо файл вже завантажувався, робимо умовний GET (304 — файл не змінився)
+        headers = {}
+        if self.resource_cache is not None:
+            headers = self.resource_cache.conditional_headers(dataset_item['download_link'])
+        return scrapy.Request(
+            url=dataset_item['download_link'],
+            callback=self.parse_file_content,
+            headers=headers,
+            meta={
+                'dataset_metadata': dataset_item,
+                'handle_httpstatus_list': [304],
+                # Великі файли SpoolingDownloadHandler пише на диск, а не в пам'ять
+                SPOOL_META_KEY: self.settings.getbool('OSBB_SPOOL_DOWNLOADS', True),
+            }
+        )
+
+    # --- Пошук наборів через CKAN API (OSBB_DISCOVERY = 'ckan') ---
+
+    def ckan_search_request(self, start=0, meta=None):
+        api_url = self.settings.get('OSBB_CKAN_API_URL')
+        params = {
+            'q': self.settings.get('OSBB_CKAN_QUERY'),
+            'rows': self.settings.getint('OSBB_CKAN_ROWS', 1000),
+            'start': start,
+        }
+        return scrapy.Request(
+            f"{api_url.rstrip('/')}/package_search?{urlencode(params)}",
+            callback=self.parse_ckan_search,
+            meta={'ckan_start': start, **(meta or {})},
+        )
+
+    def parse_ckan_search(self, response):
+        """
+        Обробляє відповідь package_search: для кожного пакета обирає ресурс
+        за метаданими (формат, URL, розмір, дата зміни) без завантаження HTML.
+        """
+        result = json.loads(response.text).get('result') or {}
+        packages = result.get('results') or []
+
+        for package in packages:
+            if package.get('resources') is None and package.get('num_resources'):
+                # Деякі екземпляри CKAN не повертають ресурси в пошуку
+                yield scrapy.Request(
+                    f"{self.settings.get('OSBB_CKAN_API_URL').rstrip('/')}/package_show?{urlencode({'id': package['id']})}",
+                    callback=self.parse_ckan_package,
+                )
+                continue
+            yield from self._ckan_package_requests(package)
+
+        # Пагінація: наступна сторінка, поки не отримаємо всі 'count' пакетів
+        start = response.meta.get('ckan_start', 0) + len(packages)
+        count = result.get('count', 0)
+        if not packages or start >= count:
+            return
+        if self.search_fanout_pending(response.meta):
+            # 'count' відомий з першої відповіді — решту сторінок плануємо одразу
+            page_count = 1 + math.ceil((count - start) / len(packages))
+            for page, meta in self.search_fanout_pages(page_count):
+                yield self.ckan_search_request(start + (page - 2) * len(packages), meta)
+        elif self.search_follows_next(response.meta):
+            yield self.ckan_search_request(start, {'search_fanout': False})
+
+    def parse_ckan_package(self, response):
+        package = json.loads(response.text).get('result') or {}
+        yield from self._ckan_package_requests(package)
+
+    def _ckan_package_requests(self, package):
+        name = package.get('title') or package.get('name') or 'N/A'
+
+        # Розмір і дата зміни — з метаданих порталу; HEAD лише для ресурсів без них
+        candidates = []
+        for resource in package.get('resources') or []:
+            norm_format = (resource.get('format') or '').strip().lower()
+            if resource.get('url') and norm_format in self.TARGET_FORMATS:
+                candidates.append({
+                    'format': norm_format,
+                    'url': resource['url'],
+                    'size': parse_size(resource.get('size')),
+                    'last_modified': resource.get('last_modified') or resource.get('metadata_modified'),
+                })
+
+        portal_url = self.settings.get('OSBB_CKAN_PORTAL_URL').rstrip('/')
+        dataset_item = {
+            'title': name,
+            'description': package.get('notes') or '',
+            'page_url': f"{portal_url}/dataset/{package.get('name') or package.get('id')}",
+        }
+        yield from self.resource_requests(dataset_item, candidates)
+
+    async def parse_file_content(self, response):
         """
         Завантажує вміст файлу і передає його зовнішнім обробникам.
         Генерує OsbbRecordItem для Pipeline.
+        Тіло, записане на диск (SpoolingDownloadHandler), читається через mmap
+        і видаляється після розбору.
         """
+        spool_path = response.meta.get(SPOOL_PATH_META_KEY)
+        if spool_path is None:
+            async for result in self._parse_file_content(response, response.body):
+                yield result
+            return
+
+        raw_content = open_spooled(spool_path)
+        try:
+            async for result in self._parse_file_content(response, raw_content, spool_path):
+                yield result
+        finally:
+            close_spooled(raw_content)
+            remove_spooled(spool_path)
+
+    async def _parse_file_content(self, response, raw_content, spool_path=None):
         dataset_item = response.meta.get('dataset_metadata')
         
-        raw_content = response.body 
         # Використовуємо формат із метаданих як значення за замовчуванням
         data_format = dataset_item['data_format'] 
         source_url = dataset_item['page_url']
         download_link = dataset_item['download_link'] # Використовуємо link для визначення формату
+        record_download(self.crawler.stats, source_url, response, size=len(raw_content))
 
         # --- КОРЕКЦІЯ ФОРМАТУ ЗА РОЗШИРЕННЯМ URL (КРОК ВИПРАВЛЕННЯ) ---
         url_path = download_link.lower()
@@ -165,8 +441,95 @@ class OsbbRegistrySpider(scrapy.Spider):
 
         # --- КІНЕЦЬ КОРЕКЦІЇ ФОРМАТУ ---
 
+        # --- ПЕРЕВІРКА КЕШУ: чи змінився файл з минулого обходу ---
+        cache = self.resource_cache
+        replay = self.settings.getbool('OSBB_RESOURCE_CACHE_REPLAY', True)
+        body_hash = None
+
+        if cache is not None:
+            entry = cache.get(download_link)
+            if response.status == 304:
+                if entry and (entry['records_cached'] or not replay):
+                    self.crawler.stats.inc_value('osbb/resource_cache/not_modified')
+                    for osbb_record in self._replay_records(download_link, replay, source_url):
+                        yield osbb_record
+                    return
+                # Записів для відтворення немає — завантажуємо файл повністю
+                self.logger.info(f"304 без збережених записів, повторне завантаження: {download_link}")
+                yield response.request.replace(
+                    headers={}, dont_filter=True,
+                    meta={'dataset_metadata': dataset_item, SPOOL_META_KEY: response.meta.get(SPOOL_META_KEY)},
+                )
+                return
+
+            body_hash = content_hash(raw_content)
+            if entry and entry['content_hash'] == body_hash and (entry['records_cached'] or not replay):
+                self.crawler.stats.inc_value('osbb/resource_cache/unchanged')
+                for osbb_record in self._replay_records(download_link, replay, source_url):
+                    yield osbb_record
+                return
+
         self.logger.info(f"Обробка файлу: {download_link} (Визначений формат: **{data_format}**)")
 
         # Передаємо роботу зовнішньому модулю process_file_content
-        for osbb_record in process_file_content(raw_content, data_format, source_url):
-            yield osbb_record
\ No newline at end of file
+        streaming = self.settings.getbool('OSBB_STREAMING_PARSE', True)
+        vectorized = self.settings.getbool('OSBB_VECTORIZED_PARSE', False)
+        parse_stats = ParseStats()
+        records = self.parse_executor.iter_records(
+            raw_content, data_format, source_url, streaming=streaming, parse_stats=parse_stats,
+            vectorized=vectorized, spool_path=spool_path,
+        )
+
+        # Парсери дають компактні OsbbRecord; OsbbRecordItem створюється лише тут
+        if cache is None:
+            async for osbb_record in records:
+                yield osbb_record.to_item()
+            record_parse(self.crawler.stats, source_url, parse_stats)
+            return
+
+        # Зберігаємо записи пачками; файл позначається обробленим лише в кінці
+        if replay:
+            cache.start_records(download_link, body_hash)
+        batch = []
+        record_count = 0
+        async for osbb_record in records:
+            record_count += 1
+            if replay:
+                batch.append(osbb_record)
+                if len(batch) >= 1000:
+                    cache.add_records(download_link, body_hash, batch)
+                    batch = []
+            yield osbb_record.to_item()
+        if batch:
+            cache.add_records(download_link, body_hash, batch)
+        record_parse(self.crawler.stats, source_url, parse_stats)
+
+        cache.store(
+            download_link,
+            etag=_header(response, b'ETag'),
+            last_modified=_header(response, b'Last-Modified'),
+            content_hash=body_hash,
+            record_count=record_count,
+            records_cached=replay,
+        )
+        self.crawler.stats.inc_value('osbb/resource_cache/parsed')
+
+    def _replay_records(self, download_link, replay, source_url):
+        """
+        Відтворює записи файлу з кешу замість повторного парсингу. Кеш
+        ведеться за download_link, а той самий файл може належати кільком
+        наборам, тож source_dataset_url береться з поточного набору.
+        """
+        if not replay:
+            self.logger.info(f"Файл не змінився, пропускаємо: {download_link}")
+            return
+        self.logger.info(f"Файл не змінився, записи відтворено з кешу: {download_link}")
+        for record in self.resource_cache.iter_records(download_link):
+            self.crawler.stats.inc_value('osbb/resource_cache/replayed_records')
+            record['source_dataset_url'] = source_url
+            yield OsbbRecordItem(record)
+
+
+def _header(response, name):
+    value = response.headers.get(name)
+    return value.decode('latin-1') if value else None
\ No newline at end of file
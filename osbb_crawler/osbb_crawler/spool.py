@@ -0,0 +1,247 @@
+# osbb_crawler/spool.py
+import logging
+import mmap
+import os
+import shutil
+import tempfile
+import time
+import zlib
+
+from scrapy.core.downloader.contextfactory import load_context_factory_from_settings
+from scrapy.core.downloader.handlers.http11 import HTTP11DownloadHandler
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+from twisted.internet import defer
+from twisted.internet.error import TimeoutError
+from twisted.internet.protocol import Protocol
+from twisted.python.failure import Failure
+from twisted.web.client import Agent, HTTPConnectionPool, PotentialDataLoss, ResponseDone
+from twisted.web.http_headers import Headers as TxHeaders
+from twisted.web.iweb import UNKNOWN_LENGTH
+
+logger = logging.getLogger(__name__)
+
+# meta запиту: файл набору даних, тіло якого можна писати на диск
+SPOOL_META_KEY = 'osbb_spool'
+# meta відповіді: шлях до тимчасового файлу з тілом (тоді response.body порожнє)
+SPOOL_PATH_META_KEY = 'osbb_spool_path'
+
+
+class SpoolingDownloadHandler:
+    """
+    Обробник завантажень http/https. Запити з meta 'osbb_spool' (файли
+    наборів даних) завантажуються власним клієнтом Twisted: тіло, більше за
+    OSBB_SPOOL_THRESHOLD, пишеться частинами у тимчасовий файл, і шлях до нього
+    передається в meta[SPOOL_PATH_META_KEY]. Менші тіла повертаються як звичайна
+    відповідь. Решта запитів (HTML-сторінки, API, запити через проксі)
+    передається стандартному HTTP11DownloadHandler.
+    """
+
+    lazy = False
+
+    def __init__(self, settings, crawler):
+        # Реактор імпортуємо тут: імпорт модуля не повинен встановлювати реактор
+        from twisted.internet import reactor
+
+        self.crawler = crawler
+        self._reactor = reactor
+        self._default = HTTP11DownloadHandler.from_crawler(crawler)
+        self.threshold = settings.getint('OSBB_SPOOL_THRESHOLD', 8 * 1024 * 1024)
+        self.max_size = settings.getint('OSBB_SPOOL_MAX_SIZE', 0)
+        self.timeout = settings.getfloat('DOWNLOAD_TIMEOUT', 180)
+        # Окремий каталог на кожен запуск: при закритті видаляється цілком
+        self.spool_dir = tempfile.mkdtemp(prefix='osbb-spool-', dir=settings.get('OSBB_SPOOL_DIR'))
+
+        self._pool = HTTPConnectionPool(reactor, persistent=True)
+        self._pool.maxPersistentPerHost = settings.getint('CONCURRENT_REQUESTS_PER_DOMAIN')
+        self._agent = Agent(
+            reactor,
+            contextFactory=load_context_factory_from_settings(settings, crawler),
+            pool=self._pool,
+        )
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler.settings, crawler)
+
+    def download_request(self, request, spider):
+        if (not request.meta.get(SPOOL_META_KEY) or request.method != 'GET'
+                or request.body or request.meta.get('proxy')):
+            return self._default.download_request(request, spider)
+
+        headers = TxHeaders(dict(request.headers.items()))
+        # Стиснене тіло на диску HttpCompressionMiddleware не розпакує, тому
+        # gzip/deflate розпаковуються тут під час запису (див. _SpoolReader)
+        headers.setRawHeaders(b'Accept-Encoding', [b'gzip, deflate'])
+
+        started = time.monotonic()
+        d = self._agent.request(b'GET', request.url.encode('ascii'), headers)
+        d.addCallback(self._cb_headers, request, started)
+
+        timeout = request.meta.get('download_timeout', self.timeout)
+        timeout_call = self._reactor.callLater(timeout, d.cancel)
+
+        def _on_done(result):
+            if timeout_call.active():
+                timeout_call.cancel()
+                return result
+            # Скасування за таймаутом — та сама помилка, що й у Scrapy (її повторює RetryMiddleware)
+            if isinstance(result, Failure) and result.check(defer.CancelledError):
+                raise TimeoutError(f"Getting {request.url} took longer than {timeout} seconds.")
+            return result
+
+        d.addBoth(_on_done)
+        d.addCallback(self._make_response, request)
+        return d
+
+    def _cb_headers(self, txresponse, request, started):
+        request.meta['download_latency'] = time.monotonic() - started
+
+        max_size = request.meta.get('download_maxsize', self.max_size)
+        expected_size = txresponse.length if txresponse.length != UNKNOWN_LENGTH else -1
+        if max_size and expected_size > max_size:
+            txresponse._transport.loseConnection()
+            raise defer.CancelledError(
+                f"Скасовано завантаження {request.url}: розмір {expected_size} більший за {max_size}"
+            )
+
+        # deliverBody не завершується для відповіді без тіла
+        if txresponse.length == 0:
+            return txresponse, b'', None, None
+
+        encoding = (txresponse.headers.getRawHeaders(b'Content-Encoding') or [b''])[-1].strip().lower()
+        decompress = encoding in (b'gzip', b'x-gzip', b'deflate')
+        if decompress:
+            # Тіло віддаємо вже розпакованим
+            txresponse.headers.removeHeader(b'Content-Encoding')
+
+        reader = _SpoolReader(
+            defer.Deferred(lambda _: reader.abort()),
+            spool_dir=self.spool_dir,
+            # Якщо розмір відомий наперед і більший за поріг, пишемо на диск одразу
+            threshold=0 if expected_size > self.threshold else self.threshold,
+            max_size=max_size,
+            decompress=decompress,
+        )
+        txresponse.deliverBody(reader)
+        return reader.finished.addCallback(lambda result: (txresponse, *result))
+
+    def _make_response(self, result, request):
+        txresponse, body, path, flags = result
+        headers = Headers(dict(txresponse.headers.getAllRawHeaders()))
+        respcls = responsetypes.from_args(headers=headers, url=request.url, body=body[:1024])
+
+        if path is not None:
+            request.meta[SPOOL_PATH_META_KEY] = path
+            flags = (flags or []) + ['spooled']
+            self.crawler.stats.inc_value('osbb/spool/files')
+            self.crawler.stats.inc_value('osbb/spool/bytes', os.path.getsize(path))
+
+        return respcls(
+            url=request.url,
+            status=int(txresponse.code),
+            headers=headers,
+            body=body,
+            flags=flags,
+            request=request,
+        )
+
+    def close(self):
+        shutil.rmtree(self.spool_dir, ignore_errors=True)
+        return defer.DeferredList([self._pool.closeCachedConnections(), self._default.close()])
+
+
+class _SpoolReader(Protocol):
+    """
+    Приймає тіло відповіді частинами: поки воно менше за 'threshold', тримає
+    в пам'яті, далі — дописує у тимчасовий файл у 'spool_dir'.
+    """
+
+    def __init__(self, finished, spool_dir: str, threshold: int, max_size: int, decompress: bool):
+        self.finished = finished
+        self.spool_dir = spool_dir
+        self.threshold = threshold
+        self.max_size = max_size
+        # wbits=47: zlib або gzip із визначенням за заголовком потоку
+        self._decoder = zlib.decompressobj(47) if decompress else None
+        self._chunks = []
+        self._size = 0
+        self._file = None
+
+    def dataReceived(self, data: bytes):
+        if self.finished.called:
+            return
+        if self._decoder is not None:
+            data = self._decoder.decompress(data)
+        self._write(data)
+
+    def _write(self, data: bytes):
+        self._size += len(data)
+        if self.max_size and self._size > self.max_size:
+            logger.warning(f"Тіло відповіді більше за {self.max_size} байт, завантаження скасовано")
+            self.abort()
+            self.finished.errback(defer.CancelledError(f"тіло відповіді більше за {self.max_size} байт"))
+            return
+
+        if self._file is not None:
+            self._file.write(data)
+            return
+        self._chunks.append(data)
+        if self._size > self.threshold:
+            self._file = tempfile.NamedTemporaryFile(dir=self.spool_dir, prefix='body-', delete=False)
+            self._file.writelines(self._chunks)
+            self._chunks = []
+
+    def connectionLost(self, reason=None):
+        if self.finished.called:
+            self._discard()
+            return
+        if not reason.check(ResponseDone, PotentialDataLoss):
+            self._discard()
+            self.finished.errback(reason)
+            return
+
+        if self._decoder is not None:
+            self._write(self._decoder.flush())
+            if self.finished.called:
+                return
+
+        flags = ['partial'] if reason.check(PotentialDataLoss) else None
+        if self._file is not None:
+            self._file.close()
+            self.finished.callback((b'', self._file.name, flags))
+        else:
+            self.finished.callback((b''.join(self._chunks), None, flags))
+
+    def abort(self):
+        if self.transport is not None:
+            self.transport.stopProducing()
+            self.transport.loseConnection()
+        self._discard()
+
+    def _discard(self):
+        self._chunks = []
+        if self._file is not None:
+            self._file.close()
+            remove_spooled(self._file.name)
+
+
+def open_spooled(path: str):
+    """Відображає тимчасовий файл з тілом відповіді в пам'ять (лише читання)."""
+    with open(path, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def close_spooled(content):
+    try:
+        content.close()
+    except BufferError:
+        # Парсер ще тримає memoryview на вміст — відображення звільниться разом з ним
+        pass
+
+
+def remove_spooled(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,108 @@
+# osbb_crawler/tests/conftest.py
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+import pytest
+from scrapy.utils.reactor import install_reactor
+
+# Crawler перевіряє, що встановлено реактор з налаштувань (за замовчуванням Scrapy — asyncio)
+install_reactor('twisted.internet.asyncioreactor.AsyncioSelectorReactor')
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class PortalHandler(BaseHTTPRequestHandler):
+    """
+    Локальний портал CKAN: package_search з пагінацією (server.packages),
+    package_show (ресурси з server.package_resources, якщо їх немає в
+    пошуку) і файли даних (server.files: шлях -> байти; server.delay —
+    затримка відповіді з файлом, секунди). URL ресурсів у пакетах — шляхи
+    на цьому сервері.
+    """
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = dict(parse_qsl(url.query))
+        self.server.requests.append((url.path, query))
+        packages = self.server.packages
+        if url.path == '/api/3/action/package_search':
+            start, rows = int(query['start']), int(query['rows'])
+            results = [self._absolute(package) for package in packages[start:start + rows]]
+            payload = {'success': True, 'result': {'count': len(packages), 'results': results}}
+        elif url.path == '/api/3/action/package_show':
+            package = next(package for package in packages if package['id'] == query['id'])
+            package = {**package, 'resources': self.server.package_resources[package['id']]}
+            payload = {'success': True, 'result': self._absolute(package)}
+        elif url.path in self.server.files:
+            time.sleep(self.server.delay)
+            self._send(self.server.files[url.path], 'text/csv')
+            return
+        else:
+            self.send_error(404)
+            return
+        self._send(json.dumps(payload).encode(), 'application/json')
+
+    def _absolute(self, package):
+        if package.get('resources') is None:
+            return package
+        resources = [{**resource, 'url': self.server.base_url + resource['url']} for resource in package['resources']]
+        return {**package, 'resources': resources}
+
+    def _send(self, body, content_type):
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def portal():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PortalHandler)
+    server.base_url = f'http://127.0.0.1:{server.server_port}'
+    server.requests = []
+    server.packages = []
+    server.package_resources = {}
+    server.files = {}
+    server.delay = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def crawl(portal, tmp_path):
+    """Повний обхід порталу павуком osbb_registry в окремому процесі; повертає записи з feed-експорту."""
+
+    def run(**settings):
+        output = tmp_path / 'items.jl'
+        settings = {
+            'OSBB_DISCOVERY': 'ckan',
+            'OSBB_CKAN_API_URL': f'{portal.base_url}/api/3/action/',
+            'OSBB_CKAN_PORTAL_URL': portal.base_url,
+            'OSBB_CKAN_ROWS': 2,
+            'OSBB_RESOURCE_CACHE_ENABLED': False,
+            'DOWNLOAD_DELAY': 0,
+            'LOG_LEVEL': 'WARNING',
+            **settings,
+        }
+        command = [sys.executable, '-m', 'scrapy', 'crawl', 'osbb_registry', '-a', 'allowed_domains=',
+                   '-O', str(output)]
+        for name, value in settings.items():
+            command += ['-s', f'{name}={value}']
+        subprocess.run(command, cwd=PROJECT_DIR, check=True, timeout=120)
+        with open(output, encoding='utf-8') as f:
+            return [json.loads(line) for line in f]
+
+    return run
@@ -0,0 +1,82 @@
+# osbb_crawler/tests/test_address.py
+import csv
+import os
+import re
+from collections import defaultdict
+
+import pytest
+
+from osbb_crawler.address import STREET_TYPES, AddressNormalizer, address_key, normalize_address
+from osbb_crawler.pipelines import CityResolver, URL_CITY_MAPPING
+
+TEST_OUTPUT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'test_output.csv')
+
+
+@pytest.fixture(scope='module')
+def rows():
+    with open(TEST_OUTPUT, encoding='utf-8') as f:
+        return list(csv.DictReader(f))
+
+
+@pytest.fixture(scope='module')
+def normalizer():
+    return AddressNormalizer(cities=CityResolver(URL_CITY_MAPPING).cities)
+
+
+@pytest.mark.parametrize('address, key', [
+    ('Конякіна, 9', 'луцьк|конякіна|9'),
+    ('Ковельська, 62', 'луцьк|ковельська|62'),
+    ('Кравчука, 11-В', 'луцьк|кравчука|11в'),
+    ('Київський майдан, 1', 'луцьк|майдан київський|1'),
+    ('Карпенка-Карого, 9', 'луцьк|карпенка-карого|9'),
+])
+def test_street_starting_with_k_is_not_corpus(address, key):
+    # Рядки з test_output.csv (Луцьк): 'К...' — назва вулиці, а не корпус
+    assert address_key(address, 'Луцьк') == key
+    assert 'корп' not in normalize_address(address)
+
+
+@pytest.mark.parametrize('address', ['вул. Шевченка, 9, корп. 2', 'вул. Шевченка, 9, к. 2', 'вул. Шевченка, 9, к2',
+                                     'вулиця Шевченка, буд. 9, корпус 2'])
+def test_corpus(address):
+    assert normalize_address(address) == 'вул. Шевченка, 9 корп. 2'
+
+
+def test_corpus_is_part_of_key():
+    assert address_key('вул. Шевченка, 9, корп. 2') != address_key('вул. Шевченка, 9')
+
+
+@pytest.mark.parametrize('address, city, key', [
+    ('вул. Шевченка, 9, Київ', None, '|шевченка|9'),
+    ('Калинова, 5', 'Луцьк', 'луцьк|калинова|5'),
+    ('Луцьк, вул. Львівська, 10', 'Луцьк', 'луцьк|львівська|10'),
+    ('Хмельницький, вул. Проскурівська 1', None, '|проскурівська|1'),
+])
+def test_city_inside_address(normalizer, address, city, key):
+    assert normalizer.key(address, city) == key
+
+
+@pytest.mark.parametrize('address', ['місто Бровари', 'село Чабани', 'село Требухів'])
+def test_locality_without_street_has_no_key(rows, address):
+    # У наборах трапляється лише населений пункт — такі записи не повинні злипатися в один будинок
+    city = next(row['city'] for row in rows if row['address'] == address)
+    assert address_key(address, city) is None
+
+
+def test_keys_do_not_merge_different_streets(rows, normalizer):
+    # Кожен ключ test_output.csv відповідає одній вулиці: слова назви вулиці в усіх адресах однакові
+    ignored = set(STREET_TYPES) | {'буд', 'будинок', 'корп', 'корпус'}
+    streets = defaultdict(set)
+    for row in rows:
+        key = normalizer.key(row['address'], row['city'])
+        if key:
+            words = re.findall(r"[^\W\d_]{2,}", row['address'].lower().replace("'", ''))
+            streets[key].add(frozenset(word for word in words if word not in ignored))
+    assert streets
+    assert [key for key, variants in streets.items() if len(variants) > 1] == []
+
+
+def test_normalized_address_keeps_raw_address(normalizer):
+    assert normalizer.normalize_with_key('вулиця Шевченка, буд. 9-а', 'Київ') == (
+        'вул. Шевченка, 9А', 'київ|шевченка|9а',
+    )
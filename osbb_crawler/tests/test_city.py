@@ -0,0 +1,42 @@
+# osbb_crawler/tests/test_city.py
+import random
+
+from osbb_crawler.pipelines import URL_CITY_MAPPING, CityResolver
+
+
+def linear_scan(mapping, source_url):
+    for base_url, city_name in mapping.items():
+        if base_url in source_url:
+            return city_name
+    return None
+
+
+def test_earliest_key_wins():
+    dataset = 'https://data.gov.ua/dataset/perelik-osbb'
+    mapping = {
+        f'{dataset}/resource/1': 'Стрий',
+        dataset: 'Львів',
+        f'{dataset}/resource/2': 'Самбір',
+    }
+    resolver = CityResolver(mapping)
+    for source_url in (f'{dataset}/resource/1', f'{dataset}/resource/2', f'{dataset}/resource/3', dataset):
+        assert resolver.resolve(source_url) == linear_scan(mapping, source_url)
+    assert resolver.resolve(f'{dataset}/resource/1') == 'Стрий'
+    assert resolver.resolve(f'{dataset}/resource/2') == 'Львів'
+    assert resolver.resolve('https://data.gov.ua/dataset/perelik') is None
+
+
+def test_resolver_matches_linear_scan():
+    rng = random.Random(1)
+    mapping = dict(URL_CITY_MAPPING)
+    for base_url in list(URL_CITY_MAPPING)[::3]:
+        mapping[f'{base_url}/resource/{rng.getrandbits(16):04x}'] = 'Інше'
+    source_urls = [
+        f'{base_url}/resource/{rng.getrandbits(16):04x}' if rng.random() < 0.5 else base_url
+        for base_url in mapping
+    ] + ['https://data.gov.ua/dataset/невідомий', 'https://data.gov.ua/', '']
+
+    resolver = CityResolver(mapping)
+    # Двічі: другий прохід іде через кеш
+    for _ in range(2):
+        assert [resolver.resolve(url) for url in source_urls] == [linear_scan(mapping, url) for url in source_urls]
@@ -0,0 +1,55 @@
+# osbb_crawler/tests/test_ckan.py
+import pytest
+
+# Пакети порталу: ресурси в пошуку є не в усіх (osbb-luck — лише через package_show)
+PACKAGES = [
+    {'id': 'id-vinn', 'name': 'osbb-vinn', 'title': 'ОСББ Вінниці', 'num_resources': 2, 'resources': [
+        {'format': 'CSV', 'url': '/files/vinn.csv', 'size': 1000, 'last_modified': '2024-01-01T00:00:00'},
+        {'format': 'PDF', 'url': '/files/vinn.pdf', 'size': 1000},
+    ]},
+    {'id': 'id-luck', 'name': 'osbb-luck', 'title': 'ОСББ Луцька', 'num_resources': 1},
+    {'id': 'id-lviv', 'name': 'osbb-lviv', 'title': 'ОСББ Львова', 'num_resources': 1, 'resources': [
+        {'format': 'csv', 'url': '/files/lviv.csv', 'size': 1000},
+    ]},
+    {'id': 'id-docs', 'name': 'osbb-docs', 'title': 'Документи', 'num_resources': 1, 'resources': [
+        {'format': 'DOC', 'url': '/files/docs.doc', 'size': 1000},
+    ]},
+    {'id': 'id-uzh', 'name': 'osbb-uzh', 'title': 'ОСББ Ужгорода', 'num_resources': 1, 'resources': [
+        {'format': 'CSV', 'url': '/files/uzh.csv', 'size': 1000},
+    ]},
+]
+PACKAGE_RESOURCES = {'id-luck': [{'format': 'CSV', 'url': '/files/luck.csv', 'size': 1000}]}
+
+
+@pytest.fixture
+def ckan_portal(portal):
+    portal.packages = PACKAGES
+    portal.package_resources = PACKAGE_RESOURCES
+    for number, name in enumerate(('vinn', 'luck', 'lviv', 'uzh')):
+        row = f'ОСББ {name};{30000000 + number};вул. Миру, 1'
+        portal.files[f'/files/{name}.csv'] = f'Назва;ЄДРПОУ;Адреса\n{row}\n'.encode()
+    return portal
+
+
+@pytest.mark.parametrize('fanout', [True, False], ids=['fanout', 'next-page'])
+def test_ckan_discovery(ckan_portal, crawl, fanout):
+    items = crawl(OSBB_SEARCH_FANOUT=fanout)
+    portal, base_url = ckan_portal, ckan_portal.base_url
+
+    # Сторінки package_search по 2 пакети, поки не отримано всі 'count'
+    searches = [query for path, query in portal.requests if path.endswith('/package_search')]
+    assert sorted(int(query['start']) for query in searches) == [0, 2, 4]
+    assert {(query['q'], query['rows']) for query in searches} == {('осбб', '2')}
+    # package_show — лише для пакета без ресурсів у пошуку
+    shows = [query for path, query in portal.requests if path.endswith('/package_show')]
+    assert shows == [{'id': 'id-luck'}]
+    # Завантажуються лише ресурси цільових форматів
+    files = sorted(path for path, _ in portal.requests if path.startswith('/files/'))
+    assert files == ['/files/luck.csv', '/files/lviv.csv', '/files/uzh.csv', '/files/vinn.csv']
+
+    assert sorted((item['name'], item['source_dataset_url']) for item in items) == [
+        ('ОСББ luck', f'{base_url}/dataset/osbb-luck'),
+        ('ОСББ lviv', f'{base_url}/dataset/osbb-lviv'),
+        ('ОСББ uzh', f'{base_url}/dataset/osbb-uzh'),
+        ('ОСББ vinn', f'{base_url}/dataset/osbb-vinn'),
+    ]
@@ -0,0 +1,108 @@
+# osbb_crawler/tests/test_dedup.py
+import sqlite3
+from collections import Counter
+
+import pytest
+from scrapy import Spider
+from scrapy.exceptions import DropItem
+from scrapy.utils.test import get_crawler
+
+from osbb_crawler.items import OsbbRecordItem
+from osbb_crawler.pipelines import EdrpouDedupPipeline, record_merged
+
+LVIV = 'https://data.gov.ua/dataset/lviv'
+LVIV_OTHER = 'https://data.gov.ua/dataset/lviv-2'
+
+
+def record(edrpou, source=LVIV, **fields):
+    return OsbbRecordItem(name='ОСББ "Оберіг"', edrpou=edrpou, city='Львів', source_dataset_url=source, **fields)
+
+
+@pytest.fixture(params=[200000, 1], ids=['memory', 'spilled'])
+def dedup(request):
+    crawler = get_crawler(Spider)
+    crawler.spider = crawler._create_spider('test')
+    pipeline = EdrpouDedupPipeline(crawler, max_memory_records=request.param)
+    pipeline.emitted = []
+    # Сигнали тримають слабкі посилання, тож обробник зберігається в пайплайні
+    pipeline.on_record_merged = lambda item, **kwargs: pipeline.emitted.append(item)
+    crawler.signals.connect(pipeline.on_record_merged, signal=record_merged)
+    return pipeline
+
+
+def process(pipeline, item):
+    try:
+        return pipeline.process_item(item, pipeline.crawler.spider)
+    except DropItem:
+        return None
+
+
+def test_first_record_passes_through(dedup):
+    item = record('12345678')
+    assert process(dedup, item) is item
+    assert process(dedup, record('87654321')) is not None
+    dedup.close_spider(dedup.crawler.spider)
+    # Дублікатів не було — оновлень для сховищ немає
+    assert dedup.emitted == []
+    assert dedup.crawler.stats.get_value('osbb/dedup/unique') == 2
+
+
+def test_duplicate_is_dropped_and_merged_record_signalled(dedup):
+    assert process(dedup, record('12345678', phone='')) is not None
+    assert process(dedup, record('87654321')) is not None
+    assert process(dedup, record(' 12345678.0', LVIV_OTHER, phone='+380321234567', email='')) is None
+    assert process(dedup, record('12345678', LVIV_OTHER, phone='+380000000000', email='osbb@example.com')) is None
+    assert process(dedup, record('87654321', LVIV_OTHER)) is None
+    dedup.close_spider(dedup.crawler.spider)
+
+    # Сигнал — лише коли дублікат щось доповнив; поля першого джерела не затираються
+    assert [item['edrpou'] for item in dedup.emitted] == ['12345678', '12345678']
+    assert dedup.emitted[0]['email'] == ''
+    merged = dedup.emitted[-1]
+    assert merged['edrpou'] == '12345678'
+    assert merged['phone'] == '+380321234567'
+    assert merged['email'] == 'osbb@example.com'
+    assert merged['source_dataset_url'] == LVIV
+
+    stats = dedup.crawler.stats
+    assert stats.get_value('osbb/dedup/duplicates') == 3
+    assert stats.get_value('osbb/dedup/merged') == 2
+    assert stats.get_value('osbb/dedup/source_pairs') == {
+        f'{LVIV} | {LVIV_OTHER}': 3,
+        f'{LVIV_OTHER} | {LVIV_OTHER}': 1,
+    }
+
+
+def test_record_without_edrpou_passes_through(dedup):
+    item = record('н/д')
+    assert process(dedup, item) is item
+    assert process(dedup, record('')) is not None
+
+
+def test_crawl_exports_each_edrpou_once(portal, crawl, tmp_path):
+    # Два набори з тими самими ОСББ: другий доповнює телефон
+    portal.packages = [
+        {'id': f'id-{name}', 'name': name, 'title': name, 'num_resources': 1,
+         'resources': [{'format': 'CSV', 'url': f'/files/{name}.csv', 'size': 1000}]}
+        for name in ('osbb-a', 'osbb-b')
+    ]
+    portal.files['/files/osbb-a.csv'] = (
+        'Назва;ЄДРПОУ;Адреса;Телефон\n'
+        'ОСББ "Оберіг";12345678;вул. Миру, 1;\n'
+        'ОСББ "Надія";87654321;вул. Миру, 3;+380321111111\n'
+        'ОСББ "Без коду";;вул. Миру, 5;\n'
+    ).encode()
+    portal.files['/files/osbb-b.csv'] = (
+        'Назва;ЄДРПОУ;Адреса;Телефон\n'
+        'ОСББ «Оберіг»;12345678;вул. Миру, 1;+380322222222\n'
+        'ОСББ «Надія»;87654321;вул. Миру, 3;\n'
+    ).encode()
+    database = tmp_path / 'osbb.sqlite'
+
+    items = crawl(OSBB_SQLITE_PATH=database)
+
+    assert Counter(item.get('edrpou') for item in items) == {'12345678': 1, '87654321': 1, '': 1}
+    with sqlite3.connect(database) as conn:
+        rows = dict(conn.execute("SELECT edrpou, phone FROM osbb_records WHERE edrpou != ''"))
+    # Доповнені дублікатами поля потрапляють у сховище з upsert
+    assert rows == {'12345678': '+380322222222', '87654321': '+380321111111'}
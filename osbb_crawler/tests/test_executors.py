@@ -0,0 +1,66 @@
+# osbb_crawler/tests/test_executors.py
+import asyncio
+import queue
+import threading
+
+import pytest
+
+from osbb_crawler.executors import PROCESS_QUEUE_BATCHES, ParseExecutor, _parse_to_queue
+from osbb_crawler.instrumentation import ParseStats
+from osbb_crawler.processors import process_file_content
+
+SOURCE = 'https://data.gov.ua/dataset/perelik-osbb'
+BODY = ('Назва;ЄДРПОУ;Адреса\n' + ''.join(
+    f'ОСББ "Дім {i}";{10000000 + i};вул. Миру, {i}\n' for i in range(100)
+)).encode()
+
+
+@pytest.fixture
+def executor():
+    executor = ParseExecutor(mode='process', size=1, batch_size=10)
+    yield executor
+    executor.close()
+
+
+def test_process_mode_streams_batches_with_bounded_queue():
+    batches = queue.Queue(PROCESS_QUEUE_BATCHES)
+    cancelled = threading.Event()
+    worker = threading.Thread(
+        target=_parse_to_queue, args=(batches, cancelled, BODY, 'CSV', SOURCE, True), kwargs={'batch_size': 10},
+    )
+    worker.start()
+
+    first = batches.get(timeout=5)
+    assert len(first) == 10
+    # Краулер не читає — розбір чекає, поки черга повна, а не доходить до кінця файлу
+    worker.join(timeout=1)
+    assert worker.is_alive() and batches.full()
+
+    cancelled.set()
+    worker.join(timeout=5)
+    assert not worker.is_alive()
+
+
+def collect(executor, parse_stats=None) -> list:
+    async def records():
+        return [record async for record in executor.iter_records(BODY, 'CSV', SOURCE, streaming=True,
+                                                                   parse_stats=parse_stats)]
+    return asyncio.run(records())
+
+
+def test_process_mode_yields_all_records(executor):
+    parse_stats = ParseStats()
+    assert collect(executor, parse_stats) == list(process_file_content(BODY, 'CSV', SOURCE, streaming=True))
+    assert parse_stats.rows_emitted == 100
+
+
+def test_process_mode_stops_when_crawler_stops_reading(executor):
+    async def first_record():
+        records = executor.iter_records(BODY, 'CSV', SOURCE, streaming=True)
+        record = await anext(records)
+        await records.aclose()
+        return record
+
+    assert asyncio.run(first_record()).edrpou == '10000000'
+    # Скасований розбір не тримає єдиний процес пулу
+    assert len(collect(executor)) == 100
@@ -0,0 +1,73 @@
+# osbb_crawler/tests/test_frontier.py
+import time
+from collections import Counter
+
+from osbb_crawler.frontier import DONE, LEASED, QUEUED, SqliteFrontier
+
+
+def states(frontier) -> dict:
+    return dict(frontier.conn.execute('SELECT fingerprint, state FROM requests'))
+
+
+def leased_frontier(tmp_path, lease_timeout=300.0):
+    frontier = SqliteFrontier(str(tmp_path / 'frontier.sqlite'), lease_timeout=lease_timeout)
+    frontier.open_worker('a')
+    for fingerprint in ('search', 'dataset', 'file'):
+        frontier.push(fingerprint, 0, fingerprint.encode())
+    leases = {}
+    while (leased := frontier.lease('a')) is not None:
+        leases[leased[1].decode()] = leased[0]
+    return frontier, leases
+
+
+def test_interrupted_worker_requeues_only_requests_in_flight(tmp_path):
+    frontier, leases = leased_frontier(tmp_path)
+    assert frontier.complete(leases['search'], 'a')
+    assert frontier.complete(leases['dataset'], 'a')
+    assert not frontier.complete(leases['dataset'], 'a')
+
+    assert not frontier.close_worker('a', finished=False)
+    assert states(frontier) == {'search': DONE, 'dataset': DONE, 'file': QUEUED}
+
+
+def test_dead_worker_requeues_only_requests_in_flight(tmp_path):
+    frontier, leases = leased_frontier(tmp_path, lease_timeout=0.05)
+    frontier.complete(leases['search'], 'a')
+    time.sleep(0.1)
+
+    frontier.heartbeat('b', busy=False)
+    assert states(frontier) == {'search': DONE, 'dataset': QUEUED, 'file': QUEUED}
+    # Воркер 'a' не помер, а затримався: закриття запиту, вже поверненого в чергу, нічого не змінює
+    assert not frontier.complete(leases['dataset'], 'a')
+    assert frontier.lease('b')[0] == leases['file']
+    assert states(frontier)['file'] == LEASED
+
+
+def test_resumed_crawl_does_not_refetch_processed_files(portal, crawl, tmp_path):
+    names = ('osbb-a', 'osbb-b', 'osbb-c', 'osbb-d')
+    portal.packages = [
+        {'id': f'id-{name}', 'name': name, 'title': name, 'num_resources': 1,
+         'resources': [{'format': 'CSV', 'url': f'/files/{name}.csv', 'size': 1000}]}
+        for name in names
+    ]
+    for number, name in enumerate(names):
+        portal.files[f'/files/{name}.csv'] = f'Назва;ЄДРПОУ\nОСББ {name};{30000000 + number}\n'.encode()
+    settings = {
+        'SCHEDULER': 'osbb_crawler.frontier.SharedFrontierScheduler',
+        'OSBB_FRONTIER_PATH': tmp_path / 'frontier.sqlite',
+        'OSBB_FRONTIER_WORKER_ID': 'worker-1',
+        'CONCURRENT_REQUESTS': 1,
+    }
+
+    # Перший запуск зупиняється після першого запису (finish_reason — не 'finished'),
+    # поки наступний файл ще завантажується
+    portal.delay = 1
+    first = crawl(CLOSESPIDER_ITEMCOUNT=1, **settings)
+    fetched_first = [path for path, _ in portal.requests if path.startswith('/files/')]
+    second = crawl(**settings)
+    fetched = Counter(path for path, _ in portal.requests if path.startswith('/files/'))
+
+    assert 1 <= len(first) < len(names)
+    assert len(fetched_first) < len(names)
+    assert fetched == {f'/files/{name}.csv': 1 for name in names}
+    assert sorted(item['name'] for item in first + second) == [f'ОСББ {name}' for name in names]
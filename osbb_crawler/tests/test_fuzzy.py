@@ -0,0 +1,60 @@
+# osbb_crawler/tests/test_fuzzy.py
+import os
+import subprocess
+import sys
+
+import pytest
+from scrapy import Spider
+from scrapy.exceptions import NotConfigured
+from scrapy.utils.test import get_crawler
+
+from osbb_crawler import settings
+from osbb_crawler.fuzzy import FuzzyMatcher, minhash_bands, normalize_name, shingles
+from osbb_crawler.items import OsbbRecordItem
+from osbb_crawler.pipelines import FuzzyDedupPipeline
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_minhash_bands_do_not_depend_on_hash_seed():
+    script = (
+        'from osbb_crawler.fuzzy import minhash_bands, normalize_name, shingles;'
+        'print(minhash_bands(shingles(normalize_name("ОСББ «Оберіг»"))))'
+    )
+    outputs = {
+        subprocess.run(
+            [sys.executable, '-c', script], cwd=PROJECT_DIR, capture_output=True, text=True, check=True,
+            env={**os.environ, 'PYTHONHASHSEED': seed},
+        ).stdout
+        for seed in ('1', '2', '3')
+    }
+    assert len(outputs) == 1
+    assert outputs == {f'{minhash_bands(shingles(normalize_name("ОСББ «Оберіг»")))}\n'}
+
+
+def test_same_osbb_joins_cluster():
+    matcher = FuzzyMatcher()
+    first = matcher.assign('ОСББ "Оберіг"', 'львів|шевченка|9', 'Львів')
+    assert matcher.assign("Об'єднання співвласників багатоквартирного будинку «ОБЕРІГ»", None, 'Львів') == first
+    assert matcher.assign('ОСББ "Будівельник 2"', 'львів|шевченка|11', 'Львів') != first
+
+
+def test_unique_clusters_get_numbered_suffixes():
+    matcher = FuzzyMatcher()
+    # Різні ЄДРПОУ не об'єднуються, хоч назва й адреса ті самі
+    clusters = [matcher.assign('ОСББ "Надія"', 'київ|миру|1', 'Київ', edrpou) for edrpou in ('12345678', '87654321')]
+    assert clusters == ['edrpou:12345678', 'edrpou:87654321']
+
+    assert [matcher._cluster('edrpou:12345678', unique=True) for _ in range(3)] == [2, 3, 4]
+    assert matcher.cluster_ids[2:] == ['edrpou:12345678#2', 'edrpou:12345678#3', 'edrpou:12345678#4']
+    assert matcher._cluster('edrpou:12345678') == 0
+
+
+def test_pipeline_is_opt_in():
+    assert settings.OSBB_FUZZY_DEDUP_ENABLED is False
+    with pytest.raises(NotConfigured):
+        FuzzyDedupPipeline.from_crawler(get_crawler(Spider))
+
+    pipeline = FuzzyDedupPipeline.from_crawler(get_crawler(Spider, {'OSBB_FUZZY_DEDUP_ENABLED': True}))
+    item = pipeline.process_item(OsbbRecordItem(name='ОСББ "Оберіг"', edrpou='12345678', city='Львів'), None)
+    assert item['cluster_id'] == 'edrpou:12345678'
@@ -0,0 +1,86 @@
+# osbb_crawler/tests/test_parquet.py
+import pytest
+from scrapy import Spider
+from scrapy.utils.test import get_crawler
+
+from osbb_crawler.items import OsbbRecordItem
+from osbb_crawler.pipelines import ParquetExportPipeline
+
+pa = pytest.importorskip('pyarrow')
+ds = pytest.importorskip('pyarrow.dataset')
+pq = pytest.importorskip('pyarrow.parquet')
+
+LVIV = 'https://data.gov.ua/dataset/perelik-osbb'
+LUTSK = 'https://data.gov.ua/dataset/39e1fdeb-d151-4ab0-914d-1733f3177dba'
+
+RECORDS = [
+    {'name': 'ОСББ "Оберіг"', 'edrpou': '12345678', 'address': 'вул. Шевченка, 9', 'city': 'Львів',
+     'region': 'Львівська область', 'source_dataset_url': LVIV},
+    {'name': 'ОСББ "Надія"', 'edrpou': '23456789', 'address': 'вул. Франка, 1', 'city': 'Львів',
+     'region': 'Львівська область', 'phone': '+380321234567', 'source_dataset_url': LVIV},
+    {'name': 'ОСББ "Світанок"', 'edrpou': '34567890', 'city': 'Луцьк', 'region': 'Волинська область',
+     'source_dataset_url': LUTSK},
+    {'name': 'ОСББ "Злагода"', 'edrpou': '45678901', 'city': 'Луцьк', 'region': 'Волинська область',
+     'email': 'osbb@example.com', 'source_dataset_url': LUTSK},
+    {'name': 'ОСББ "Мрія"', 'edrpou': '56789012', 'city': 'Стрий', 'source_dataset_url': LVIV},
+]
+
+
+def export(path, **settings):
+    crawler = get_crawler(Spider, {'OSBB_PARQUET_PATH': str(path), 'OSBB_PARQUET_ROW_GROUP_SIZE': 2, **settings})
+    spider = crawler._create_spider('test')
+    pipeline = ParquetExportPipeline.from_crawler(crawler)
+    for record in RECORDS:
+        item = OsbbRecordItem(**record)
+        assert pipeline.process_item(item, spider) is item
+        pipeline.item_scraped(item, spider)
+    pipeline.spider_closed(spider)
+    assert crawler.stats.get_value('osbb/parquet/rows_written') == len(RECORDS)
+
+
+def expected_rows(fields):
+    return [{field: record.get(field, '') for field in fields} for record in RECORDS]
+
+
+def test_round_trip_with_dictionary_columns(tmp_path):
+    path = tmp_path / 'osbb.parquet'
+    export(path)
+
+    parquet_file = pq.ParquetFile(path)
+    # 5 записів групами по 2
+    assert parquet_file.metadata.num_row_groups == 3
+    table = parquet_file.read()
+    assert table.column_names == list(ParquetExportPipeline.FIELDS)
+    for field in ParquetExportPipeline.FIELDS:
+        is_dictionary = pa.types.is_dictionary(table.schema.field(field).type)
+        assert is_dictionary == (field in ParquetExportPipeline.DICTIONARY_FIELDS), field
+    assert table.to_pylist() == expected_rows(ParquetExportPipeline.FIELDS)
+
+    frame = pq.read_table(path, columns=['city']).to_pandas()
+    assert frame['city'].dtype.name == 'category'
+    assert frame['city'].value_counts().to_dict() == {'Львів': 2, 'Луцьк': 2, 'Стрий': 1}
+
+
+def test_round_trip_partitioned_by_region(tmp_path):
+    path = tmp_path / 'osbb'
+    export(path, OSBB_PARQUET_PARTITION_BY='region')
+
+    assert sorted(entry.name for entry in path.iterdir()) == sorted([
+        'region=__HIVE_DEFAULT_PARTITION__',
+        'region=%D0%92%D0%BE%D0%BB%D0%B8%D0%BD%D1%81%D1%8C%D0%BA%D0%B0%20%D0%BE%D0%B1%D0%BB%D0%B0%D1%81%D1%82%D1%8C',
+        'region=%D0%9B%D1%8C%D0%B2%D1%96%D0%B2%D1%81%D1%8C%D0%BA%D0%B0%20%D0%BE%D0%B1%D0%BB%D0%B0%D1%81%D1%82%D1%8C',
+    ])
+    # Колонка розбиття — лише в назві каталогу
+    part = pq.read_table(path / 'region=__HIVE_DEFAULT_PARTITION__' / 'part-0.parquet')
+    assert 'region' not in part.column_names
+    assert pa.types.is_dictionary(part.schema.field('city').type)
+
+    dataset = ds.dataset(path, format='parquet', partitioning='hive')
+    rows = sorted(dataset.to_table().to_pylist(), key=lambda row: row['edrpou'])
+    expected = expected_rows(ParquetExportPipeline.FIELDS)
+    # Порожня область повертається як null
+    expected[-1]['region'] = None
+    assert rows == expected
+
+    volyn = dataset.to_table(filter=ds.field('region') == 'Волинська область', columns=['edrpou', 'city'])
+    assert volyn.to_pylist() == [{'edrpou': '34567890', 'city': 'Луцьк'}, {'edrpou': '45678901', 'city': 'Луцьк'}]
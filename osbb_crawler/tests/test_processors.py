@@ -0,0 +1,148 @@
+# osbb_crawler/tests/test_processors.py
+import csv
+import io
+import json
+import os
+
+import pytest
+
+from osbb_crawler import processors
+from osbb_crawler.instrumentation import SKIP_NO_EDRPOU_OR_ADDRESS, SKIP_RECORDS_NOT_FOUND, ParseStats
+from osbb_crawler.items import OsbbRecord
+from osbb_crawler.processors import (
+    iter_chunks,
+    parse_csv,
+    parse_csv_stream,
+    parse_excel,
+    parse_excel_stream,
+    parse_json,
+    parse_json_stream,
+)
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+SOURCE = 'https://data.gov.ua/dataset/perelik-osbb'
+
+
+def parsed(parser, *args, **kwargs):
+    stats = ParseStats()
+    records = list(parser(*args, stats=stats, **kwargs))
+    return records, (stats.rows_emitted, stats.skip_reasons)
+
+
+# --- Excel: osbb.xlsx і osbb.xls мають однаковий вміст ---
+# Текстовий ЄДРПОУ з нулем попереду, цілі числа в колонках з пропусками,
+# порожній рядок і рядок без ЄДРПОУ та адреси
+
+EXCEL_RECORDS = [
+    OsbbRecord('ОСББ "Оберіг"', '01234567', '380671234567', '', '', 'Львів', 'вул. Шевченка, 9', SOURCE,
+               '49.8397', ''),
+    OsbbRecord('ОСББ "Надія"', '12345678', '', '', '', 'Львів', 'вул. Франка, 9-А', SOURCE, '', ''),
+    OsbbRecord('ОСББ "Світанок"', '23456789', '380501112233', '', '', 'Луцьк', '15', SOURCE, '50.75', ''),
+    OsbbRecord('ОСББ "Злагода"', '34567890', '', '', '', 'Луцьк', 'просп. Миру', SOURCE, '', ''),
+]
+
+
+@pytest.fixture(params=['osbb.xlsx', 'osbb.xls'])
+def workbook(request):
+    with open(os.path.join(FIXTURES_DIR, request.param), 'rb') as f:
+        return f.read()
+
+
+def test_excel_stream_matches_pandas(workbook):
+    expected = (EXCEL_RECORDS, (len(EXCEL_RECORDS), {SKIP_NO_EDRPOU_OR_ADDRESS: 1}))
+    assert parsed(parse_excel_stream, workbook, SOURCE) == expected
+    assert parsed(parse_excel, workbook, SOURCE) == expected
+    assert parsed(parse_excel, workbook, SOURCE, vectorized=True) == expected
+    # Буфер тимчасового файлу (memoryview) читається так само, як bytes
+    assert list(parse_excel_stream(memoryview(workbook), SOURCE)) == EXCEL_RECORDS
+
+
+# --- Потоковий CSV ---
+
+CSV_ROWS = [
+    ['Назва ОСББ', 'Код ЄДРПОУ', 'Юридична адреса', 'Місто', 'Телефон'],
+    ['ОСББ "Оберіг"', '12345678', 'вул. Шевченка, 9', 'Львів', '+380321234567'],
+    ['ОСББ "Надія"', '', 'вул. Франка,\n1', 'Львів', ''],
+    ['ОСББ "Без адреси"', '', '', 'Львів', '+380320000000'],
+    [],
+    ['ОСББ "Світанок"', '23456789', '', 'Луцьк'],
+]
+
+
+def csv_content(delimiter: str, encoding: str, repeat: int = 1) -> bytes:
+    out = io.StringIO()
+    writer = csv.writer(out, delimiter=delimiter)
+    writer.writerow(CSV_ROWS[0])
+    for _ in range(repeat):
+        writer.writerows(CSV_ROWS[1:])
+    return out.getvalue().encode(encoding)
+
+
+@pytest.mark.parametrize('delimiter, encoding', [(',', 'utf-8'), (';', 'cp1251')])
+@pytest.mark.parametrize('chunk_size', [7, processors.STREAM_CHUNK_SIZE])
+def test_csv_stream_matches_parse_csv(delimiter, encoding, chunk_size):
+    # 7 байт: частини розрізають кириличні символи й рядки з переносами в лапках
+    raw = csv_content(delimiter, encoding, repeat=50)
+    records, stats = parsed(parse_csv_stream, iter_chunks(raw, chunk_size), SOURCE)
+    assert (records, stats) == parsed(parse_csv, raw, SOURCE)
+    assert stats == (150, {SKIP_NO_EDRPOU_OR_ADDRESS: 50})
+    assert records[:3] == [
+        OsbbRecord('ОСББ "Оберіг"', '12345678', '+380321234567', '', '', 'Львів', 'вул. Шевченка, 9', SOURCE, '', ''),
+        OsbbRecord('ОСББ "Надія"', '', '', '', '', 'Львів', 'вул. Франка,\n1', SOURCE, '', ''),
+        OsbbRecord('ОСББ "Світанок"', '23456789', '', '', '', 'Луцьк', '', SOURCE, '', ''),
+    ]
+
+
+# --- Потоковий JSON ---
+
+def feature(name, edrpou, address, geometry):
+    return {'type': 'Feature', 'properties': {'Назва': name, 'ЄДРПОУ': edrpou, 'Адреса': address},
+            'geometry': geometry}
+
+
+GEOJSON = {
+    'type': 'FeatureCollection',
+    'features': [
+        feature('ОСББ "Оберіг"', '12345678', 'вул. Шевченка, 9',
+                {'type': 'Polygon', 'coordinates': [[[24.0, 49.8], [24.002, 49.8], [24.002, 49.802], [24.0, 49.802],
+                                                     [24.0, 49.8]]]}),
+        feature('ОСББ "Надія"', '23456789', 'вул. Франка, 1', {'type': 'Point', 'coordinates': [25.3, 50.75]}),
+        feature('ОСББ "Без адреси"', '', '', None),
+    ],
+}
+RECORDS = [
+    {'Назва ОСББ': 'ОСББ "Оберіг"', 'Код ЄДРПОУ': 12345678, 'Адреса': 'вул. Шевченка, 9'},
+    {'Назва ОСББ': 'ОСББ "Надія"', 'Код ЄДРПОУ': '', 'Адреса': 'вул. Франка, 1', 'Телефон': '+380321234567'},
+    'не запис',
+]
+
+
+@pytest.fixture
+def stream_small_json(monkeypatch):
+    # Інакше файли, менші за JSON_STREAMING_MIN_SIZE, розбирає json.loads
+    monkeypatch.setattr(processors, 'JSON_STREAMING_MIN_SIZE', 0)
+
+
+@pytest.mark.parametrize('document, edrpous', [
+    (GEOJSON, ['12345678', '23456789']),
+    ({'meta': {'total': 3}, 'data': RECORDS}, ['12345678', '']),
+    (RECORDS, ['12345678', '']),
+], ids=['geojson', 'data', 'list'])
+def test_json_stream_matches_parse_json(stream_small_json, document, edrpous):
+    raw = json.dumps(document, ensure_ascii=False).encode('utf-8')
+    records, stats = parsed(parse_json_stream, raw, SOURCE)
+    assert (records, stats) == parsed(parse_json, raw, SOURCE)
+    assert [record.edrpou for record in records] == edrpous
+
+
+def test_json_stream_takes_coordinates_from_geometry(stream_small_json):
+    raw = json.dumps(GEOJSON).encode('utf-8')
+    records = list(parse_json_stream(raw, SOURCE))
+    assert [(record.latitude, record.longitude) for record in records] == [
+        ('49.801000', '24.001000'), ('50.750000', '25.300000'),
+    ]
+
+
+def test_json_stream_falls_back_for_unknown_structure(stream_small_json):
+    raw = json.dumps({'result': {'items': RECORDS}}).encode('utf-8')
+    assert parsed(parse_json_stream, raw, SOURCE) == ([], (0, {SKIP_RECORDS_NOT_FOUND: 1}))
@@ -0,0 +1,55 @@
+# osbb_crawler/tests/test_resource_cache.py
+import asyncio
+
+import pytest
+from scrapy import Request
+from scrapy.http import TextResponse
+from scrapy.utils.test import get_crawler
+
+from osbb_crawler.items import OsbbRecord
+from osbb_crawler.resource_cache import content_hash
+from osbb_crawler.spiders.osbb_info_spider import OsbbRegistrySpider
+
+# Той самий файл опубліковано у двох наборах даних
+DOWNLOAD_LINK = 'https://data.gov.ua/dataset/shared/resource/osbb.csv'
+BODY = 'Назва;ЄДРПОУ;Адреса\nОСББ "Оберіг";12345678;вул. Миру, 1\n'.encode()
+
+
+@pytest.fixture
+def spider(tmp_path):
+    crawler = get_crawler(OsbbRegistrySpider, {'OSBB_RESOURCE_CACHE_PATH': str(tmp_path / 'resources.sqlite')})
+    spider = OsbbRegistrySpider.from_crawler(crawler)
+    yield spider
+    spider.parse_executor.close()
+    spider.resource_cache.close()
+
+
+def file_response(page_url, status=200):
+    dataset_item = {'title': 'ОСББ', 'page_url': page_url, 'download_link': DOWNLOAD_LINK, 'data_format': 'CSV'}
+    request = Request(DOWNLOAD_LINK, meta={'dataset_metadata': dataset_item})
+    return TextResponse(DOWNLOAD_LINK, status=status, body=BODY if status == 200 else b'', request=request)
+
+
+def parse(spider, response):
+    async def collect():
+        return [result async for result in spider._parse_file_content(response, response.body)]
+    return asyncio.run(collect())
+
+
+@pytest.mark.parametrize('status', [200, 304], ids=['unchanged', 'not-modified'])
+def test_replay_uses_current_dataset_url(spider, status):
+    # Минулий обхід розібрав файл у наборі 'first'
+    cache = spider.resource_cache
+    body_hash = content_hash(BODY)
+    cache.start_records(DOWNLOAD_LINK, body_hash)
+    cache.add_records(DOWNLOAD_LINK, body_hash, [
+        OsbbRecord('ОСББ "Оберіг"', '12345678', '', '', '', '', 'вул. Миру, 1', 'https://data.gov.ua/dataset/first'),
+    ])
+    cache.store(DOWNLOAD_LINK, etag='"v1"', last_modified=None, content_hash=body_hash, record_count=1,
+                records_cached=True)
+
+    items = parse(spider, file_response('https://data.gov.ua/dataset/second', status))
+    assert [(item['name'], item['source_dataset_url']) for item in items] == [
+        ('ОСББ "Оберіг"', 'https://data.gov.ua/dataset/second'),
+    ]
+    assert spider.crawler.stats.get_value('osbb/resource_cache/replayed_records') == 1